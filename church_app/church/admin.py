@@ -13,7 +13,7 @@ class SeriesAdmin(admin.ModelAdmin):
 
 @admin.register(Scripture)
 class ScriptureAdmin(admin.ModelAdmin):
-    list_display = ('book', 'chapter', 'verse')
+    list_display = ('__str__', 'book', 'chapter', 'verse')
     search_fields = ('book', 'chapter', 'verse')
 
 @admin.register(Sermon)
@@ -4,3 +4,33 @@ from django.apps import AppConfig
 class ChurchConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "church"
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from common import conditional, pipeline, search, uploads
+        from common.audio import generate_waveform
+        from common.mp4 import faststart_stage
+        from common.video import generate_video_renditions
+        from . import ratings, transcripts
+        from .models import Event, Member, Note, RatingReview, Scripture, Series, Sermon
+        from .uploads import SermonMediaUploadTarget
+
+        # Fast-start new sermon videos, then extract posters and scrub sprites
+        pipeline.register(Sermon, 'video_file', faststart_stage, priority=10)
+        pipeline.register(Sermon, 'video_file', generate_video_renditions)
+        # Waveform peaks for the web player
+        pipeline.register(Sermon, 'audio_file', generate_waveform)
+        # Full-text index of title, description and slide text
+        search.register_model(Sermon, body_fields=['description'])
+        search.register(Sermon, 'slides')
+
+        # Versions behind ETag/Last-Modified
+        conditional.track(Event, Series, Scripture, Sermon, RatingReview, Note, Member, get_user_model())
+
+        # Denormalized rating aggregates on Sermon
+        ratings.track()
+        # Timed transcript segments behind /sermons/search/
+        transcripts.track()
+
+        # Resumable chunked uploads for sermon audio/video
+        uploads.register_target(SermonMediaUploadTarget())
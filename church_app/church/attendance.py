@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from common.models import ResourceVersion
+from .models import Event
+
+# Rows per INSERT/DELETE when writing the attendees table.
+BATCH_SIZE = 500
+
+
+def _batches(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def add_attendees(event, user_ids):
+    """
+    RSVP ``user_ids`` (existing users only) to ``event``, writing the through
+    table in batches. Users already attending are left alone, so repeating a
+    call changes nothing. Returns the number of users added.
+    """
+    through = Event.attendees.through
+    user_ids = sorted(set(user_ids))
+    added = 0
+    with transaction.atomic():
+        for batch in _batches(user_ids):
+            existing = set(get_user_model().objects.filter(pk__in=batch).values_list('pk', flat=True))
+            attending = set(through.objects.filter(event=event, user_id__in=existing).values_list('user_id', flat=True))
+            rows = [through(event_id=event.pk, user_id=pk) for pk in sorted(existing - attending)]
+            through.objects.bulk_create(rows, ignore_conflicts=True)
+            added += len(rows)
+        if added:
+            # Bulk writes send no m2m_changed; keep ETags current.
+            ResourceVersion.bump(Event)
+    return added
+
+
+def remove_attendees(event, user_ids):
+    """
+    Un-RSVP ``user_ids`` from ``event`` in batches. Returns the number of
+    users removed; users who weren't attending are ignored.
+    """
+    through = Event.attendees.through
+    removed = 0
+    with transaction.atomic():
+        for batch in _batches(sorted(set(user_ids))):
+            removed += through.objects.filter(event=event, user_id__in=batch).delete()[0]
+        if removed:
+            ResourceVersion.bump(Event)
+    return removed
@@ -0,0 +1,211 @@
+import bisect
+import html
+import itertools
+import re
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.db import transaction
+from common.models import ResourceVersion
+from .models import CueTrack
+
+# Default for CUE_CACHE_SIZE: parsed cue tracks kept per process.
+DEFAULT_CACHE_SIZE = 128
+
+# How long the last cue of a transcript without end times stays up.
+LAST_CUE_MS = 5000
+
+TIMESTAMP = r'(?:\d+:)?\d{1,2}:\d{2}(?:[.,]\d+)?'
+
+_timing_re = re.compile(rf'^\s*({TIMESTAMP})\s*-->\s*({TIMESTAMP})')
+_tag_re = re.compile(r'<[^>]+>')
+
+
+def parse_timestamp(value):
+    """
+    Milliseconds of "HH:MM:SS", "MM:SS" or either with a fraction.
+    """
+    *parts, seconds = value.replace(',', '.').split(':')
+    total = 0
+    for part in parts:
+        total = total * 60 + int(part)
+    return round((total * 60 + float(seconds)) * 1000)
+
+
+def format_timestamp(ms, separator='.'):
+    seconds, ms = divmod(ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{ms:03d}'
+
+
+def parse_captions(text):
+    """
+    ``[(start_ms, end_ms, text)]`` sorted by start, from WebVTT or SRT (told
+    apart by the WEBVTT header). Cue settings, identifiers, NOTE/STYLE
+    blocks and markup are dropped; multi-line cues become one line.
+    """
+    text = text.lstrip('\ufeff').replace('\r\n', '\n').replace('\r', '\n')
+    vtt = text.startswith('WEBVTT')
+    cues = []
+    for block in re.split(r'\n\s*\n', text):
+        lines = block.strip('\n').split('\n')
+        for index, line in enumerate(lines[:2]):
+            timing = _timing_re.match(line)
+            if timing:
+                break
+        else:
+            # Header, NOTE, STYLE or REGION block
+            continue
+        payload = ' '.join(line.strip() for line in lines[index + 1:] if line.strip())
+        if vtt:
+            payload = html.unescape(_tag_re.sub('', payload))
+        else:
+            # SRT allows simple HTML-like tags
+            payload = _tag_re.sub('', payload)
+        start, end = parse_timestamp(timing.group(1)), parse_timestamp(timing.group(2))
+        if payload and end > start:
+            cues.append((start, end, payload))
+    cues.sort(key=lambda cue: cue[0])
+    return cues
+
+
+def to_webvtt(cues):
+    blocks = ['WEBVTT\n']
+    for start, end, text in cues:
+        text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+        blocks.append(f'{format_timestamp(start)} --> {format_timestamp(end)}\n{text}\n')
+    return '\n'.join(blocks)
+
+
+def to_srt(cues):
+    return '\n'.join(
+        f'{number}\n{format_timestamp(start, ",")} --> {format_timestamp(end, ",")}\n{text}\n'
+        for number, (start, end, text) in enumerate(cues, 1)
+    )
+
+
+def cues_to_transcript(cues):
+    """
+    The cues as transcript lines, "[00:01:02.500 --> 00:01:05.000] text",
+    which church/transcripts.py reads back without losing end times.
+    """
+    return '\n'.join(
+        f'[{format_timestamp(start)} --> {format_timestamp(end)}] {text}' for start, end, text in cues
+    )
+
+
+class CueArray:
+    """
+    A cue track as parallel lists sorted by start time. ``reach[i]`` is the
+    latest end among cues ``0..i``, which is sorted too even when cues
+    overlap, so both ends of a playback window are found by bisection.
+    """
+
+    def __init__(self, starts, ends, texts):
+        self.starts = starts
+        self.ends = ends
+        self.texts = texts
+        self.reach = list(itertools.accumulate(ends, max))
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data.get('start', []), data.get('end', []), data.get('text', []))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends, self.texts)
+
+    def window(self, start, end):
+        """
+        ``[(start_ms, end_ms, text)]`` of the cues showing at any time from
+        ``start`` to ``end`` (ms).
+        """
+        lo = bisect.bisect_right(self.reach, start)
+        hi = bisect.bisect_right(self.starts, end, lo=lo)
+        return [
+            (self.starts[i], self.ends[i], self.texts[i])
+            for i in range(lo, hi) if self.ends[i] > start
+        ]
+
+    def next_start(self, after):
+        """
+        When the first cue starting after ``after`` (ms) starts, or None.
+        """
+        index = bisect.bisect_right(self.starts, after)
+        return self.starts[index] if index < len(self.starts) else None
+
+
+def store_cues(sermon, parts):
+    """
+    Save the cue track of ``sermon`` from the ``(start_ms, end_ms, text)``
+    parts of its transcript (church/transcripts.py). Untimed parts are
+    skipped; a timed part without an end runs until LAST_CUE_MS later.
+    """
+    cues = sorted(
+        (start, start + LAST_CUE_MS if end is None else end, text)
+        for start, end, text in parts if start is not None
+    )
+    if cues:
+        starts, ends, texts = (list(values) for values in zip(*cues))
+        CueTrack.objects.update_or_create(sermon=sermon, defaults={'cues': {'start': starts, 'end': ends, 'text': texts}})
+    else:
+        CueTrack.objects.filter(sermon=sermon).delete()
+    # Cue tracks aren't tracked by signals; keep HTTP validators current.
+    ResourceVersion.bump(CueTrack)
+    return len(cues)
+
+
+class _CueCache:
+    """
+    Parsed cue tracks by sermon id, least recently used dropped first. An
+    entry is used only while its ``updated_at`` matches the database, so
+    each lookup costs one indexed query for that timestamp.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sermon_id):
+        """
+        The CueArray of a sermon, or None if it has no cue track.
+        """
+        updated_at = CueTrack.objects.filter(sermon_id=sermon_id).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(sermon_id)
+            if entry is not None and entry[0] == updated_at:
+                self._entries.move_to_end(sermon_id)
+                return entry[1]
+        row = CueTrack.objects.filter(sermon_id=sermon_id).values_list('updated_at', 'cues').first()
+        if row is None:
+            return None
+        updated_at, cues = row[0], CueArray.from_json(row[1] or {})
+        with self._lock:
+            self._entries[sermon_id] = (updated_at, cues)
+            self._entries.move_to_end(sermon_id)
+            while len(self._entries) > getattr(settings, 'CUE_CACHE_SIZE', DEFAULT_CACHE_SIZE):
+                self._entries.popitem(last=False)
+        return cues
+
+
+cue_cache = _CueCache()
+
+
+def import_captions(sermon, text):
+    """
+    Replace the transcript of ``sermon`` with the cues of a WebVTT or SRT
+    file; saving it rebuilds the search segments and the cue track.
+    Returns the number of cues, or raises ValueError if there are none.
+    """
+    cues = parse_captions(text)
+    if not cues:
+        raise ValueError("No cues found; expected WebVTT or SRT.")
+    with transaction.atomic():
+        sermon.transcript = cues_to_transcript(cues)
+        sermon.save(update_fields=['transcript'])
+    return len(cues)
@@ -0,0 +1,53 @@
+from django.db.models import F
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+from common.search import SearchAwareOrderingFilter
+from .models import Scripture
+from .scripture import parse_passage
+
+
+class PassageFilter(filters.BaseFilterBackend):
+    """
+    ``?passage=John 3`` or ``?passage=Rom 8:28-39`` keeps objects whose
+    scripture passages overlap the reference: one range scan of the
+    Scripture (start, end) index. Views name the path to Scripture in
+    ``passage_lookup``; without it the queryset is of Scripture itself.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get('passage')
+        if not text:
+            return queryset
+        try:
+            _, start, end = parse_passage(text)
+        except ValueError as exc:
+            raise ValidationError({'passage': str(exc)})
+        passages = Scripture.objects.overlapping(start, end).values('pk')
+        lookup = getattr(view, 'passage_lookup', None)
+        if lookup is None:
+            return queryset.filter(pk__in=passages)
+        # Through the relation in a subquery, so there are no duplicate rows.
+        matches = queryset.model._default_manager.filter(**{f'{lookup}__in': passages}).values('pk')
+        return queryset.filter(pk__in=matches)
+
+
+class NullsLastOrderingFilter(SearchAwareOrderingFilter):
+    """
+    ``?ordering=`` that puts rows without a value in one of the view's
+    ``nulls_last_fields`` (e.g. unrated sermons) last in either direction;
+    databases disagree on where NULLs sort by default.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering:
+            return queryset
+        nulls_last = getattr(view, 'nulls_last_fields', ())
+        return queryset.order_by(*[self._order_by(term, nulls_last) for term in ordering])
+
+    def _order_by(self, term, nulls_last):
+        if not isinstance(term, str) or term.lstrip('-') not in nulls_last:
+            return term
+        if term.startswith('-'):
+            return F(term[1:]).desc(nulls_last=True)
+        return F(term).asc(nulls_last=True)
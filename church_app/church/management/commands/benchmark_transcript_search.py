@@ -0,0 +1,70 @@
+import random
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from common.synthetic import vocabulary
+from church.models import Sermon, TranscriptSegment
+from church.transcripts import index_transcript, search_segments
+
+QUERIES = ['forgiveness', 'grace', 'shepherd covenant', '"quiet rest"', 'harvesting']
+
+# Seconds per timestamped line; about 2.5 spoken words a second.
+LINE_SECONDS = 15
+LINE_WORDS = 38
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time ranked transcript search (with snippets) over synthetic timestamped sermon "
+        "transcripts. Everything is created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=1000, help="Hours of transcript, one sermon per hour.")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per query.")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options['hours'], options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, hours, repeat):
+        rng = random.Random(0)
+        speaker, _ = get_user_model().objects.get_or_create(username='benchmark-transcripts')
+        words, weights = vocabulary(rng)
+        words.insert(len(words) // 10, 'forgiveness')
+        weights.append(weights[-1])
+
+        def transcript():
+            return '\n'.join(
+                f'[{second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}] '
+                + ' '.join(rng.choices(words, weights, k=LINE_WORDS))
+                for second in range(0, 3600, LINE_SECONDS)
+            )
+
+        start = time.perf_counter()
+        sermons = Sermon.objects.bulk_create([
+            Sermon(title=f'Benchmark {i}', description='', date=timezone.now(), speaker=speaker, transcript=transcript())
+            for i in range(hours)
+        ], batch_size=200)
+        for sermon in sermons:
+            index_transcript(sermon)
+        segments = TranscriptSegment.objects.count()
+        self.stdout.write(f"Indexed {hours} hours ({segments} segments) in {time.perf_counter() - start:.1f}s")
+
+        for query in QUERIES:
+            hits = search_segments(query, 20)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                search_segments(query, 20)
+            elapsed = (time.perf_counter() - start) / repeat
+            self.stdout.write(f"{query:<20} {elapsed * 1000:8.1f} ms  first page of {len(hits)} hits with snippets")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from church.models import Sermon
+from church.transcripts import index_transcript
+
+
+class Command(BaseCommand):
+    help = (
+        "Split every sermon transcript into timed, full-text indexed segments for /sermons/search/ "
+        "and the cue tracks behind /sermons/{id}/cues/."
+    )
+
+    def handle(self, *args, **options):
+        sermons = segments = 0
+        for sermon in Sermon.objects.only('pk', 'transcript').iterator(chunk_size=200):
+            segments += index_transcript(sermon)
+            sermons += 1
+        self.stdout.write(self.style.SUCCESS(f"{segments} segments from {sermons} sermons indexed."))
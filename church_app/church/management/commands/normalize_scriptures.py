@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from common.models import ResourceVersion
+from church.models import Scripture, Sermon
+from church.scripture import normalize_scriptures
+
+
+class Command(BaseCommand):
+    help = (
+        "Canonicalize scripture book names, recompute the encoded passage ranges and merge "
+        "duplicate passages (moving their sermon links to the oldest row)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated, merged, unknown = normalize_scriptures(Scripture, Sermon.scriptures.through, options['batch_size'])
+            if updated or merged:
+                # Bulk writes send no signals; keep ETags current.
+                ResourceVersion.bump(Scripture)
+                ResourceVersion.bump(Sermon)
+        self.stdout.write(f"{updated} updated, {merged} duplicates merged")
+        if unknown:
+            self.stdout.write(self.style.WARNING(f"{unknown} rows name an unknown book and were left as they are"))
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from church.models import Sermon
+from church.ratings import recompute_ratings
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the denormalized rating count, sum and average of every sermon whose "
+        "stored values no longer match its reviews."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        repaired = recompute_ratings(Sermon.objects.all(), options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{repaired} sermons repaired."))
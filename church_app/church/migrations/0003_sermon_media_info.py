@@ -0,0 +1,17 @@
+# Generated by Django 5.0.2 on 2026-10-18 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("church", "0002_sermon_renditions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sermon",
+            name="media_info",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,207 @@
+# Generated by Django 5.0.2 on 2026-10-18 18:43
+
+import re
+
+from django.db import migrations, models
+
+# A frozen copy of church.scripture as of this migration, so later changes
+# to it can't change what this migration does.
+
+BOOKS = [
+    'Genesis', 'Exodus', 'Leviticus', 'Numbers', 'Deuteronomy', 'Joshua', 'Judges', 'Ruth',
+    '1 Samuel', '2 Samuel', '1 Kings', '2 Kings', '1 Chronicles', '2 Chronicles', 'Ezra',
+    'Nehemiah', 'Esther', 'Job', 'Psalms', 'Proverbs', 'Ecclesiastes', 'Song of Solomon',
+    'Isaiah', 'Jeremiah', 'Lamentations', 'Ezekiel', 'Daniel', 'Hosea', 'Joel', 'Amos',
+    'Obadiah', 'Jonah', 'Micah', 'Nahum', 'Habakkuk', 'Zephaniah', 'Haggai', 'Zechariah',
+    'Malachi', 'Matthew', 'Mark', 'Luke', 'John', 'Acts', 'Romans', '1 Corinthians',
+    '2 Corinthians', 'Galatians', 'Ephesians', 'Philippians', 'Colossians', '1 Thessalonians',
+    '2 Thessalonians', '1 Timothy', '2 Timothy', 'Titus', 'Philemon', 'Hebrews', 'James',
+    '1 Peter', '2 Peter', '1 John', '2 John', '3 John', 'Jude', 'Revelation',
+]
+
+_ALIASES = {
+    'gen': 'Genesis', 'ge': 'Genesis', 'gn': 'Genesis',
+    'ex': 'Exodus', 'exo': 'Exodus', 'exod': 'Exodus',
+    'lev': 'Leviticus', 'le': 'Leviticus', 'lv': 'Leviticus',
+    'num': 'Numbers', 'nu': 'Numbers', 'nm': 'Numbers',
+    'deut': 'Deuteronomy', 'dt': 'Deuteronomy', 'de': 'Deuteronomy',
+    'josh': 'Joshua', 'jos': 'Joshua', 'judg': 'Judges', 'jdg': 'Judges', 'ru': 'Ruth', 'rth': 'Ruth',
+    'sam': 'Samuel', 'sa': 'Samuel', 'sm': 'Samuel', 'kgs': 'Kings', 'ki': 'Kings', 'kin': 'Kings',
+    'chr': 'Chronicles', 'chron': 'Chronicles', 'ch': 'Chronicles',
+    'ezr': 'Ezra', 'neh': 'Nehemiah', 'ne': 'Nehemiah', 'est': 'Esther', 'esth': 'Esther',
+    'jb': 'Job', 'ps': 'Psalms', 'psa': 'Psalms', 'psalm': 'Psalms', 'pss': 'Psalms',
+    'prov': 'Proverbs', 'pr': 'Proverbs', 'prv': 'Proverbs',
+    'eccl': 'Ecclesiastes', 'ecc': 'Ecclesiastes', 'eccles': 'Ecclesiastes', 'qoh': 'Ecclesiastes',
+    'song': 'Song of Solomon', 'sos': 'Song of Solomon', 'songofsongs': 'Song of Solomon',
+    'canticles': 'Song of Solomon', 'isa': 'Isaiah', 'is': 'Isaiah',
+    'jer': 'Jeremiah', 'je': 'Jeremiah', 'lam': 'Lamentations', 'la': 'Lamentations',
+    'ezek': 'Ezekiel', 'eze': 'Ezekiel', 'ezk': 'Ezekiel', 'dan': 'Daniel', 'da': 'Daniel', 'dn': 'Daniel',
+    'hos': 'Hosea', 'ho': 'Hosea', 'jl': 'Joel', 'am': 'Amos', 'obad': 'Obadiah', 'ob': 'Obadiah',
+    'jon': 'Jonah', 'jnh': 'Jonah', 'mic': 'Micah', 'mi': 'Micah', 'nah': 'Nahum', 'na': 'Nahum',
+    'hab': 'Habakkuk', 'zeph': 'Zephaniah', 'zep': 'Zephaniah', 'hag': 'Haggai', 'hg': 'Haggai',
+    'zech': 'Zechariah', 'zec': 'Zechariah', 'mal': 'Malachi', 'ml': 'Malachi',
+    'matt': 'Matthew', 'mt': 'Matthew', 'mat': 'Matthew', 'mk': 'Mark', 'mr': 'Mark', 'mrk': 'Mark',
+    'lk': 'Luke', 'lu': 'Luke', 'jn': 'John', 'jhn': 'John', 'joh': 'John',
+    'ac': 'Acts', 'act': 'Acts', 'rom': 'Romans', 'ro': 'Romans', 'rm': 'Romans',
+    'cor': 'Corinthians', 'co': 'Corinthians', 'gal': 'Galatians', 'ga': 'Galatians',
+    'eph': 'Ephesians', 'ephes': 'Ephesians', 'phil': 'Philippians', 'php': 'Philippians', 'pp': 'Philippians',
+    'col': 'Colossians', 'thess': 'Thessalonians', 'thes': 'Thessalonians', 'th': 'Thessalonians',
+    'tim': 'Timothy', 'ti': 'Timothy', 'tit': 'Titus', 'phlm': 'Philemon', 'philem': 'Philemon', 'phm': 'Philemon',
+    'heb': 'Hebrews', 'jas': 'James', 'jm': 'James', 'pet': 'Peter', 'pe': 'Peter', 'pt': 'Peter',
+    'jud': 'Jude', 'jd': 'Jude', 'rev': 'Revelation', 're': 'Revelation', 'revelations': 'Revelation',
+}
+
+_ROMAN = {'i': '1', 'ii': '2', 'iii': '3', 'first': '1', 'second': '2', 'third': '3'}
+
+BOOK = 1_000_000
+CHAPTER = 1_000
+LAST = CHAPTER - 1
+MAX_NUMBER = LAST - 1
+BATCH_SIZE = 500
+
+_numbered_re = re.compile(r'^(?:([123])\s*|(i{1,3}|first|second|third)\s+)(.+)$')
+
+
+def _key(name):
+    return re.sub(r'[\s.]+', '', name.lower())
+
+
+def _build_lookup():
+    lookup = {}
+    for name in BOOKS:
+        lookup[_key(name)] = name
+    for alias, name in _ALIASES.items():
+        if name in BOOKS:
+            lookup.setdefault(alias, name)
+        # Numbered books: 'sam' -> '1 Samuel', 'jn' -> '1 John' with a prefix.
+        for number in '123':
+            if f'{number} {name}' in BOOKS:
+                lookup.setdefault(number + alias, f'{number} {name}')
+                lookup.setdefault(number + _key(name), f'{number} {name}')
+    return lookup
+
+
+_lookup = _build_lookup()
+
+
+def canonical_book(name):
+    text = ' '.join(name.lower().replace('.', ' ').split())
+    match = _numbered_re.match(text)
+    if match:
+        digit, word, rest = match.groups()
+        text = (digit or _ROMAN[word]) + rest
+    found = _lookup.get(_key(text))
+    if found is None:
+        raise ValueError(f"Unknown book: {name!r}")
+    return BOOKS.index(found) + 1, found
+
+
+def encode(ordinal, chapter=0, verse=0):
+    return ordinal * BOOK + chapter * CHAPTER + verse
+
+
+def passage_range(ordinal, chapter, verse=None, end_chapter=None, end_verse=None):
+    for number in (chapter, verse, end_chapter, end_verse):
+        # Anything larger would spill into the next chapter or book.
+        if number is not None and not 1 <= number <= MAX_NUMBER:
+            raise ValueError(f"Chapters and verses run from 1 to {MAX_NUMBER}, not {number}.")
+    start = encode(ordinal, chapter, verse or 0)
+    if end_chapter is None and end_verse is None:
+        end = encode(ordinal, chapter, verse if verse else LAST)
+    else:
+        end_chapter = chapter if end_chapter is None else end_chapter
+        end = encode(ordinal, end_chapter, LAST if end_verse is None else end_verse)
+    if end < start:
+        raise ValueError("A passage can't end before it starts.")
+    return start, end
+
+
+def normalize(apps, schema_editor):
+    scripture_model = apps.get_model("church", "Scripture")
+    through_model = apps.get_model("church", "Sermon").scriptures.through
+    rows = []
+    for row in scripture_model.objects.order_by('pk').iterator(chunk_size=2000):
+        try:
+            ordinal, book = canonical_book(row.book)
+            start, end = passage_range(ordinal, row.chapter, row.verse, row.end_chapter, row.end_verse)
+        except ValueError:
+            # Unknown books keep no codes
+            continue
+        if (row.book, row.start, row.end) != (book, start, end):
+            row.book, row.start, row.end = book, start, end
+            rows.append(row)
+
+    # Duplicates must go before the new codes land, or they'd collide on
+    # the unique constraint; work out the survivors first.
+    survivors = {}
+    losers = {}
+    codes = {row.pk: (row.start, row.end) for row in rows}
+    for pk, start, end in scripture_model.objects.order_by('pk').values_list('pk', 'start', 'end').iterator(chunk_size=2000):
+        key = codes.get(pk, (start, end))
+        if key[0] is None:
+            continue
+        if key in survivors:
+            losers[pk] = survivors[key]
+        else:
+            survivors[key] = pk
+
+    loser_ids = list(losers)
+    for index in range(0, len(loser_ids), BATCH_SIZE):
+        batch = loser_ids[index:index + BATCH_SIZE]
+        links = through_model.objects.filter(scripture_id__in=batch).values_list('sermon_id', 'scripture_id')
+        through_model.objects.bulk_create(
+            [through_model(sermon_id=sermon_id, scripture_id=losers[scripture_id]) for sermon_id, scripture_id in links],
+            ignore_conflicts=True, batch_size=BATCH_SIZE,
+        )
+        scripture_model.objects.filter(pk__in=batch).delete()
+    kept = [row for row in rows if row.pk not in losers]
+    # Clear the old codes first so rows trading codes don't collide mid-update.
+    for index in range(0, len(kept), BATCH_SIZE):
+        batch = [row.pk for row in kept[index:index + BATCH_SIZE]]
+        scripture_model.objects.filter(pk__in=batch).update(start=None, end=None)
+    scripture_model.objects.bulk_update(kept, ['book', 'start', 'end'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("church", "0003_sermon_media_info"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="scripture",
+            options={"ordering": ["start"]},
+        ),
+        migrations.AddField(
+            model_name="scripture",
+            name="end",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="scripture",
+            name="end_chapter",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="scripture",
+            name="end_verse",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="scripture",
+            name="start",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name="scripture",
+            name="verse",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(normalize, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="scripture",
+            constraint=models.UniqueConstraint(
+                fields=("start", "end"), name="church_scripture_unique_passage"
+            ),
+        ),
+    ]
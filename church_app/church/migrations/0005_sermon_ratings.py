@@ -0,0 +1,59 @@
+# Generated by Django 5.0.2 on 2026-10-18 18:45
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, FloatField, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+
+def backfill(apps, schema_editor):
+    Sermon = apps.get_model("church", "Sermon")
+    RatingReview = apps.get_model("church", "RatingReview")
+    reviews = (
+        RatingReview.objects.filter(sermon=OuterRef("pk")).order_by().values("sermon")
+    )
+    count = Coalesce(Subquery(reviews.annotate(value=Count("pk")).values("value")), 0)
+    total = Coalesce(Subquery(reviews.annotate(value=Sum("rating")).values("value")), 0)
+    Sermon.objects.update(
+        rating_count=count,
+        rating_sum=total,
+        rating_avg=Cast(total, FloatField()) / NullIf(count, 0),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("church", "0004_scripture_ranges"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sermon",
+            name="rating_avg",
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="sermon",
+            name="rating_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="sermon",
+            name="rating_sum",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="sermon",
+            index=models.Index(
+                fields=["rating_avg", "rating_count"], name="church_sermon_rating_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sermon",
+            index=models.Index(
+                fields=["rating_count"], name="church_sermon_rating_count_idx"
+            ),
+        ),
+    ]
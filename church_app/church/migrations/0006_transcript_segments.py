@@ -0,0 +1,115 @@
+# Generated by Django 5.0.2 on 2026-10-18 18:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SQLITE_FTS = [
+    """
+    CREATE VIRTUAL TABLE church_transcriptsegment_fts USING fts5(
+        text,
+        content='church_transcriptsegment', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER church_transcriptsegment_fts_ai AFTER INSERT ON church_transcriptsegment BEGIN
+        INSERT INTO church_transcriptsegment_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER church_transcriptsegment_fts_ad AFTER DELETE ON church_transcriptsegment BEGIN
+        INSERT INTO church_transcriptsegment_fts(church_transcriptsegment_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER church_transcriptsegment_fts_au AFTER UPDATE ON church_transcriptsegment BEGIN
+        INSERT INTO church_transcriptsegment_fts(church_transcriptsegment_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO church_transcriptsegment_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+]
+
+SQLITE_FTS_REVERSE = [
+    "DROP TRIGGER IF EXISTS church_transcriptsegment_fts_au",
+    "DROP TRIGGER IF EXISTS church_transcriptsegment_fts_ad",
+    "DROP TRIGGER IF EXISTS church_transcriptsegment_fts_ai",
+    "DROP TABLE IF EXISTS church_transcriptsegment_fts",
+]
+
+POSTGRES_FTS = [
+    """
+    ALTER TABLE church_transcriptsegment ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', text)) STORED
+    """,
+    "CREATE INDEX church_transcriptsegment_search_idx ON church_transcriptsegment USING GIN (search_vector)",
+]
+
+POSTGRES_FTS_REVERSE = [
+    "DROP INDEX IF EXISTS church_transcriptsegment_search_idx",
+    "ALTER TABLE church_transcriptsegment DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_fts_index(apps, schema_editor):
+    # The full-text index lives outside the ORM; see church/transcripts.py.
+    # Note that a SQLite table rebuild of church_transcriptsegment drops the triggers.
+    _run(schema_editor, {"sqlite": SQLITE_FTS, "postgresql": POSTGRES_FTS})
+
+
+def drop_fts_index(apps, schema_editor):
+    _run(
+        schema_editor,
+        {"sqlite": SQLITE_FTS_REVERSE, "postgresql": POSTGRES_FTS_REVERSE},
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("church", "0005_sermon_ratings"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TranscriptSegment",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("position", models.PositiveIntegerField()),
+                ("start_ms", models.PositiveIntegerField(blank=True, null=True)),
+                ("end_ms", models.PositiveIntegerField(blank=True, null=True)),
+                ("text", models.TextField()),
+                (
+                    "sermon",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="segments",
+                        to="church.sermon",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["sermon", "position"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="transcriptsegment",
+            constraint=models.UniqueConstraint(
+                fields=("sermon", "position"), name="church_segment_unique_position"
+            ),
+        ),
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.2 on 2026-10-18 18:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("church", "0006_transcript_segments"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CueTrack",
+            fields=[
+                (
+                    "sermon",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="cue_track",
+                        serialize=False,
+                        to="church.sermon",
+                    ),
+                ),
+                ("cues", models.JSONField(default=dict)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.2 on 2026-10-18 19:30
+
+from django.db import migrations
+
+# "?ordering=-rating_avg" sorts unrated sermons (NULL) last. A backward scan
+# of church_sermon_rating_idx gives that order on SQLite, which sorts NULLs
+# first; PostgreSQL sorts them last, so it needs an index in the other order.
+POSTGRES_INDEX = (
+    "CREATE INDEX church_sermon_rating_desc_idx "
+    "ON church_sermon (rating_avg DESC NULLS LAST, rating_count DESC)"
+)
+POSTGRES_INDEX_REVERSE = "DROP INDEX IF EXISTS church_sermon_rating_desc_idx"
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(POSTGRES_INDEX)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(POSTGRES_INDEX_REVERSE)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("church", "0007_cue_tracks"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -1,7 +1,11 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator, MinLengthValidator
 from ckeditor_uploader.fields import RichTextUploadingField
+from dirtyfields import DirtyFieldsMixin
+from common.models import RenditionsModel
+from .scripture import BOOK, canonical_book, format_passage, parse_passage, passage_range
 
 User = get_user_model()
 
@@ -36,15 +40,78 @@ class Series(models.Model):
     def __str__(self):
         return self.title
 
+class ScriptureQuerySet(models.QuerySet):
+    def overlapping(self, start, end):
+        """
+        Passages sharing at least one verse with the encoded range
+        ``start``-``end``. Passages never span books, so the scan of the
+        (start, end) index is bounded below by the start of the book.
+        """
+        return self.filter(start__gte=start - start % BOOK, start__lte=end, end__gte=start)
+
+    def passage(self, text):
+        """
+        Passages overlapping a reference such as "John 3" or "Rom 8:28-39".
+        """
+        _, start, end = parse_passage(text)
+        return self.overlapping(start, end)
+
 class Scripture(models.Model):
+    """
+    A passage within one book: ``chapter:verse`` to ``end_chapter:end_verse``.
+    ``start`` and ``end`` encode both ends as book * 1000000 + chapter * 1000
+    + verse, so canonical order is integer order and overlap is a range test.
+    """
     book = models.CharField(max_length=50)
     chapter = models.IntegerField()
-    verse = models.IntegerField()
+    verse = models.IntegerField(blank=True, null=True)  # None for a whole chapter
+    end_chapter = models.IntegerField(blank=True, null=True)
+    end_verse = models.IntegerField(blank=True, null=True)
+    start = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    end = models.PositiveIntegerField(blank=True, null=True, editable=False)
+
+    objects = ScriptureQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['start']
+        constraints = [
+            # One row per passage; its index also serves overlap queries.
+            models.UniqueConstraint(fields=['start', 'end'], name='church_scripture_unique_passage'),
+        ]
 
     def __str__(self):
-        return f"{self.book} {self.chapter}:{self.verse}"
+        if self.start is None:
+            return f"{self.book} {self.chapter}:{self.verse}"
+        return format_passage(self.book, self.start, self.end)
+
+    def normalize(self):
+        """
+        Canonicalize the book name and compute ``start``/``end``; ValueError
+        for an unknown book or a backwards range.
+        """
+        ordinal, self.book = canonical_book(self.book)
+        self.start, self.end = passage_range(ordinal, self.chapter, self.verse, self.end_chapter, self.end_verse)
+
+    def clean(self):
+        # start/end aren't form fields, so forms never check their constraint.
+        try:
+            self.normalize()
+        except ValueError as exc:
+            raise ValidationError(str(exc))
+        if Scripture.objects.filter(start=self.start, end=self.end).exclude(pk=self.pk).exists():
+            raise ValidationError(f"{self} already exists.")
+
+    def save(self, *args, **kwargs):
+        try:
+            self.normalize()
+        except ValueError:
+            # Unrecognized books are kept as entered, outside the index.
+            self.start = self.end = None
+        super().save(*args, **kwargs)
+
+class Sermon(RenditionsModel, DirtyFieldsMixin):
+    FIELDS_TO_CHECK = ['transcript']
 
-class Sermon(models.Model):
     title = models.CharField(max_length=200, verbose_name="Sermon Title")
     description = RichTextUploadingField()  # Using RichTextUploadingField for rich text descriptions
     date = models.DateTimeField()
@@ -55,14 +122,61 @@ class Sermon(models.Model):
     video_file = models.FileField(upload_to='sermons/video/', validators=[FileExtensionValidator(['mp4', 'mkv'])], verbose_name="Video Sermon", blank=True, null=True)
     transcript = models.TextField(blank=True, null=True)  # Store automated transcripts here
     slides = models.FileField(upload_to='sermons/slides/', validators=[FileExtensionValidator(['pdf', 'ppt', 'pptx'])], verbose_name="Slides", blank=True, null=True)
+    media_info = models.JSONField(default=dict, blank=True, editable=False)  # Container details recorded by the media pipeline
+    # Kept current from RatingReview by church.ratings; repaired by recompute_ratings
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_avg = models.FloatField(blank=True, null=True, editable=False)
 
     def __str__(self):
         return self.title
 
     class Meta:
         ordering = ['date']  # Order sermons by date
+        indexes = [
+            models.Index(fields=['rating_avg', 'rating_count'], name='church_sermon_rating_idx'),
+            models.Index(fields=['rating_count'], name='church_sermon_rating_count_idx'),
+        ]
+
+class TranscriptSegment(models.Model):
+    """
+    One stretch of a sermon's transcript, split out of ``Sermon.transcript``
+    by church/transcripts.py. ``start_ms``/``end_ms`` are offsets into the
+    sermon media, or None for untimed transcripts. The full-text index over
+    ``text`` lives outside the ORM (FTS5 on SQLite, tsvector + GIN on
+    PostgreSQL).
+    """
+    sermon = models.ForeignKey(Sermon, on_delete=models.CASCADE, related_name='segments')
+    position = models.PositiveIntegerField()
+    start_ms = models.PositiveIntegerField(blank=True, null=True)
+    end_ms = models.PositiveIntegerField(blank=True, null=True)
+    text = models.TextField()
+
+    class Meta:
+        ordering = ['sermon', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['sermon', 'position'], name='church_segment_unique_position'),
+        ]
+
+    def __str__(self):
+        return f"{self.sermon_id} #{self.position}"
+
+class CueTrack(models.Model):
+    """
+    A sermon's captions as a sorted cue array: ``cues`` holds parallel
+    ``start``/``end`` (ms) and ``text`` lists ordered by start. Derived from
+    the timed lines of ``Sermon.transcript`` by church/transcripts.py.
+    """
+    sermon = models.OneToOneField(Sermon, on_delete=models.CASCADE, primary_key=True, related_name='cue_track')
+    cues = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Cues of {self.sermon_id}"
+
+class RatingReview(models.Model, DirtyFieldsMixin):
+    FIELDS_TO_CHECK = ['sermon', 'rating']
 
-class RatingReview(models.Model):
     sermon = models.ForeignKey(Sermon, on_delete=models.CASCADE, related_name='reviews')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reviews')
     rating = models.PositiveSmallIntegerField()
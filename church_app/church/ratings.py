@@ -0,0 +1,97 @@
+from django.db.models import BooleanField, Case, Count, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Abs, Cast, Coalesce, NullIf
+from django.db.models.signals import post_delete, post_save, pre_save
+from common.models import ResourceVersion
+from .models import RatingReview, Sermon
+
+
+def _average(total, count):
+    # NULL, not a division by zero, once the last rating is gone.
+    return Cast(total, FloatField()) / NullIf(count, 0)
+
+
+def apply_rating(sermon_id, count, total):
+    """
+    Add ``count`` ratings summing to ``total`` (both may be negative) to a
+    sermon's aggregates in one UPDATE computed by the database, so
+    concurrent reviews can't lose each other's changes.
+    """
+    if not count and not total:
+        return
+    Sermon.objects.filter(pk=sermon_id).update(
+        rating_count=F('rating_count') + count,
+        rating_sum=F('rating_sum') + total,
+        rating_avg=_average(F('rating_sum') + total, F('rating_count') + count),
+    )
+    # .update() sends no signals; keep HTTP validators current.
+    ResourceVersion.bump(Sermon)
+
+
+def recompute_ratings(queryset, batch_size=500):
+    """
+    Recompute the rating aggregates of the sermons in ``queryset`` whose
+    stored count, sum or average has drifted from their reviews,
+    ``batch_size`` sermons per UPDATE. Returns the number repaired.
+    """
+    reviews = RatingReview.objects.filter(sermon=OuterRef('pk')).order_by().values('sermon')
+    actual_count = Coalesce(Subquery(reviews.annotate(value=Count('pk')).values('value')), 0)
+    actual_sum = Coalesce(Subquery(reviews.annotate(value=Sum('rating')).values('value')), 0)
+    # The average is NULL without reviews; otherwise it must match the sum
+    # and count (a NULL comparison counts as drifted).
+    in_step = (
+        Q(rating_count=F('actual_count'), rating_sum=F('actual_sum'))
+        & (Q(actual_count=0, rating_avg__isnull=True) | Q(avg_error__lt=1e-9))
+    )
+    drifted = list(
+        queryset.annotate(actual_count=actual_count, actual_sum=actual_sum)
+        .annotate(avg_error=Abs(F('rating_avg') - _average(F('actual_sum'), F('actual_count'))))
+        .annotate(in_step=Case(When(in_step, then=Value(True)), default=Value(False), output_field=BooleanField()))
+        .filter(in_step=False)
+        .values_list('pk', flat=True)
+    )
+    for index in range(0, len(drifted), batch_size):
+        Sermon.objects.filter(pk__in=drifted[index:index + batch_size]).update(
+            rating_count=actual_count,
+            rating_sum=actual_sum,
+            rating_avg=_average(actual_sum, actual_count),
+        )
+    if drifted:
+        ResourceVersion.bump(Sermon)
+    return len(drifted)
+
+
+def _review_saving(sender, instance, raw=False, **kwargs):
+    # The old sermon and rating, while they're still known.
+    if not raw and instance.pk is not None:
+        instance._rating_was = instance.get_dirty_fields(check_relationship=True)
+
+
+def _review_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        # Fixtures carry the sermons' aggregates already.
+        return
+    if created:
+        apply_rating(instance.sermon_id, 1, instance.rating)
+        return
+    was = instance.__dict__.pop('_rating_was', {})
+    old_sermon, old_rating = was.get('sermon', instance.sermon_id), was.get('rating', instance.rating)
+    if old_sermon != instance.sermon_id:
+        apply_rating(old_sermon, -1, -old_rating)
+        apply_rating(instance.sermon_id, 1, instance.rating)
+    else:
+        apply_rating(instance.sermon_id, 0, instance.rating - old_rating)
+
+
+def _review_deleted(sender, instance, **kwargs):
+    apply_rating(instance.sermon_id, -1, -instance.rating)
+
+
+def track():
+    """
+    Keep Sermon.rating_count/rating_sum/rating_avg current as reviews are
+    created, changed and deleted. ``QuerySet.update()`` on ratings bypasses
+    this; run the recompute_ratings command afterwards.
+    """
+    pre_save.connect(_review_saving, sender=RatingReview, dispatch_uid='sermon_ratings')
+    post_save.connect(_review_saved, sender=RatingReview, dispatch_uid='sermon_ratings')
+    post_delete.connect(_review_deleted, sender=RatingReview, dispatch_uid='sermon_ratings')
@@ -0,0 +1,235 @@
+import re
+
+# Canonical (Protestant) book order; a book's ordinal is its index + 1.
+BOOKS = [
+    'Genesis', 'Exodus', 'Leviticus', 'Numbers', 'Deuteronomy', 'Joshua', 'Judges', 'Ruth',
+    '1 Samuel', '2 Samuel', '1 Kings', '2 Kings', '1 Chronicles', '2 Chronicles', 'Ezra',
+    'Nehemiah', 'Esther', 'Job', 'Psalms', 'Proverbs', 'Ecclesiastes', 'Song of Solomon',
+    'Isaiah', 'Jeremiah', 'Lamentations', 'Ezekiel', 'Daniel', 'Hosea', 'Joel', 'Amos',
+    'Obadiah', 'Jonah', 'Micah', 'Nahum', 'Habakkuk', 'Zephaniah', 'Haggai', 'Zechariah',
+    'Malachi', 'Matthew', 'Mark', 'Luke', 'John', 'Acts', 'Romans', '1 Corinthians',
+    '2 Corinthians', 'Galatians', 'Ephesians', 'Philippians', 'Colossians', '1 Thessalonians',
+    '2 Thessalonians', '1 Timothy', '2 Timothy', 'Titus', 'Philemon', 'Hebrews', 'James',
+    '1 Peter', '2 Peter', '1 John', '2 John', '3 John', 'Jude', 'Revelation',
+]
+
+# Common abbreviations and variants, keyed like _key() (numbered books take
+# their prefix separately).
+_ALIASES = {
+    'gen': 'Genesis', 'ge': 'Genesis', 'gn': 'Genesis',
+    'ex': 'Exodus', 'exo': 'Exodus', 'exod': 'Exodus',
+    'lev': 'Leviticus', 'le': 'Leviticus', 'lv': 'Leviticus',
+    'num': 'Numbers', 'nu': 'Numbers', 'nm': 'Numbers',
+    'deut': 'Deuteronomy', 'dt': 'Deuteronomy', 'de': 'Deuteronomy',
+    'josh': 'Joshua', 'jos': 'Joshua', 'judg': 'Judges', 'jdg': 'Judges', 'ru': 'Ruth', 'rth': 'Ruth',
+    'sam': 'Samuel', 'sa': 'Samuel', 'sm': 'Samuel', 'kgs': 'Kings', 'ki': 'Kings', 'kin': 'Kings',
+    'chr': 'Chronicles', 'chron': 'Chronicles', 'ch': 'Chronicles',
+    'ezr': 'Ezra', 'neh': 'Nehemiah', 'ne': 'Nehemiah', 'est': 'Esther', 'esth': 'Esther',
+    'jb': 'Job', 'ps': 'Psalms', 'psa': 'Psalms', 'psalm': 'Psalms', 'pss': 'Psalms',
+    'prov': 'Proverbs', 'pr': 'Proverbs', 'prv': 'Proverbs',
+    'eccl': 'Ecclesiastes', 'ecc': 'Ecclesiastes', 'eccles': 'Ecclesiastes', 'qoh': 'Ecclesiastes',
+    'song': 'Song of Solomon', 'sos': 'Song of Solomon', 'songofsongs': 'Song of Solomon',
+    'canticles': 'Song of Solomon', 'isa': 'Isaiah', 'is': 'Isaiah',
+    'jer': 'Jeremiah', 'je': 'Jeremiah', 'lam': 'Lamentations', 'la': 'Lamentations',
+    'ezek': 'Ezekiel', 'eze': 'Ezekiel', 'ezk': 'Ezekiel', 'dan': 'Daniel', 'da': 'Daniel', 'dn': 'Daniel',
+    'hos': 'Hosea', 'ho': 'Hosea', 'jl': 'Joel', 'am': 'Amos', 'obad': 'Obadiah', 'ob': 'Obadiah',
+    'jon': 'Jonah', 'jnh': 'Jonah', 'mic': 'Micah', 'mi': 'Micah', 'nah': 'Nahum', 'na': 'Nahum',
+    'hab': 'Habakkuk', 'zeph': 'Zephaniah', 'zep': 'Zephaniah', 'hag': 'Haggai', 'hg': 'Haggai',
+    'zech': 'Zechariah', 'zec': 'Zechariah', 'mal': 'Malachi', 'ml': 'Malachi',
+    'matt': 'Matthew', 'mt': 'Matthew', 'mat': 'Matthew', 'mk': 'Mark', 'mr': 'Mark', 'mrk': 'Mark',
+    'lk': 'Luke', 'lu': 'Luke', 'jn': 'John', 'jhn': 'John', 'joh': 'John',
+    'ac': 'Acts', 'act': 'Acts', 'rom': 'Romans', 'ro': 'Romans', 'rm': 'Romans',
+    'cor': 'Corinthians', 'co': 'Corinthians', 'gal': 'Galatians', 'ga': 'Galatians',
+    'eph': 'Ephesians', 'ephes': 'Ephesians', 'phil': 'Philippians', 'php': 'Philippians', 'pp': 'Philippians',
+    'col': 'Colossians', 'thess': 'Thessalonians', 'thes': 'Thessalonians', 'th': 'Thessalonians',
+    'tim': 'Timothy', 'ti': 'Timothy', 'tit': 'Titus', 'phlm': 'Philemon', 'philem': 'Philemon', 'phm': 'Philemon',
+    'heb': 'Hebrews', 'jas': 'James', 'jm': 'James', 'pet': 'Peter', 'pe': 'Peter', 'pt': 'Peter',
+    'jud': 'Jude', 'jd': 'Jude', 'rev': 'Revelation', 're': 'Revelation', 'revelations': 'Revelation',
+}
+
+_ROMAN = {'i': '1', 'ii': '2', 'iii': '3', 'first': '1', 'second': '2', 'third': '3'}
+
+# Encoded reference: book * BOOK + chapter * CHAPTER + verse. Chapters and
+# verses stay well below 1000, so integer order is canonical reading order.
+BOOK = 1_000_000
+CHAPTER = 1_000
+LAST = CHAPTER - 1  # "to the end of the chapter"
+MAX_NUMBER = LAST - 1  # highest chapter or verse a passage can name
+
+_numbered_re = re.compile(r'^(?:([123])\s*|(i{1,3}|first|second|third)\s+)(.+)$')
+_passage_re = re.compile(
+    r'^\s*(?P<book>(?:[123]\s*)?[^\d:]+?)\.?\s*'
+    r'(?:(?P<chapter>\d+)(?::(?P<verse>\d+))?'
+    r'(?:\s*[-–—]\s*(?:(?P<end_a>\d+)(?::(?P<end_b>\d+))?))?)?\s*$'
+)
+
+
+def _key(name):
+    return re.sub(r'[\s.]+', '', name.lower())
+
+
+def _build_lookup():
+    lookup = {}
+    for name in BOOKS:
+        lookup[_key(name)] = name
+    for alias, name in _ALIASES.items():
+        if name in BOOKS:
+            lookup.setdefault(alias, name)
+        # Numbered books: 'sam' -> '1 Samuel', 'jn' -> '1 John' with a prefix.
+        for number in '123':
+            if f'{number} {name}' in BOOKS:
+                lookup.setdefault(number + alias, f'{number} {name}')
+                lookup.setdefault(number + _key(name), f'{number} {name}')
+    return lookup
+
+
+_lookup = _build_lookup()
+
+
+def canonical_book(name):
+    """
+    ``(ordinal, canonical name)`` for a book name or common abbreviation
+    ("Jn", "1 Cor", "II Kings"); ValueError if it isn't one.
+    """
+    text = ' '.join(name.lower().replace('.', ' ').split())
+    match = _numbered_re.match(text)
+    if match:
+        digit, word, rest = match.groups()
+        text = (digit or _ROMAN[word]) + rest
+    found = _lookup.get(_key(text))
+    if found is None:
+        raise ValueError(f"Unknown book: {name!r}")
+    return BOOKS.index(found) + 1, found
+
+
+def encode(ordinal, chapter=0, verse=0):
+    return ordinal * BOOK + chapter * CHAPTER + verse
+
+
+def decode(value):
+    """
+    ``(ordinal, chapter, verse)`` of an encoded reference.
+    """
+    ordinal, rest = divmod(value, BOOK)
+    return (ordinal, *divmod(rest, CHAPTER))
+
+
+def book_range(ordinal):
+    """
+    The ``(start, end)`` codes spanning a whole book.
+    """
+    return encode(ordinal), encode(ordinal, LAST, LAST)
+
+
+def passage_range(ordinal, chapter, verse=None, end_chapter=None, end_verse=None):
+    """
+    ``(start, end)`` codes of a passage within one book. A missing verse
+    means the whole chapter; ``end_chapter`` without ``end_verse`` runs to
+    the end of that chapter.
+    """
+    for number in (chapter, verse, end_chapter, end_verse):
+        # Anything larger would spill into the next chapter or book.
+        if number is not None and not 1 <= number <= MAX_NUMBER:
+            raise ValueError(f"Chapters and verses run from 1 to {MAX_NUMBER}, not {number}.")
+    start = encode(ordinal, chapter, verse or 0)
+    if end_chapter is None and end_verse is None:
+        end = encode(ordinal, chapter, verse if verse else LAST)
+    else:
+        end_chapter = chapter if end_chapter is None else end_chapter
+        end = encode(ordinal, end_chapter, LAST if end_verse is None else end_verse)
+    if end < start:
+        raise ValueError("A passage can't end before it starts.")
+    return start, end
+
+
+def parse_passage(text):
+    """
+    Parse a reference such as "John 3", "Romans 8:28-39", "Jn 3:16-4:2",
+    "Ps 23-24" or just "Jude" into ``(canonical book, start, end)``.
+    """
+    match = _passage_re.match(text or '')
+    if not match:
+        raise ValueError(f"Not a scripture reference: {text!r}")
+    ordinal, book = canonical_book(match['book'])
+    if match['chapter'] is None:
+        return (book, *book_range(ordinal))
+    chapter = int(match['chapter'])
+    verse = int(match['verse']) if match['verse'] else None
+    end_chapter = end_verse = None
+    if match['end_b'] is not None:
+        # 3:16-4:2
+        end_chapter, end_verse = int(match['end_a']), int(match['end_b'])
+    elif match['end_a'] is not None:
+        # 8:28-39 ends at a verse; 23-24 ends at a chapter
+        if verse is None:
+            end_chapter = int(match['end_a'])
+        else:
+            end_verse = int(match['end_a'])
+    return (book, *passage_range(ordinal, chapter, verse, end_chapter, end_verse))
+
+
+def format_passage(book, start, end):
+    _, chapter, verse = decode(start)
+    _, end_chapter, end_verse = decode(end)
+    if (start, end) == book_range(decode(start)[0]):
+        return book
+    first = f'{chapter}:{verse}' if verse else f'{chapter}'
+    if start == end:
+        return f'{book} {first}'
+    if end_chapter == chapter and end_verse == LAST and not verse:
+        return f'{book} {chapter}'
+    if end_chapter == chapter and end_verse != LAST:
+        return f'{book} {first}-{end_verse}'
+    last = f'{end_chapter}' if end_verse == LAST else f'{end_chapter}:{end_verse}'
+    return f'{book} {first}-{last}'
+
+
+def normalize_scriptures(scripture_model, through_model, batch_size=500):
+    """
+    Bring every ``scripture_model`` row to its canonical book name and range
+    codes, then merge rows for the same passage into the oldest one, moving
+    their sermon links over. Returns ``(updated, merged, unknown)`` counts.
+    """
+    rows = []
+    unknown = 0
+    for row in scripture_model.objects.order_by('pk').iterator(chunk_size=2000):
+        try:
+            ordinal, book = canonical_book(row.book)
+            start, end = passage_range(ordinal, row.chapter, row.verse, row.end_chapter, row.end_verse)
+        except ValueError:
+            unknown += 1
+            continue
+        if (row.book, row.start, row.end) != (book, start, end):
+            row.book, row.start, row.end = book, start, end
+            rows.append(row)
+
+    # Duplicates must go before the new codes land, or they'd collide on
+    # the unique constraint; work out the survivors first.
+    survivors = {}
+    losers = {}
+    codes = {row.pk: (row.start, row.end) for row in rows}
+    for pk, start, end in scripture_model.objects.order_by('pk').values_list('pk', 'start', 'end').iterator(chunk_size=2000):
+        key = codes.get(pk, (start, end))
+        if key[0] is None:
+            continue
+        if key in survivors:
+            losers[pk] = survivors[key]
+        else:
+            survivors[key] = pk
+
+    loser_ids = list(losers)
+    for index in range(0, len(loser_ids), batch_size):
+        batch = loser_ids[index:index + batch_size]
+        links = through_model.objects.filter(scripture_id__in=batch).values_list('sermon_id', 'scripture_id')
+        through_model.objects.bulk_create(
+            [through_model(sermon_id=sermon_id, scripture_id=losers[scripture_id]) for sermon_id, scripture_id in links],
+            ignore_conflicts=True, batch_size=batch_size,
+        )
+        scripture_model.objects.filter(pk__in=batch).delete()
+    kept = [row for row in rows if row.pk not in losers]
+    # Clear the old codes first so rows trading codes don't collide mid-update.
+    for index in range(0, len(kept), batch_size):
+        batch = [row.pk for row in kept[index:index + batch_size]]
+        scripture_model.objects.filter(pk__in=batch).update(start=None, end=None)
+    scripture_model.objects.bulk_update(kept, ['book', 'start', 'end'], batch_size=batch_size)
+    return len(kept), len(loser_ids), unknown
@@ -4,6 +4,9 @@ from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.db.models import Q
+from rest_framework.reverse import reverse
+from common.serializers import RenditionURLMixin
+from common.serving import file_version
 
 User = get_user_model()
 
@@ -13,9 +16,23 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email']
 
 class ScriptureSerializer(serializers.ModelSerializer):
+    reference = serializers.CharField(source='__str__', read_only=True)
+
     class Meta:
         model = Scripture
-        fields = ['id', 'book', 'chapter', 'verse']
+        fields = ['id', 'book', 'chapter', 'verse', 'end_chapter', 'end_verse', 'start', 'end', 'reference']
+        read_only_fields = ('id', 'start', 'end', 'reference')
+
+    def validate(self, data):
+        passage = Scripture(**{**({} if self.instance is None else {
+            name: getattr(self.instance, name) for name in ('pk', 'book', 'chapter', 'verse', 'end_chapter', 'end_verse')
+        }), **data})
+        try:
+            passage.clean()
+        except ValidationError as exc:
+            raise serializers.ValidationError(exc.messages)
+        data['book'] = passage.book
+        return data
 
 class SeriesSerializer(serializers.ModelSerializer):
     class Meta:
@@ -24,12 +41,18 @@ class SeriesSerializer(serializers.ModelSerializer):
 
 class EventSerializer(serializers.ModelSerializer):
     organizer = UserSerializer(read_only=True)
-    attendees = UserSerializer(many=True, read_only=True)
+    # Attendees themselves are paged at /events/{id}/attendees/
+    attendee_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Event
-        fields = ['id', 'title', 'description', 'date', 'location', 'organizer', 'attendees', 'status']
-        read_only_fields = ('id', 'organizer', 'attendees')
+        fields = ['id', 'title', 'description', 'date', 'location', 'organizer', 'attendee_count', 'status']
+        read_only_fields = ('id', 'organizer', 'attendee_count')
+
+    def get_attendee_count(self, obj):
+        # Annotated by EventViewSet; counted here only for freshly saved events.
+        count = getattr(obj, 'attendee_count', None)
+        return obj.attendees.count() if count is None else count
 
     def create(self, validated_data):
         request = self.context.get('request')
@@ -53,15 +76,48 @@ class EventSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Event start date must be before end date")
         return attrs
 
-class SermonSerializer(serializers.ModelSerializer):
+class RSVPSerializer(serializers.Serializer):
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=10000,
+    )
+
+
+class SermonSerializer(RenditionURLMixin, serializers.ModelSerializer):
     speaker = UserSerializer(read_only=True)
     series = SeriesSerializer(read_only=True)
     scriptures = ScriptureSerializer(many=True, read_only=True)
+    poster = serializers.SerializerMethodField()
+    scrub_sprite = serializers.SerializerMethodField()
+    waveform = serializers.SerializerMethodField()
 
     class Meta:
         model = Sermon
-        fields = ['id', 'title', 'description', 'date', 'speaker', 'series', 'scriptures', 'audio_file', 'video_file', 'transcript', 'slides']
-        read_only_fields = ('id', 'speaker', 'series', 'scriptures')
+        fields = ['id', 'title', 'description', 'date', 'speaker', 'series', 'scriptures', 'audio_file', 'video_file', 'poster', 'scrub_sprite', 'waveform', 'media_info', 'transcript', 'slides', 'rating_count', 'rating_avg']
+        read_only_fields = ('id', 'speaker', 'series', 'scriptures', 'media_info', 'rating_count', 'rating_avg')
+
+    def get_poster(self, obj):
+        return self.rendition_url(obj, 'poster')
+
+    def get_scrub_sprite(self, obj):
+        return self.rendition_data(obj, 'sprite')
+
+    def get_waveform(self, obj):
+        levels = sorted(
+            (rendition for key, rendition in obj.renditions.items() if key.startswith('waveform_')),
+            key=lambda rendition: rendition['samples_per_pixel'],
+        )
+        if not levels:
+            return []
+        url = reverse('sermon-waveform', args=[obj.pk], request=self.context.get('request'))
+        return [
+            {
+                'samples_per_pixel': rendition['samples_per_pixel'],
+                'sample_rate': rendition['sample_rate'],
+                'length': rendition['length'],
+                'url': f"{url}?samples_per_pixel={rendition['samples_per_pixel']}&v={file_version(rendition)}",
+            }
+            for rendition in levels
+        ]
 
     def create(self, validated_data):
         request = self.context.get('request')
@@ -1,3 +1,304 @@
-from django.test import TestCase
+import random
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.forms import modelform_factory
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from . import transcripts
+from .captions import CueArray, parse_captions, to_srt, to_webvtt
+from .models import Event, RatingReview, Scripture, Sermon, TranscriptSegment
+from .ratings import recompute_ratings
+from .serializers import ScriptureSerializer
+from .scripture import LAST, canonical_book, encode, format_passage, parse_passage, passage_range
 
-# Create your tests here.
+
+class CanonicalBookTests(SimpleTestCase):
+    def test_names_and_abbreviations(self):
+        for name, expected in [
+            ('John', (43, 'John')),
+            ('jn', (43, 'John')),
+            ('1 Jn', (62, '1 John')),
+            ('1jn', (62, '1 John')),
+            ('I John', (62, '1 John')),
+            ('II Kings', (12, '2 Kings')),
+            ('First Corinthians', (46, '1 Corinthians')),
+            ('Isaiah', (23, 'Isaiah')),
+            ('Ps.', (19, 'Psalms')),
+            ('Song of Songs', (22, 'Song of Solomon')),
+        ]:
+            with self.subTest(name=name):
+                self.assertEqual(canonical_book(name), expected)
+
+    def test_unknown_book(self):
+        with self.assertRaises(ValueError):
+            canonical_book('Hezekiah')
+
+
+class PassageRangeTests(SimpleTestCase):
+    def test_verse_chapter_and_ranges(self):
+        self.assertEqual(passage_range(43, 3, 16), (encode(43, 3, 16), encode(43, 3, 16)))
+        self.assertEqual(passage_range(43, 3), (encode(43, 3), encode(43, 3, LAST)))
+        self.assertEqual(passage_range(45, 8, 28, end_verse=39), (encode(45, 8, 28), encode(45, 8, 39)))
+        self.assertEqual(passage_range(43, 3, 16, 4, 2), (encode(43, 3, 16), encode(43, 4, 2)))
+        self.assertEqual(passage_range(19, 23, end_chapter=24), (encode(19, 23), encode(19, 24, LAST)))
+
+    def test_backwards_range(self):
+        with self.assertRaises(ValueError):
+            passage_range(45, 8, 39, end_verse=28)
+        with self.assertRaises(ValueError):
+            passage_range(43, 4, 2, 3, 16)
+
+    def test_numbers_out_of_range(self):
+        # 3:1500 would otherwise encode as 4:500.
+        for args in [(43, 3, 1500), (43, 1000), (43, 0), (43, 3, 0), (43, 3, 1, 1000), (43, 3, 1, None, LAST)]:
+            with self.subTest(args=args), self.assertRaises(ValueError):
+                passage_range(*args)
+
+
+class ParsePassageTests(SimpleTestCase):
+    def test_references(self):
+        for text, expected in [
+            ('John 3:16', ('John', encode(43, 3, 16), encode(43, 3, 16))),
+            ('John 3', ('John', encode(43, 3), encode(43, 3, LAST))),
+            ('Rom 8:28-39', ('Romans', encode(45, 8, 28), encode(45, 8, 39))),
+            ('Jn 3:16-4:2', ('John', encode(43, 3, 16), encode(43, 4, 2))),
+            ('Ps 23-24', ('Psalms', encode(19, 23), encode(19, 24, LAST))),
+            ('1 Cor. 13', ('1 Corinthians', encode(46, 13), encode(46, 13, LAST))),
+            ('Jude', ('Jude', encode(65), encode(65, LAST, LAST))),
+            ('  rev 22:1 – 5 ', ('Revelation', encode(66, 22, 1), encode(66, 22, 5))),
+        ]:
+            with self.subTest(text=text):
+                self.assertEqual(parse_passage(text), expected)
+
+    def test_invalid_references(self):
+        for text in ('', '3:16', 'Hezekiah 1', 'John 3:16-2', 'John 3:1500', 'John 1000'):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                parse_passage(text)
+
+    def test_format_round_trip(self):
+        for text in ('John 3:16', 'John 3', 'Romans 8:28-39', 'John 3:16-4:2', 'Psalms 23-24', 'Jude'):
+            with self.subTest(text=text):
+                self.assertEqual(format_passage(*parse_passage(text)), text)
+
+
+class OverlappingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.passages = {
+            text: Scripture.objects.create(book=book, chapter=chapter, verse=verse, end_chapter=end_chapter, end_verse=end_verse)
+            for text, (book, chapter, verse, end_chapter, end_verse) in {
+                'John 3:16': ('John', 3, 16, None, None),
+                'John 3': ('jn', 3, None, None, None),
+                'John 2:23-3:2': ('John', 2, 23, 3, 2),
+                'John 4': ('John', 4, None, None, None),
+                'Acts 3:16': ('Acts', 3, 16, None, None),
+                '1 John 3:16': ('1 Jn', 3, 16, None, None),
+            }.items()
+        }
+
+    def overlapping(self, text):
+        return set(Scripture.objects.passage(text).values_list('pk', flat=True))
+
+    def expected(self, *texts):
+        return {self.passages[text].pk for text in texts}
+
+    def test_verse(self):
+        self.assertEqual(self.overlapping('John 3:16'), self.expected('John 3:16', 'John 3'))
+
+    def test_ranges_touching_at_one_verse(self):
+        self.assertEqual(self.overlapping('John 3:2-10'), self.expected('John 3', 'John 2:23-3:2'))
+        self.assertEqual(self.overlapping('John 2:1-22'), set())
+
+    def test_whole_book_stays_in_its_book(self):
+        self.assertEqual(self.overlapping('John'), self.expected('John 3:16', 'John 3', 'John 2:23-3:2', 'John 4'))
+        self.assertEqual(self.overlapping('1 John'), self.expected('1 John 3:16'))
+
+    def test_serializer_rejects_overflowing_verses_and_duplicates(self):
+        serializer = ScriptureSerializer(data={'book': 'John', 'chapter': 3, 'verse': 1500})
+        self.assertFalse(serializer.is_valid())
+        serializer = ScriptureSerializer(data={'book': 'jn', 'chapter': 3, 'verse': 16})
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['non_field_errors'], ['John 3:16 already exists.'])
+        serializer = ScriptureSerializer(self.passages['John 3:16'], data={'verse': 16}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_form_checks_the_passage_is_unique(self):
+        # The admin's form: start and end aren't fields on it.
+        form_class = modelform_factory(Scripture, fields=['book', 'chapter', 'verse', 'end_chapter', 'end_verse'])
+        form = form_class(data={'book': 'Jn', 'chapter': 3, 'verse': 16})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.non_field_errors(), ['John 3:16 already exists.'])
+        form = form_class(data={'book': 'John', 'chapter': 3, 'verse': 17})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(str(form.save()), 'John 3:17')
+
+    def test_unknown_books_are_left_out(self):
+        Scripture.objects.create(book='Hezekiah', chapter=3, verse=16)
+        self.assertEqual(self.overlapping('John 3:16'), self.expected('John 3:16', 'John 3'))
+
+
+class CueArrayTests(SimpleTestCase):
+    def cue_array(self, cues):
+        cues = sorted(cues)
+        return CueArray([start for start, _, _ in cues], [end for _, end, _ in cues], [text for _, _, text in cues])
+
+    def test_window_matches_brute_force(self):
+        rng = random.Random(25)
+        cues = []
+        for i in range(2000):
+            start = rng.randrange(0, 3_600_000)
+            # Mostly short cues, with some long ones overlapping many others.
+            cues.append((start, start + rng.choice([rng.randrange(1, 5000), rng.randrange(1, 600_000)]), f'cue {i}'))
+        track = self.cue_array(cues)
+        for _ in range(500):
+            start = rng.randrange(-10_000, 3_700_000)
+            end = start + rng.randrange(0, 120_000)
+            expected = sorted(cue for cue in cues if cue[0] <= end and cue[1] > start)
+            self.assertEqual(sorted(track.window(start, end)), expected)
+
+    def test_window_edges(self):
+        track = self.cue_array([(1000, 2000, 'a'), (2000, 3000, 'b'), (2500, 9000, 'c')])
+        # A cue is showing from its start up to, not including, its end.
+        self.assertEqual(track.window(2000, 2000), [(2000, 3000, 'b')])
+        self.assertEqual(track.window(0, 999), [])
+        self.assertEqual(track.window(0, 1000), [(1000, 2000, 'a')])
+        self.assertEqual(track.window(5000, 6000), [(2500, 9000, 'c')])
+        self.assertEqual(track.window(9000, 10_000), [])
+        self.assertEqual(self.cue_array([]).window(0, 1000), [])
+
+    def test_next_start(self):
+        track = self.cue_array([(1000, 2000, 'a'), (2500, 3000, 'b')])
+        self.assertEqual(track.next_start(0), 1000)
+        self.assertEqual(track.next_start(1000), 2500)
+        self.assertIsNone(track.next_start(2500))
+
+
+class CaptionFormatTests(SimpleTestCase):
+    def test_webvtt_and_srt_round_trip(self):
+        cues = [(0, 1500, 'In the beginning'), (61_000, 3_725_250, 'was the Word & the Word')]
+        self.assertEqual(parse_captions(to_webvtt(cues)), cues)
+        self.assertEqual(parse_captions(to_srt(cues)), cues)
+
+    def test_webvtt_escapes_markup(self):
+        # SRT has no escapes, so only WebVTT keeps a literal "<".
+        cues = [(0, 1500, 'a <b> c & d')]
+        self.assertEqual(parse_captions(to_webvtt(cues)), cues)
+
+
+class TranscriptSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        speaker = get_user_model().objects.create(username='preacher')
+        sermon = Sermon.objects.create(title='Grace', description='', date=timezone.now(), speaker=speaker)
+        segments = TranscriptSegment.objects.bulk_create([
+            # Every third segment says it three times and ranks higher.
+            TranscriptSegment(sermon=sermon, position=i, text='grace grace grace' if i % 3 == 0 else f'amazing grace {i}')
+            for i in range(30)
+        ])
+        cls.ids = [segment.pk for segment in segments]
+        TranscriptSegment.objects.create(sermon=sermon, position=30, text='nothing to see here')
+
+    def walk(self, size):
+        seen = []
+        for offset in range(0, 40, size):
+            seen += [pk for pk, _ in transcripts.search_segments('grace', size, offset)]
+        return seen
+
+    def test_older_matches_follow_the_ranked_window(self):
+        with mock.patch.object(transcripts, 'MAX_RANKED_HITS', 10):
+            for size in (1, 4, 7, 10, 40):
+                with self.subTest(size=size):
+                    seen = self.walk(size)
+                    newest = sorted(self.ids, reverse=True)
+                    self.assertEqual(sorted(seen[:10]), sorted(newest[:10]))
+                    self.assertEqual(seen[10:], newest[10:])
+                    ranked = TranscriptSegment.objects.in_bulk(seen[:10])
+                    strong = [pk for pk in seen[:10] if ranked[pk].text == 'grace grace grace']
+                    self.assertEqual(seen[:len(strong)], strong)
+
+    def test_small_result_is_ranked_whole(self):
+        hits = transcripts.search_segments('grace', 40)
+        self.assertEqual(sorted(pk for pk, _ in hits), sorted(self.ids))
+        self.assertIn('<mark>grace</mark>', hits[0][1])
+        self.assertEqual(transcripts.search_segments('grace', 10, 30), [])
+
+
+class RatingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.users = [User.objects.create(username=f'listener{i}') for i in range(3)]
+        speaker = User.objects.create(username='speaker')
+        cls.sermon, cls.other = (
+            Sermon.objects.create(title=title, description='', date=timezone.now(), speaker=speaker)
+            for title in ('Rated', 'Unrated')
+        )
+
+    def aggregates(self, sermon):
+        sermon.refresh_from_db()
+        return sermon.rating_count, sermon.rating_sum, sermon.rating_avg
+
+    def test_reviews_keep_aggregates_current(self):
+        first = RatingReview.objects.create(sermon=self.sermon, user=self.users[0], rating=5)
+        RatingReview.objects.create(sermon=self.sermon, user=self.users[1], rating=2)
+        self.assertEqual(self.aggregates(self.sermon), (2, 7, 3.5))
+        first.rating = 3
+        first.save()
+        self.assertEqual(self.aggregates(self.sermon), (2, 5, 2.5))
+        first.sermon = self.other
+        first.save()
+        self.assertEqual(self.aggregates(self.sermon), (1, 2, 2.0))
+        self.assertEqual(self.aggregates(self.other), (1, 3, 3.0))
+        first.delete()
+        self.assertEqual(self.aggregates(self.other), (0, 0, None))
+
+    def test_recompute_repairs_any_drifted_aggregate(self):
+        RatingReview.objects.create(sermon=self.sermon, user=self.users[0], rating=4)
+        RatingReview.objects.create(sermon=self.sermon, user=self.users[1], rating=1)
+        self.assertEqual(recompute_ratings(Sermon.objects.all()), 0)
+        for drift in [{'rating_avg': 4.0}, {'rating_avg': None}, {'rating_count': 7}, {'rating_sum': 0}]:
+            with self.subTest(drift=drift):
+                Sermon.objects.filter(pk=self.sermon.pk).update(**drift)
+                self.assertEqual(recompute_ratings(Sermon.objects.all()), 1)
+                self.assertEqual(self.aggregates(self.sermon), (2, 5, 2.5))
+        Sermon.objects.filter(pk=self.other.pk).update(rating_avg=3.0)
+        self.assertEqual(recompute_ratings(Sermon.objects.all()), 1)
+        self.assertEqual(self.aggregates(self.other), (0, 0, None))
+
+
+class RSVPTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer, cls.member, cls.guest = (get_user_model().objects.create(username=name) for name in ('organizer', 'member', 'guest'))
+        cls.event = Event.objects.create(title='Picnic', description='', date=timezone.now(), location='Park', organizer=cls.organizer)
+
+    def post(self, user, action, data=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post(f'/events/{self.event.pk}/{action}/', data or {}, format='json')
+
+    def test_repeating_an_rsvp_adds_nothing(self):
+        response = self.post(self.member, 'rsvp')
+        self.assertEqual(response.data, {'added': 1, 'attendee_count': 1})
+        response = self.post(self.member, 'rsvp')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'added': 0, 'attendee_count': 1})
+
+    def test_organizer_rsvps_others(self):
+        response = self.post(self.organizer, 'rsvp', {'user_ids': [self.member.pk, self.guest.pk, 10 ** 6]})
+        self.assertEqual(response.data, {'added': 2, 'attendee_count': 2})
+        response = self.post(self.organizer, 'unrsvp', {'user_ids': [self.guest.pk]})
+        self.assertEqual(response.data, {'removed': 1, 'attendee_count': 1})
+        self.assertEqual(list(self.event.attendees.all()), [self.member])
+
+    def test_members_cannot_rsvp_others(self):
+        for action in ('rsvp', 'unrsvp'):
+            with self.subTest(action=action):
+                response = self.post(self.member, action, {'user_ids': [self.member.pk, self.guest.pk]})
+                self.assertEqual(response.status_code, 403)
+        self.assertFalse(self.event.attendees.exists())
+
+    def test_anonymous_rsvp_is_refused(self):
+        response = APIClient().post(f'/events/{self.event.pk}/rsvp/')
+        self.assertIn(response.status_code, (401, 403))
@@ -0,0 +1,218 @@
+import html
+import logging
+import re
+from django.db import DatabaseError, connection, transaction
+from django.db.models.signals import post_save, pre_save
+from common.models import ResourceVersion
+from common.search import fts5_query
+from .captions import TIMESTAMP, parse_timestamp, store_cues
+from .models import Sermon, TranscriptSegment
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'church_transcriptsegment_fts'
+
+# Untimed text is cut into segments of about this many words, so a hit
+# points at a paragraph rather than a whole sermon.
+MAX_SEGMENT_WORDS = 80
+
+# Matches ranked per query; see search_segments().
+MAX_RANKED_HITS = 5000
+
+# Words of context around the matches in a snippet.
+SNIPPET_WORDS = 24
+
+# Match markers handed to the database, turned into <mark> after escaping.
+_START, _STOP = '\x02', '\x03'
+
+# "[01:02:03]", "01:02:03.5", "12:34 -", "(12:34)" or, with an end time,
+# "[00:01:02.500 --> 00:01:05.000]" at the start of a line.
+_timestamp_re = re.compile(rf'^\s*[\[(]?({TIMESTAMP})(?:\s*-->\s*({TIMESTAMP}))?[\])]?\s*[-–—:]?\s*')
+
+
+def _chunks(words):
+    for start in range(0, len(words), MAX_SEGMENT_WORDS):
+        yield ' '.join(words[start:start + MAX_SEGMENT_WORDS])
+
+
+def split_transcript(text):
+    """
+    ``[(start_ms, end_ms, text)]`` for a transcript. Lines starting with a
+    timestamp begin a new timed segment, which runs until its end time or
+    else the next one; without timestamps, paragraphs (cut to
+    MAX_SEGMENT_WORDS) get no offsets.
+    """
+    timed = []
+    untimed = []
+    for line in (text or '').splitlines():
+        match = _timestamp_re.match(line)
+        if match:
+            end = parse_timestamp(match.group(2)) if match.group(2) else None
+            timed.append([parse_timestamp(match.group(1)), end, line[match.end():].split()])
+        elif timed:
+            timed[-1][2].extend(line.split())
+        else:
+            # Paragraphs before any timestamp
+            untimed.append(line.split())
+    segments = []
+    paragraph = []
+    for words in untimed + [[]]:
+        if words:
+            paragraph.extend(words)
+        elif paragraph:
+            segments.extend((None, None, chunk) for chunk in _chunks(paragraph))
+            paragraph = []
+    for index, (start, end, words) in enumerate(timed):
+        if end is None and index + 1 < len(timed):
+            end = timed[index + 1][0]
+        if words:
+            segments.append((start, end, ' '.join(words)))
+    return segments
+
+
+def index_transcript(sermon):
+    """
+    Replace the segments and cue track of ``sermon`` with those of its
+    current transcript.
+    """
+    parts = split_transcript(sermon.transcript)
+    segments = [
+        TranscriptSegment(sermon=sermon, position=position, start_ms=start, end_ms=end, text=text)
+        for position, (start, end, text) in enumerate(parts)
+    ]
+    with transaction.atomic():
+        TranscriptSegment.objects.filter(sermon=sermon).delete()
+        TranscriptSegment.objects.bulk_create(segments, batch_size=500)
+        store_cues(sermon, parts)
+        # bulk_create sends no signals; keep HTTP validators current.
+        ResourceVersion.bump(TranscriptSegment)
+    return len(segments)
+
+
+def _highlight(snippet):
+    return html.escape(snippet).replace(_START, '<mark>').replace(_STOP, '</mark>')
+
+
+def _plain_snippet(text, query):
+    # Fallback for databases without full-text search.
+    index = text.lower().find(query.lower())
+    if index < 0:
+        return html.escape(text[:200])
+    start = max(index - 100, 0)
+    end = index + len(query)
+    return (
+        ('…' if start else '') + html.escape(text[start:index]) + '<mark>' + html.escape(text[index:end])
+        + '</mark>' + html.escape(text[end:end + 100]) + ('…' if end + 100 < len(text) else '')
+    )
+
+
+# The newest MAX_RANKED_HITS matches of a query: their lowest id and how
+# many there are. Walking ids newest first is cheap, unlike ranking.
+_SQLITE_WINDOW = (
+    f"SELECT min(rowid), count(*) FROM (SELECT rowid FROM {FTS_TABLE} "
+    f"WHERE {FTS_TABLE} MATCH %s ORDER BY rowid DESC LIMIT %s)"
+)
+_POSTGRES_WINDOW = (
+    "SELECT min(id), count(*) FROM (SELECT id FROM church_transcriptsegment "
+    "WHERE search_vector @@ websearch_to_tsquery('english', %s) ORDER BY id DESC LIMIT %s) recent"
+)
+
+# A page of hits on one side of that lowest id, with snippets built for the
+# page only: CROSS JOIN keeps SQLite from rescanning the match, and
+# ts_headline reparses the text. {position} orders the page, {order} is the
+# same order in a form the database can walk.
+_SQLITE_PAGE = (
+    f"WITH hits AS (SELECT rowid, {{position}} AS position FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+    f"AND rowid {{bound}} %s ORDER BY {{order}} LIMIT %s OFFSET %s) "
+    f"SELECT f.rowid, snippet({FTS_TABLE}, 0, %s, %s, '…', %s) FROM hits CROSS JOIN {FTS_TABLE} f "
+    f"WHERE f.rowid = hits.rowid AND {FTS_TABLE} MATCH %s ORDER BY hits.position"
+)
+_POSTGRES_PAGE = (
+    "SELECT id, ts_headline('english', text, q, %s) FROM ("
+    "SELECT id, text, q, {position} AS position "
+    "FROM church_transcriptsegment, websearch_to_tsquery('english', %s) q "
+    "WHERE search_vector @@ q AND id {bound} %s ORDER BY {order} LIMIT %s OFFSET %s) hits ORDER BY position"
+)
+
+
+def search_segments(query, limit=20, offset=0):
+    """
+    Transcript segments matching ``query``: ``[(segment id, snippet html)]``.
+    The snippet is HTML-escaped with the matched words in ``<mark>``. Same
+    query syntax as common.search.
+
+    Ranking scores every hit, so a word found in most segments would be
+    slow to rank: the newest MAX_RANKED_HITS matches come first, best first,
+    and every older match follows them, newest first.
+    """
+    if connection.vendor == 'sqlite':
+        match = fts5_query(query)
+        if not match:
+            return []
+        window, template = _SQLITE_WINDOW, _SQLITE_PAGE
+        window_params = [match, MAX_RANKED_HITS]
+        ranked = {'position': 'rank', 'order': 'rank'}
+        older = {'position': '-rowid', 'order': 'rowid DESC'}
+
+        def page_params(low, page_limit, page_offset):
+            return [match, low, page_limit, page_offset, _START, _STOP, SNIPPET_WORDS, match]
+    elif connection.vendor == 'postgresql':
+        window, template = _POSTGRES_WINDOW, _POSTGRES_PAGE
+        window_params = [query, MAX_RANKED_HITS]
+        ranked = {'position': '-ts_rank(search_vector, q)', 'order': 'position'}
+        older = {'position': '-id', 'order': 'id DESC'}
+        options = f'StartSel={_START}, StopSel={_STOP}, MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}'
+
+        def page_params(low, page_limit, page_offset):
+            return [options, query, low, page_limit, page_offset]
+    else:
+        hits = TranscriptSegment.objects.filter(text__icontains=query).order_by('pk').values_list('pk', 'text')
+        return [(pk, _plain_snippet(text, query)) for pk, text in hits[offset:offset + limit]]
+
+    rows = []
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(window, window_params)
+            low, ranked_count = cursor.fetchone()
+            if offset < ranked_count:
+                cursor.execute(
+                    template.format(bound='>=', **ranked),
+                    page_params(low, min(limit, ranked_count - offset), offset),
+                )
+                rows += cursor.fetchall()
+            # A full window may have older matches behind it.
+            end = offset + limit
+            if ranked_count == MAX_RANKED_HITS and end > ranked_count:
+                start = max(offset, ranked_count)
+                cursor.execute(
+                    template.format(bound='<', **older),
+                    page_params(low, end - start, start - ranked_count),
+                )
+                rows += cursor.fetchall()
+    except DatabaseError:
+        logger.exception(f"Transcript search failed for {query!r}")
+        return []
+    return [(pk, _highlight(snippet)) for pk, snippet in rows]
+
+
+def _sermon_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'transcript' not in update_fields):
+        return
+    if instance._state.adding:
+        instance._transcript_changed = bool(instance.transcript)
+    else:
+        instance._transcript_changed = 'transcript' in instance.get_dirty_fields()
+
+
+def _sermon_saved(sender, instance, **kwargs):
+    if instance.__dict__.pop('_transcript_changed', False):
+        count = index_transcript(instance)
+        logger.info(f"Indexed {count} transcript segments of sermon {instance.pk}")
+
+
+def track():
+    """
+    Re-split a sermon's transcript into segments whenever it changes.
+    """
+    pre_save.connect(_sermon_saving, sender=Sermon, dispatch_uid='sermon_transcripts')
+    post_save.connect(_sermon_saved, sender=Sermon, dispatch_uid='sermon_transcripts')
@@ -0,0 +1,38 @@
+from common.uploads import UploadError, UploadTarget
+from .models import Sermon
+
+
+class SermonMediaUploadTarget(UploadTarget):
+    """
+    Chunked uploads attached to an existing Sermon.
+    Metadata: ``sermon`` (id) and ``field`` (``audio_file`` or ``video_file``).
+    """
+    name = 'sermon'
+    fields = ('audio_file', 'video_file')
+
+    def validate(self, metadata, filename, user):
+        field_name = metadata.get('field')
+        if field_name not in self.fields:
+            raise UploadError({'field': [f"Must be one of: {', '.join(self.fields)}."]})
+        try:
+            sermon = Sermon.objects.get(pk=metadata.get('sermon'))
+        except (Sermon.DoesNotExist, ValueError, TypeError):
+            raise UploadError({'sermon': ["Sermon not found."]})
+
+        other = 'video_file' if field_name == 'audio_file' else 'audio_file'
+        if getattr(sermon, other):
+            raise UploadError("Please upload either an audio file or a video file, not both")
+
+        extensions = next(
+            v.allowed_extensions for v in Sermon._meta.get_field(field_name).validators
+            if hasattr(v, 'allowed_extensions')
+        )
+        if filename.rsplit('.', 1)[-1].lower() not in extensions:
+            raise UploadError({'filename': [f"Allowed extensions are: {', '.join(extensions)}."]})
+        return {'sermon': sermon.pk, 'field': field_name}
+
+    def attach(self, session, file):
+        sermon = Sermon.objects.get(pk=session.metadata['sermon'])
+        setattr(sermon, session.metadata['field'], file)
+        sermon.save()
+        return sermon
@@ -1,21 +1,42 @@
+import math
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db.models import Count
+from django.http import Http404, HttpResponse
 from rest_framework import viewsets, permissions, filters
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.authentication import TokenAuthentication, SessionAuthentication
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.versioning import NamespaceVersioning, AcceptHeaderVersioning
-from .models import Event, Series, Scripture, Sermon, RatingReview, Note, Member
+from common.conditional import ConditionalGetMixin, conditional
+from common.fieldsets import SparseFieldsMixin
+from common.querybudget import QueryBudgetMixin
+from common.search import FullTextSearchFilter
+from common.serving import IMMUTABLE_CACHE_CONTROL, PassthroughRenderer, StoredFile, file_version, serve_file
+from .attendance import add_attendees, remove_attendees
+from .captions import cue_cache, import_captions, to_srt, to_webvtt
+from .filters import PassageFilter, NullsLastOrderingFilter
+from .transcripts import search_segments
+from .models import Event, Series, Scripture, Sermon, TranscriptSegment, CueTrack, RatingReview, Note, Member
 from .serializers import (
-    EventSerializer, SeriesSerializer, ScriptureSerializer,
+    EventSerializer, SeriesSerializer, ScriptureSerializer, RSVPSerializer, UserSerializer,
     SermonSerializer, RatingReviewSerializer, NoteSerializer, MemberSerializer
 )
 
+User = get_user_model()
+
 # Pagination configuration
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(ConditionalGetMixin, QueryBudgetMixin, viewsets.ModelViewSet):
     """
     ViewSet for handling Event CRUD operations.
     """
@@ -27,12 +48,54 @@ class EventViewSet(viewsets.ModelViewSet):
     ordering_fields = ['date']
     ordering = ['date']
     pagination_class = StandardResultsSetPagination
+    select_related_fields = ('organizer',)
+    query_budget = 3
+    version_models = (Event, User)
     authentication_classes = [TokenAuthentication, SessionAuthentication]
 
+    def get_queryset(self):
+        return super().get_queryset().annotate(attendee_count=Count('attendees'))
+
     def perform_create(self, serializer):
         serializer.save(organizer=self.request.user)
 
-class SeriesViewSet(viewsets.ModelViewSet):
+    @action(detail=True)
+    def attendees(self, request, pk=None):
+        """
+        The event's attendees, paginated.
+        """
+        event = self.get_object()
+        page = self.paginate_queryset(event.attendees.order_by('pk'))
+        return self.get_paginated_response(UserSerializer(page, many=True).data)
+
+    def _rsvp_user_ids(self, request, event):
+        serializer = RSVPSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_ids = serializer.validated_data.get('user_ids', [request.user.pk])
+        if set(user_ids) != {request.user.pk} and not (request.user.is_staff or event.organizer_id == request.user.pk):
+            raise PermissionDenied("Only the organizer can RSVP other members.")
+        return user_ids
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def rsvp(self, request, pk=None):
+        """
+        RSVP yourself, or (organizer and staff) ``user_ids``, to the event.
+        Safe to repeat.
+        """
+        event = self.get_object()
+        added = add_attendees(event, self._rsvp_user_ids(request, event))
+        return Response({'added': added, 'attendee_count': event.attendees.count()})
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def unrsvp(self, request, pk=None):
+        """
+        Withdraw RSVPs; the counterpart of ``rsvp``.
+        """
+        event = self.get_object()
+        removed = remove_attendees(event, self._rsvp_user_ids(request, event))
+        return Response({'removed': removed, 'attendee_count': event.attendees.count()})
+
+class SeriesViewSet(ConditionalGetMixin, QueryBudgetMixin, viewsets.ModelViewSet):
     """
     ViewSet for handling Series CRUD operations.
     """
@@ -43,39 +106,237 @@ class SeriesViewSet(viewsets.ModelViewSet):
     ordering_fields = ['start_date']
     ordering = ['start_date']
     pagination_class = StandardResultsSetPagination
+    query_budget = 3
+    version_models = (Series,)
     authentication_classes = [TokenAuthentication, SessionAuthentication]
 
-class ScriptureViewSet(viewsets.ModelViewSet):
+class ScriptureViewSet(ConditionalGetMixin, QueryBudgetMixin, viewsets.ModelViewSet):
     """
     ViewSet for handling Scripture CRUD operations.
     """
     queryset = Scripture.objects.all()
     serializer_class = ScriptureSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, PassageFilter]
     filterset_fields = ['book', 'chapter']  # Example of using DjangoFilterBackend
     search_fields = ['book', 'chapter']  # Example of using SearchFilter
     pagination_class = StandardResultsSetPagination
+    query_budget = 3
+    version_models = (Scripture,)
     authentication_classes = [TokenAuthentication, SessionAuthentication]
 
-class SermonViewSet(viewsets.ModelViewSet):
+class SermonViewSet(SparseFieldsMixin, ConditionalGetMixin, QueryBudgetMixin, viewsets.ModelViewSet):
     """
     ViewSet for handling Sermon CRUD operations.
     """
     queryset = Sermon.objects.all()
     serializer_class = SermonSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = ['series']  # Example of using DjangoFilterBackend
-    ordering_fields = ['date']
+    filter_backends = [DjangoFilterBackend, PassageFilter, FullTextSearchFilter, NullsLastOrderingFilter]
+    # ?rating_avg__gte=4, ?rating_count__gte=10: range scans of the rating indexes
+    filterset_fields = {'series': ['exact'], 'rating_avg': ['gte', 'lte'], 'rating_count': ['gte']}
+    search_fields = ['title', 'description']
+    passage_lookup = 'scriptures'  # ?passage=John 3
+    ordering_fields = ['date', 'rating_avg', 'rating_count']
+    nulls_last_fields = ('rating_avg',)  # unrated sermons last
     ordering = ['date']
     pagination_class = StandardResultsSetPagination
+    select_related_fields = ('speaker', 'series')
+    prefetch_related_fields = ('scriptures',)
+    query_budget = 4
+    version_models = (Sermon, Series, Scripture, User)
+    # ?summary=true drops the long text; ?fields=/?omit= pick fields
+    summary_omit = deferred_fields = ('description', 'transcript')
     authentication_classes = [TokenAuthentication, SessionAuthentication]
 
+    transcript_search_limit = 20
+    max_transcript_search_limit = 100
+    # Seconds of captions /cues/ returns when ?to= is not given
+    cue_window = 60
+
     def perform_create(self, serializer):
         serializer.save(speaker=self.request.user)
 
-class RatingReviewViewSet(viewsets.ModelViewSet):
+    @action(detail=False, url_path='search')
+    def transcript_search(self, request):
+        """
+        Transcript passages matching ``?q=``, best first (see
+        ``search_segments`` for very common words), each with a
+        highlighted snippet and its offset into the sermon media (audio and
+        video URLs carry a ``#t=`` fragment to start playback there).
+        ``?limit=`` (20 by default) and ``?offset=`` page through the hits.
+        """
+        return conditional(request, (Sermon, TranscriptSegment), self._transcript_search)
+
+    def _transcript_search(self, request):
+        params = request.query_params
+        query = params.get('q', '').strip()
+        try:
+            limit = min(max(int(params.get('limit', self.transcript_search_limit)), 1), self.max_transcript_search_limit)
+            offset = max(int(params.get('offset', 0)), 0)
+        except ValueError:
+            limit, offset = self.transcript_search_limit, 0
+        # One hit more than asked for tells whether there's a next page.
+        hits = search_segments(query, limit + 1, offset) if query else []
+        more = len(hits) > limit
+        hits = hits[:limit]
+        segments = TranscriptSegment.objects.select_related('sermon').only(
+            'sermon_id', 'start_ms', 'end_ms', 'sermon__title', 'sermon__date', 'sermon__audio_file', 'sermon__video_file',
+        ).in_bulk([pk for pk, _ in hits])
+
+        results = []
+        for pk, snippet in hits:
+            segment = segments.get(pk)
+            if segment is None:
+                # Deleted since the index was read
+                continue
+            sermon = segment.sermon
+            start = None if segment.start_ms is None else segment.start_ms / 1000
+            media = {}
+            for name, field_name in [('audio', 'audio_file'), ('video', 'video_file')]:
+                if getattr(sermon, field_name):
+                    url = reverse(f'sermon-{name}', args=[sermon.pk], request=request)
+                    media[name] = url if start is None else f'{url}#t={start:g}'
+            results.append({
+                'sermon': sermon.pk,
+                'title': sermon.title,
+                'date': sermon.date,
+                'start': start,
+                'end': None if segment.end_ms is None else segment.end_ms / 1000,
+                'snippet': snippet,
+                'media': media,
+            })
+        return Response({'query': query, 'results': results, 'next_offset': offset + limit if more else None})
+
+    def _serve_media(self, request, field_name):
+        media = getattr(self.get_object(), field_name)
+        if not media:
+            raise Http404
+        return serve_file(request, media)
+
+    @action(detail=True)
+    def cues(self, request, pk=None):
+        """
+        The captions showing between ``?from=`` and ``?to=`` (seconds into
+        the media; ``to`` defaults to a minute after ``from``), found by
+        binary search over the sermon's sorted cue array. ``next`` is when
+        the first cue after the window starts, for scheduling the next call.
+        """
+        return conditional(request, (Sermon, CueTrack), self._cues, pk)
+
+    def _cues(self, request, pk):
+        try:
+            start = max(float(request.query_params.get('from', 0)), 0)
+            end = float(request.query_params.get('to', start + self.cue_window))
+            # float() takes "nan" and "inf"; neither is a point in the media.
+            if not (math.isfinite(start * 1000) and math.isfinite(end * 1000)):
+                raise ValueError
+        except ValueError:
+            raise ValidationError({'from': "Expected seconds."})
+        if end < start:
+            raise ValidationError({'to': "Must not be before from."})
+        cues = cue_cache.get(self._sermon_id(pk))
+        if cues is None:
+            return Response({'from': start, 'to': end, 'cues': [], 'next': None})
+        start_ms, end_ms = round(start * 1000), round(end * 1000)
+        next_start = cues.next_start(end_ms)
+        return Response({
+            'from': start,
+            'to': end,
+            'cues': [
+                {'start': cue_start / 1000, 'end': cue_end / 1000, 'text': text}
+                for cue_start, cue_end, text in cues.window(start_ms, end_ms)
+            ],
+            'next': None if next_start is None else next_start / 1000,
+        })
+
+    def _sermon_id(self, pk):
+        # Cue lookups skip loading the sermon row, but not the 404.
+        try:
+            sermon_id = int(pk)
+        except (TypeError, ValueError):
+            raise Http404
+        if not Sermon.objects.filter(pk=sermon_id).exists():
+            raise Http404
+        return sermon_id
+
+    @action(detail=True, methods=['get', 'put'], renderer_classes=[JSONRenderer, PassthroughRenderer])
+    def captions(self, request, pk=None):
+        """
+        GET exports the cue track as WebVTT, or SRT with ``?type=srt``. PUT
+        imports a WebVTT or SRT ``file`` (or ``captions`` text), replacing
+        the transcript with its cues.
+        """
+        if request.method == 'PUT':
+            sermon = self.get_object()
+            upload = request.data.get('file')
+            text = upload.read().decode('utf-8-sig', errors='replace') if upload else request.data.get('captions', '')
+            try:
+                count = import_captions(sermon, text)
+            except ValueError as exc:
+                raise ValidationError({'file': str(exc)})
+            return Response({'cues': count})
+        return conditional(request, (Sermon, CueTrack), self._export_captions, pk)
+
+    def _export_captions(self, request, pk):
+        cues = cue_cache.get(self._sermon_id(pk))
+        if cues is None:
+            raise Http404
+        if request.query_params.get('type') == 'srt':
+            response = HttpResponse(to_srt(cues), content_type='application/x-subrip; charset=utf-8')
+            extension = 'srt'
+        else:
+            response = HttpResponse(to_webvtt(cues), content_type='text/vtt; charset=utf-8')
+            extension = 'vtt'
+        response['Content-Disposition'] = f'inline; filename="sermon-{pk}.{extension}"'
+        return response
+
+    @action(detail=True, renderer_classes=[PassthroughRenderer])
+    def audio(self, request, pk=None):
+        """
+        Serve the sermon audio with HTTP Range support for seeking.
+        """
+        return self._serve_media(request, 'audio_file')
+
+    @action(detail=True, renderer_classes=[PassthroughRenderer])
+    def video(self, request, pk=None):
+        """
+        Serve the sermon video with HTTP Range support for seeking.
+        """
+        return self._serve_media(request, 'video_file')
+
+    @action(detail=True, renderer_classes=[PassthroughRenderer])
+    def waveform(self, request, pk=None):
+        """
+        Precomputed waveform peaks for the sermon audio, in audiowaveform
+        ``.dat`` format. ``?samples_per_pixel=`` picks the resolution (the
+        coarsest by default); URLs carrying the current ``?v=`` are cached
+        for a year.
+        """
+        sermon = self.get_object()
+        levels = {
+            rendition['samples_per_pixel']: rendition
+            for key, rendition in sermon.renditions.items() if key.startswith('waveform_')
+        }
+        if not levels:
+            raise Http404
+        requested = request.query_params.get('samples_per_pixel')
+        if requested is None:
+            rendition = levels[max(levels)]
+        elif requested.isdigit() and int(requested) in levels:
+            rendition = levels[int(requested)]
+        else:
+            return Response({'detail': f"samples_per_pixel must be one of {sorted(levels)}."}, status=400)
+
+        response = serve_file(request, StoredFile(default_storage, rendition['name']), 'application/octet-stream')
+        version = file_version(rendition)
+        if version and request.query_params.get('v') == version:
+            response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response['Cache-Control'] = 'public, max-age=300'
+        return response
+
+class RatingReviewViewSet(ConditionalGetMixin, QueryBudgetMixin, viewsets.ModelViewSet):
     """
     ViewSet for handling RatingReview CRUD operations.
     """
@@ -83,9 +344,14 @@ class RatingReviewViewSet(viewsets.ModelViewSet):
     serializer_class = RatingReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     pagination_class = StandardResultsSetPagination
+    query_budget = 3
+    version_models = (RatingReview,)
     authentication_classes = [TokenAuthentication, SessionAuthentication]
 
-class NoteViewSet(viewsets.ModelViewSet):
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+class NoteViewSet(ConditionalGetMixin, QueryBudgetMixin, viewsets.ModelViewSet):
     """
     ViewSet for handling Note CRUD operations.
     """
@@ -93,9 +359,11 @@ class NoteViewSet(viewsets.ModelViewSet):
     serializer_class = NoteSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     pagination_class = StandardResultsSetPagination
+    query_budget = 3
+    version_models = (Note,)
     authentication_classes = [TokenAuthentication, SessionAuthentication]
 
-class MemberViewSet(viewsets.ModelViewSet):
+class MemberViewSet(ConditionalGetMixin, QueryBudgetMixin, viewsets.ModelViewSet):
     """
     ViewSet for handling Member CRUD operations.
     """
@@ -103,6 +371,9 @@ class MemberViewSet(viewsets.ModelViewSet):
     serializer_class = MemberSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     pagination_class = StandardResultsSetPagination
+    select_related_fields = ('user',)
+    query_budget = 3
+    version_models = (Member, User)
     authentication_classes = [TokenAuthentication, SessionAuthentication]
 
     def perform_create(self, serializer):
@@ -51,6 +51,7 @@ INSTALLED_APPS = [
     "church",
     "content",
     "payment",
+    "common",
     "ckeditor",
     "ckeditor_uploader",
     "allauth",
@@ -164,6 +165,48 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Uploaded media
+MEDIA_URL = "media/"
+MEDIA_ROOT = BASE_DIR / "media"
+
+# Uploads are stored once per distinct content, see common/storage.py
+STORAGES = {
+    "default": {"BACKEND": "common.storage.DedupStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+# Background media processing (thumbnails, posters, ...), see common/tasks.py
+MEDIA_WORKERS = 2
+MEDIA_TASKS_EAGER = False
+FFMPEG_BINARY = "ffmpeg"
+FFPROBE_BINARY = "ffprobe"
+FFMPEG_TIMEOUT = 600  # seconds per ffmpeg/ffprobe call
+
+# Media byte-serving (common/serving.py). Set to "nginx" (X-Accel-Redirect) or
+# "apache" (X-Sendfile) to let the front proxy send media files; for nginx,
+# MEDIA_ACCEL_PREFIX must be an internal location aliased to MEDIA_ROOT.
+MEDIA_ACCEL_BACKEND = None
+MEDIA_ACCEL_PREFIX = "/protected-media/"
+
+# Resumable chunked uploads, see common/uploads.py
+CHUNKED_UPLOAD_DIR = BASE_DIR / "upload_sessions"
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 64 * 1024 * 1024
+CHUNKED_UPLOAD_EXPIRY = 24 * 60 * 60  # seconds; see the sweep_uploads command
+
+# Image decoding (upload validation, renditions) runs in a separate process
+# pool with hard limits, see common/imaging.py
+IMAGE_WORKERS = 2
+IMAGE_QUEUE_SIZE = 8  # uploads allowed to wait for a worker before answering 503
+IMAGE_QUEUE_TIMEOUT = 10  # seconds an upload may wait for a worker before answering 503
+IMAGE_MAX_PIXELS = 40_000_000
+IMAGE_WORKER_MEMORY = 512 * 1024 * 1024  # address-space limit per worker, bytes
+IMAGE_TIMEOUT = 30  # seconds (wall and CPU) per rendition job
+IMAGE_VALIDATION_TIMEOUT = 10  # seconds per upload validation
+
+# Text extraction for the search index runs in its own process pool
+TEXT_EXTRACTION_WORKERS = 2
+TEXT_EXTRACTION_TIMEOUT = 300  # seconds per document
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
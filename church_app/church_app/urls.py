@@ -21,4 +21,8 @@ from django.conf import settings
 urlpatterns = [
     path("admin/", admin.site.urls),
     path('ckeditor/', include('ckeditor_uploader.urls')),
+    # REST APIs; their serializers reverse each other's routes (e.g. tag-detail)
+    path('', include('content.urls')),
+    path('', include('church.urls')),
+    path('', include('common.urls')),
 ]
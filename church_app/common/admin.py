@@ -1,3 +1,8 @@
 from django.contrib import admin
+from .models import UploadSession
 
-# Register your models here.
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'target', 'user', 'offset', 'size', 'status', 'updated_at')
+    list_filter = ('status', 'target')
+    search_fields = ('filename', 'user__username')
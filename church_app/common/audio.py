@@ -0,0 +1,182 @@
+import hashlib
+import logging
+import os
+import struct
+import subprocess
+import threading
+import wave
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+from .files import local_path
+from .video import VideoToolError
+
+logger = logging.getLogger(__name__)
+
+# Samples per peak pair at each stored resolution; every level is an exact
+# multiple of the first so coarser ones are reduced from it.
+WAVEFORM_RESOLUTIONS = (256, 1024, 4096, 16384)
+# Rate compressed formats are decoded at; peaks don't need full bandwidth.
+DECODE_SAMPLE_RATE = 22050
+BLOCK_FRAMES = 1 << 16
+
+
+def _wav_blocks(path):
+    """
+    Yield ``(sample_rate, mono int16 array)`` blocks of a PCM WAV file.
+    """
+    with wave.open(path, 'rb') as w:
+        channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+        while True:
+            raw = w.readframes(BLOCK_FRAMES)
+            if not raw:
+                break
+            if width == 1:
+                samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.int32) - 128) << 8
+            elif width == 2:
+                samples = np.frombuffer(raw, dtype='<i2').astype(np.int32)
+            elif width == 3:
+                b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+                samples = ((b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)) << 8) >> 16
+            else:
+                samples = np.frombuffer(raw, dtype='<i4') >> 16
+            yield rate, samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+
+
+def _ffmpeg_blocks(path):
+    """
+    Decode any format ffmpeg understands to mono 16-bit PCM, streamed.
+    ffmpeg is killed if it runs past FFMPEG_TIMEOUT.
+    """
+    ffmpeg = getattr(settings, 'FFMPEG_BINARY', 'ffmpeg')
+    try:
+        process = subprocess.Popen(
+            [
+                ffmpeg, '-v', 'error', '-i', path,
+                '-ac', '1', '-ar', str(DECODE_SAMPLE_RATE), '-f', 's16le', 'pipe:1',
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+    except FileNotFoundError as e:
+        raise VideoToolError(f"{ffmpeg} is not installed") from e
+
+    # Reads block until ffmpeg writes, so a hung decode is only stopped by
+    # killing it; its output then ends and the loop below finishes.
+    timed_out = threading.Event()
+
+    def expire():
+        timed_out.set()
+        process.kill()
+
+    watchdog = threading.Timer(getattr(settings, 'FFMPEG_TIMEOUT', 600), expire)
+    watchdog.daemon = True
+    watchdog.start()
+    try:
+        while True:
+            raw = process.stdout.read(BLOCK_FRAMES * 2)
+            if not raw:
+                break
+            if len(raw) % 2:
+                raw += process.stdout.read(1)
+            yield DECODE_SAMPLE_RATE, np.frombuffer(raw, dtype='<i2')
+        returncode = process.wait()
+        if timed_out.is_set():
+            raise VideoToolError(f"{ffmpeg} timed out")
+        if returncode != 0:
+            raise VideoToolError(f"ffmpeg could not decode {path}")
+    finally:
+        watchdog.cancel()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+
+
+def _pcm_blocks(path):
+    if path.lower().endswith('.wav'):
+        try:
+            with wave.open(path, 'rb') as w:
+                if w.getcomptype() == 'NONE':
+                    return _wav_blocks(path)
+        except (wave.Error, EOFError):
+            pass
+    return _ffmpeg_blocks(path)
+
+
+def compute_peaks(blocks, samples_per_pixel):
+    """
+    Min/max of every ``samples_per_pixel`` samples over a stream of blocks,
+    vectorized per block. Returns ``(sample_rate, mins, maxs)``.
+    """
+    mins, maxs = [], []
+    sample_rate = None
+    carry = np.empty(0, dtype=np.int16)
+    for sample_rate, block in blocks:
+        data = np.concatenate((carry, block)) if carry.size else block
+        usable = data.size - data.size % samples_per_pixel
+        if usable:
+            frames = data[:usable].reshape(-1, samples_per_pixel)
+            mins.append(frames.min(axis=1))
+            maxs.append(frames.max(axis=1))
+        carry = data[usable:]
+    if carry.size:
+        mins.append(carry.min(keepdims=True))
+        maxs.append(carry.max(keepdims=True))
+    if not mins:
+        return sample_rate or DECODE_SAMPLE_RATE, np.zeros(0, np.int16), np.zeros(0, np.int16)
+    return sample_rate, np.concatenate(mins), np.concatenate(maxs)
+
+
+def reduce_peaks(mins, maxs, factor):
+    """
+    Combine every ``factor`` consecutive peak pairs into one.
+    """
+    pad = -mins.size % factor
+    if pad:
+        mins = np.concatenate((mins, np.repeat(mins[-1:], pad)))
+        maxs = np.concatenate((maxs, np.repeat(maxs[-1:], pad)))
+    return mins.reshape(-1, factor).min(axis=1), maxs.reshape(-1, factor).max(axis=1)
+
+
+def encode_dat(sample_rate, samples_per_pixel, mins, maxs):
+    """
+    Encode peaks in the audiowaveform ``.dat`` v1 format with 8-bit values:
+    a 20-byte little-endian header followed by interleaved min/max bytes.
+    """
+    header = struct.pack('<iIiiI', 1, 1, sample_rate, samples_per_pixel, mins.size)
+    pairs = np.empty(mins.size * 2, dtype=np.int8)
+    pairs[0::2] = mins >> 8
+    pairs[1::2] = maxs >> 8
+    return header + pairs.tobytes()
+
+
+def generate_waveform(instance, field_name):
+    """
+    Media pipeline stage: store peak files for every WAVEFORM_RESOLUTIONS
+    level as ``waveform_<samples per pixel>`` renditions.
+    """
+    source = getattr(instance, field_name)
+    storage = source.storage
+    root, _ = os.path.splitext(source.name)
+    base = WAVEFORM_RESOLUTIONS[0]
+
+    with local_path(source) as path:
+        sample_rate, mins, maxs = compute_peaks(_pcm_blocks(path), base)
+
+    renditions = {}
+    for samples_per_pixel in WAVEFORM_RESOLUTIONS:
+        level_mins, level_maxs = reduce_peaks(mins, maxs, samples_per_pixel // base)
+        data = encode_dat(sample_rate, samples_per_pixel, level_mins, level_maxs)
+        renditions[f'waveform_{samples_per_pixel}'] = {
+            'name': storage.save(f'{root}_waveform_{samples_per_pixel}.dat', ContentFile(data)),
+            'sample_rate': sample_rate,
+            'samples_per_pixel': samples_per_pixel,
+            'length': int(level_mins.size),
+            'size': len(data),
+            # Content digest for cache-busting URLs (common.serving.file_version)
+            'sha256': hashlib.sha256(data).hexdigest(),
+        }
+    instance.update_renditions(**renditions)
+    logger.info(f"Generated waveform peaks for {instance._meta.label} {instance.pk}")
@@ -0,0 +1,154 @@
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from defusedxml import ElementTree
+from django.conf import settings
+
+try:
+    import pypdf
+except ImportError:  # PDF extraction is optional
+    pypdf = None
+
+# Stop collecting text after this many characters; the index doesn't need
+# the tail of a 2000-page document.
+MAX_TEXT_LENGTH = 2 * 1024 * 1024
+# Guard against zip bombs in OOXML/ODF files.
+MAX_XML_MEMBER_SIZE = 50 * 1024 * 1024
+
+_slide_number_re = re.compile(r'(\d+)\.xml$')
+# Runs of printable UTF-16LE characters, as legacy .ppt stores slide text.
+_utf16_text_re = re.compile(rb'(?:[\x20-\x7e\xa0-\xff]\x00){4,}')
+
+
+class ExtractionError(Exception):
+    pass
+
+
+def _xml_text(archive, member, tag):
+    info = archive.getinfo(member)
+    if info.file_size > MAX_XML_MEMBER_SIZE:
+        raise ExtractionError(f"{member} is too large")
+    with archive.open(member) as f:
+        root = ElementTree.parse(f).getroot()
+    return ' '.join(el.text for el in root.iter() if el.tag.endswith(tag) and el.text)
+
+
+def _numbered(names, prefix):
+    """
+    Members like ``ppt/slides/slide12.xml`` in slide order (not name order).
+    """
+    def number(name):
+        match = _slide_number_re.search(name)
+        return int(match.group(1)) if match else 0
+
+    return sorted((n for n in names if n.startswith(prefix) and n.endswith('.xml')), key=number)
+
+
+def _extract_ooxml(path, ext):
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile as e:
+        raise ExtractionError(str(e))
+    with archive:
+        names = archive.namelist()
+        if ext == '.pptx':
+            members = _numbered(names, 'ppt/slides/slide') + _numbered(names, 'ppt/notesSlides/notesSlide')
+            tag = '}t'
+        elif ext == '.docx':
+            members = [n for n in ('word/document.xml', 'word/footnotes.xml') if n in names]
+            tag = '}t'
+        else:  # OpenDocument
+            members = ['content.xml'] if 'content.xml' in names else []
+            tag = '}p'
+        for member in members:
+            yield _xml_text(archive, member, tag)
+
+
+def _extract_pdf(path):
+    if pypdf is None:
+        raise ExtractionError("pypdf is not installed")
+    try:
+        reader = pypdf.PdfReader(path)
+        for page in reader.pages:
+            yield page.extract_text() or ''
+    except pypdf.errors.PyPdfError as e:
+        raise ExtractionError(str(e))
+
+
+def _extract_ppt(path):
+    # Best effort for the legacy binary format: pull out UTF-16 text runs.
+    with open(path, 'rb') as f:
+        for match in _utf16_text_re.finditer(f.read(MAX_TEXT_LENGTH * 4)):
+            yield match.group().decode('utf-16-le')
+
+
+def _extract_plain(path):
+    with open(path, 'rb') as f:
+        yield f.read(MAX_TEXT_LENGTH).decode('utf-8', errors='replace')
+
+
+EXTRACTORS = {
+    '.pdf': _extract_pdf,
+    '.pptx': lambda path: _extract_ooxml(path, '.pptx'),
+    '.docx': lambda path: _extract_ooxml(path, '.docx'),
+    '.odt': lambda path: _extract_ooxml(path, '.odt'),
+    '.odp': lambda path: _extract_ooxml(path, '.odp'),
+    '.ppt': _extract_ppt,
+    '.txt': _extract_plain,
+    '.md': _extract_plain,
+    '.csv': _extract_plain,
+}
+
+
+def can_extract(name):
+    return os.path.splitext(name)[1].lower() in EXTRACTORS
+
+
+def extract_text(path, name=None):
+    """
+    Return the plain text of a document, decided by the extension of
+    ``name`` (or ``path``). Runs in the extraction process pool, so it must
+    not touch Django.
+    """
+    ext = os.path.splitext(name or path)[1].lower()
+    if ext not in EXTRACTORS:
+        raise ExtractionError(f"No text extractor for {ext or 'files without extension'}")
+    parts, length = [], 0
+    for text in EXTRACTORS[ext](path):
+        text = ' '.join(text.split())
+        if not text:
+            continue
+        parts.append(text)
+        length += len(text)
+        if length >= MAX_TEXT_LENGTH:
+            break
+    return '\n'.join(parts)[:MAX_TEXT_LENGTH]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Process pool for parsing documents, so PDF parsing neither blocks the GIL
+    for request threads nor shares their memory.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=getattr(settings, 'TEXT_EXTRACTION_WORKERS', 2),
+                    # Don't fork a multi-threaded web worker.
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+    return _pool
+
+
+def extract_text_in_pool(path, name=None):
+    future = get_pool().submit(extract_text, path, name)
+    return future.result(timeout=getattr(settings, 'TEXT_EXTRACTION_TIMEOUT', 300))
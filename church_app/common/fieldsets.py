@@ -0,0 +1,72 @@
+from rest_framework.exceptions import ValidationError
+
+
+def _names(value):
+    return {name.strip() for name in value.split(',') if name.strip()} if value else set()
+
+
+class SparseFieldsMixin:
+    """
+    Lets GET requests choose the fields they get back:
+
+    - ``?fields=id,title`` keeps only those fields;
+    - ``?omit=content`` drops fields;
+    - ``?summary=true`` (lists only) drops ``summary_omit``, the large text
+      fields title cards don't show.
+
+    Dropped ``deferred_fields`` (large text columns) are also left out of the
+    SQL, and prefetches for dropped relations are skipped. Only columns listed
+    in ``deferred_fields`` are deferred, since a deferred column that some
+    other field still reads would cost a query per row.
+    """
+    summary_omit = ()
+    deferred_fields = ()
+
+    def is_summary(self):
+        return self.action == 'list' and self.request.query_params.get('summary') in ('1', 'true')
+
+    def get_omitted_fields(self, field_names):
+        """
+        The serializer fields to drop out of ``field_names``, the full set.
+        """
+        if getattr(self, '_omitted_fields', None) is not None:
+            return self._omitted_fields
+        omitted = set()
+        if self.request is not None and self.request.method == 'GET':
+            params = self.request.query_params
+            wanted, unwanted = _names(params.get('fields')), _names(params.get('omit'))
+            unknown = (wanted | unwanted) - set(field_names)
+            if unknown:
+                raise ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}."})
+            if wanted:
+                omitted |= set(field_names) - wanted
+            omitted |= unwanted
+            if self.is_summary():
+                omitted |= set(self.summary_omit)
+        self._omitted_fields = omitted
+        return omitted
+
+    def _serializer_field_names(self):
+        serializer_class = self.get_serializer_class()
+        return list(serializer_class(context=self.get_serializer_context()).fields)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        omitted = self.get_omitted_fields(self._serializer_field_names())
+        if not omitted:
+            return queryset
+        deferred = [name for name in self.deferred_fields if name in omitted]
+        if deferred:
+            queryset = queryset.defer(*deferred)
+        prefetches = getattr(self, 'prefetch_related_fields', ())
+        if any(lookup.split('__')[0] in omitted for lookup in prefetches):
+            kept = [lookup for lookup in prefetches if lookup.split('__')[0] not in omitted]
+            queryset = queryset.prefetch_related(None).prefetch_related(*kept)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fields = serializer.child.fields if hasattr(serializer, 'child') else serializer.fields
+        for name in self.get_omitted_fields(list(fields)):
+            fields.pop(name, None)
+        return serializer
@@ -0,0 +1,39 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+@contextmanager
+def local_path(field_file):
+    """
+    Yield a filesystem path for ``field_file``. Local storages hand out the
+    stored file directly; anything else is streamed to a temporary copy first.
+    """
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        path = None
+    if path is not None:
+        yield path
+        return
+
+    _, ext = os.path.splitext(field_file.name)
+    with tempfile.NamedTemporaryFile(suffix=ext, delete=False) as tmp:
+        with field_file.open('rb') as source:
+            shutil.copyfileobj(source, tmp, COPY_CHUNK_SIZE)
+    try:
+        yield tmp.name
+    finally:
+        os.unlink(tmp.name)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(COPY_CHUNK_SIZE), b''):
+            digest.update(data)
+    return digest.hexdigest()
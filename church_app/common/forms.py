@@ -0,0 +1,27 @@
+from django import forms
+from django.utils.translation import gettext_lazy as _
+from PIL import Image as PILImage
+from . import imaging
+
+
+class SafeImageFormField(forms.ImageField):
+    """
+    ImageField that validates uploads in the bounded image pool (see
+    common/imaging.py) instead of decoding them in the web worker.
+    """
+    default_error_messages = {
+        'busy': _("The server is busy processing other images. Please try again shortly."),
+    }
+
+    def to_python(self, data):
+        f = forms.FileField.to_python(self, data)
+        if f is None:
+            return None
+        try:
+            info = imaging.inspect_upload(f)
+        except imaging.ImageRejected as e:
+            raise forms.ValidationError(str(e), code='invalid_image')
+        except imaging.ImagePoolBusy:
+            raise forms.ValidationError(self.error_messages['busy'], code='busy')
+        f.content_type = PILImage.MIME.get(info['format'])
+        return f
@@ -0,0 +1,74 @@
+from urllib.parse import quote
+from django.urls import NoReverseMatch, get_script_prefix, get_urlconf, reverse
+from django.utils.http import RFC3986_SUBDELIMS
+from rest_framework import serializers
+
+# Stand-ins reversed in place of the lookup value: one for string patterns
+# (DRF routers) and one for <int:...> converters.
+_PLACEHOLDERS = ('__lookup__', '2147480647')
+
+# (view name, lookup kwarg, format, urlconf, script prefix, origin) -> (head, tail)
+_templates = {}
+
+
+def _template(view_name, lookup_kwarg, format, origin):
+    """
+    The URL of ``view_name`` split around its lookup value, reversed once and
+    made absolute once per ``origin`` (scheme and host).
+    """
+    key = (view_name, lookup_kwarg, format, get_urlconf(), get_script_prefix(), origin)
+    template = _templates.get(key)
+    if template is None:
+        for placeholder in _PLACEHOLDERS:
+            kwargs = {lookup_kwarg: placeholder}
+            if format:
+                kwargs['format'] = format
+            try:
+                url = reverse(view_name, kwargs=kwargs)
+                break
+            except NoReverseMatch:
+                continue
+        else:
+            raise NoReverseMatch(view_name)
+        if origin:
+            url = origin + url
+        head, _, tail = url.rpartition(placeholder)
+        template = _templates[key] = (head, tail)
+    return template
+
+
+class CachedHyperlinkedIdentityField(serializers.HyperlinkedIdentityField):
+    """
+    ``HyperlinkedIdentityField`` that builds URLs from a route template
+    compiled once per process and host: one string join per row instead of a
+    ``reverse()`` and ``build_absolute_uri()``.
+    """
+
+    def get_url(self, obj, view_name, request, format):
+        if hasattr(obj, 'pk') and obj.pk in (None, ''):
+            return None
+        if request is not None and getattr(request, 'versioning_scheme', None) is not None:
+            # Versioned URLs are reversed by the scheme.
+            return super().get_url(obj, view_name, request, format)
+        key = (view_name, self.lookup_url_kwarg, format)
+        if request is None:
+            head, tail = _template(*key, None)
+        else:
+            # Per-request memo: skips the urlconf/script prefix lookups, which
+            # are context-local and not free.
+            templates = getattr(request, '_hyperlink_templates', None)
+            if templates is None:
+                templates = request._hyperlink_templates = {}
+            template = templates.get(key)
+            if template is None:
+                origin = f'{request.scheme}://{request.get_host()}'
+                template = templates[key] = _template(*key, origin)
+            head, tail = template
+        value = getattr(obj, self.lookup_field)
+        if isinstance(value, int):
+            return f'{head}{value}{tail}'
+        return head + quote(str(value), safe=RFC3986_SUBDELIMS + '/~:@') + tail
+
+
+class CachedHyperlinkedModelSerializer(serializers.HyperlinkedModelSerializer):
+    serializer_url_field = CachedHyperlinkedIdentityField
@@ -0,0 +1,342 @@
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image as PILImage, ImageOps
+from .files import local_path
+
+try:
+    import pillow_avif  # noqa: F401 -- registers the AVIF codec with Pillow
+except ImportError:
+    pillow_avif = None
+
+try:
+    import resource
+except ImportError:  # not available on Windows; only the pixel limit applies there
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Defaults for the IMAGE_* settings.
+DEFAULT_MAX_PIXELS = 40_000_000
+DEFAULT_WORKER_MEMORY = 512 * 1024 * 1024
+DEFAULT_TIMEOUT = 30
+DEFAULT_QUEUE_TIMEOUT = 10
+
+# Encoder settings and file extensions per output format.
+ENCODE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'WEBP': {'quality': 80, 'method': 4},
+    'AVIF': {'quality': 60, 'speed': 6},
+}
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp', 'AVIF': 'avif'}
+
+
+class ImageRejected(Exception):
+    """
+    The upload is not an image we are willing to decode (corrupt, unknown
+    format, too many pixels, or over the worker's memory/time caps).
+    """
+
+
+class ImagePoolBusy(Exception):
+    """
+    Every worker slot is taken; the caller should retry later.
+    """
+
+
+def _max_pixels():
+    return getattr(settings, 'IMAGE_MAX_PIXELS', DEFAULT_MAX_PIXELS)
+
+
+# -- Worker side. Runs in the image pool and must not touch Django. ---------
+
+def _init_worker(max_pixels, memory_limit):
+    # Pillow refuses to decode anything far beyond this; we check it
+    # ourselves before decoding too.
+    PILImage.MAX_IMAGE_PIXELS = max_pixels
+    if resource is not None and memory_limit:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+
+def _limit_cpu(seconds):
+    """
+    Let the kernel kill this worker (SIGXCPU) if the current task uses more
+    than ``seconds`` of CPU time.
+    """
+    if resource is None:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(usage.ru_utime + usage.ru_stime + seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _open(source):
+    """
+    Open ``source`` (a path or the bytes of a small upload) and check the
+    pixel count from the header, before anything is decoded.
+    """
+    too_large = f"Image has too many pixels; at most {PILImage.MAX_IMAGE_PIXELS:,} are allowed."
+    try:
+        img = PILImage.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    except PILImage.DecompressionBombError:
+        raise ImageRejected(too_large)
+    except (OSError, SyntaxError, ValueError) as e:
+        raise ImageRejected(f"Not a supported image ({e})")
+    if img.width * img.height > PILImage.MAX_IMAGE_PIXELS:
+        img.close()
+        raise ImageRejected(too_large)
+    return img
+
+
+def inspect_image(source, cpu_seconds):
+    """
+    Validate an upload and return its format, size and mode.
+    """
+    _limit_cpu(cpu_seconds)
+    with _open(source) as img:
+        info = {'format': img.format, 'width': img.width, 'height': img.height, 'mode': img.mode}
+        try:
+            img.verify()
+        except Exception as e:
+            raise ImageRejected(f"Corrupt image ({e})")
+    return info
+
+
+def render_images(source, specs, cpu_seconds):
+    """
+    Decode ``source`` once and encode it for each ``(key, (width, height),
+    format)`` spec, fitted into the box. Boxes are processed largest first
+    and each is resized from the smallest earlier result whose box contains
+    it, which gives the same size as resizing the original. Within a series of
+    keys like ``webp_640``, ``webp_1024``, an image that fits a box whole is
+    encoded only once, under the smallest such key.
+    Returns ``[(key, data, width, height, format), ...]``.
+    """
+    _limit_cpu(cpu_seconds)
+    results = []
+    try:
+        with _open(source) as img:
+            # Lets the JPEG decoder scale down while decoding.
+            img.draft('RGB', max(box for _, box, _ in specs))
+            img = ImageOps.exif_transpose(img).convert('RGB')
+
+        whole, skip = set(), set()
+        for key, box, image_format in sorted(specs, key=lambda spec: spec[1]):
+            series = key.rpartition('_')[0] or key
+            if img.width <= box[0] and img.height <= box[1]:
+                if series in whole:
+                    skip.add(key)
+                whole.add(series)
+
+        # box -> the image fitted into it. Square boxes don't contain
+        # width-only ones, so those start again from the original.
+        fitted = {}
+        for key, box, image_format in sorted(specs, key=lambda spec: spec[1], reverse=True):
+            if key in skip:
+                continue
+            if box not in fitted:
+                containing = [fitted[other] for other in fitted if other[0] >= box[0] and other[1] >= box[1]]
+                resized = min(containing, key=lambda image: image.width * image.height, default=img).copy()
+                resized.thumbnail(box, PILImage.LANCZOS)
+                fitted[box] = resized
+            resized = fitted[box]
+            buffer = io.BytesIO()
+            resized.save(buffer, format=image_format, **ENCODE_OPTIONS[image_format])
+            results.append((key, buffer.getvalue(), resized.width, resized.height, image_format))
+    except MemoryError:
+        raise ImageRejected("Image needs more memory than the worker limit allows.")
+    except (OSError, SyntaxError, ValueError) as e:
+        raise ImageRejected(f"Could not decode image ({e})")
+    return results
+
+
+# -- Caller side. ------------------------------------------------------------
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = None
+_free_workers = None
+
+BUSY = "Too many images are being processed; try again shortly."
+
+
+def _get_slots():
+    """
+    ``(admission, free workers)`` semaphores: how many callers may be in
+    ``run`` at once, and how many tasks may be in the pool at once.
+    """
+    global _slots, _free_workers
+    with _pool_lock:
+        if _slots is None:
+            workers = getattr(settings, 'IMAGE_WORKERS', 2)
+            # Tasks running plus tasks allowed to wait for a worker.
+            _slots = threading.BoundedSemaphore(workers + getattr(settings, 'IMAGE_QUEUE_SIZE', 8))
+            _free_workers = threading.BoundedSemaphore(workers)
+        return _slots, _free_workers
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_WORKERS', 2),
+                # Don't fork a multi-threaded web worker.
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(_max_pixels(), getattr(settings, 'IMAGE_WORKER_MEMORY', DEFAULT_WORKER_MEMORY)),
+            )
+        return _pool
+
+
+def _discard_pool(pool):
+    # A timed-out task keeps its worker busy until its CPU limit kills it;
+    # start over with fresh workers rather than queueing behind it. Tasks
+    # still running in the old pool are left to finish.
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+class _PoolLost(Exception):
+    # The pool broke under a task that hadn't used up its own time, e.g.
+    # because another task's worker was killed.
+    pass
+
+
+def _run_once(func, args, timeout, wait):
+    _, free_workers = _get_slots()
+    queue_timeout = getattr(settings, 'IMAGE_QUEUE_TIMEOUT', DEFAULT_QUEUE_TIMEOUT)
+    if not free_workers.acquire(timeout=None if wait else queue_timeout):
+        raise ImagePoolBusy(BUSY)
+    for _ in range(3):
+        pool = _get_pool()
+        try:
+            future = pool.submit(func, *args, timeout)
+            break
+        except (RuntimeError, BrokenProcessPool):
+            # Shut down or broken by another caller meanwhile.
+            _discard_pool(pool)
+    else:
+        free_workers.release()
+        raise ImagePoolBusy(BUSY)
+    # The worker stays busy until the task ends, even if we stop waiting.
+    future.add_done_callback(lambda f: free_workers.release())
+
+    started = time.monotonic()
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        logger.warning(f"Image task {func.__name__} exceeded {timeout}s; restarting the image pool")
+        _discard_pool(pool)
+        raise ImageRejected(f"Image processing took longer than {timeout} seconds.")
+    except (BrokenProcessPool, CancelledError):
+        _discard_pool(pool)
+        if time.monotonic() - started >= timeout:
+            # Ran long enough to be the one killed for its CPU limit.
+            raise ImageRejected("Image processing was aborted by the worker's resource limits.")
+        raise _PoolLost()
+
+
+def run(func, *args, timeout=None, wait=False):
+    """
+    Run ``func(*args, cpu_seconds)`` in the image pool and return its result.
+
+    At most IMAGE_WORKERS tasks run at once and IMAGE_QUEUE_SIZE more may
+    wait, each for up to IMAGE_QUEUE_TIMEOUT seconds; beyond that
+    ImagePoolBusy is raised. With ``wait=True`` (background jobs) the caller
+    blocks instead. Tasks are only submitted when a worker is free, so each
+    gets ``timeout`` seconds of wall and CPU time from when it starts.
+    """
+    timeout = timeout or getattr(settings, 'IMAGE_TIMEOUT', DEFAULT_TIMEOUT)
+    slots, _ = _get_slots()
+    if not slots.acquire(blocking=wait):
+        raise ImagePoolBusy(BUSY)
+    try:
+        try:
+            return _run_once(func, args, timeout, wait)
+        except _PoolLost:
+            # Either another task broke the pool or this one crashed its
+            # worker; a second try on fresh workers tells them apart.
+            return _run_once(func, args, timeout, wait)
+    except _PoolLost:
+        raise ImageRejected("Image processing was aborted by the worker's resource limits.")
+    finally:
+        slots.release()
+
+
+def inspect_upload(file, timeout=None):
+    """
+    Validate an uploaded file in the image pool. Small in-memory uploads are
+    sent as bytes; uploads Django spooled to disk are read by path.
+    """
+    if hasattr(file, 'temporary_file_path'):
+        source = file.temporary_file_path()
+    else:
+        file.seek(0)
+        source = file.read()
+        file.seek(0)
+    return run(inspect_image, source, timeout=timeout or getattr(settings, 'IMAGE_VALIDATION_TIMEOUT', 10))
+
+
+def variant_formats():
+    """
+    Formats responsive variants are encoded in: AVIF and WebP where Pillow
+    can write them, plus JPEG for everything else.
+    """
+    PILImage.init()
+    return [f for f in ('AVIF', 'WEBP') if f in PILImage.SAVE] + ['JPEG']
+
+
+def variant_specs(widths):
+    """
+    Specs for ``render_images``: every width in every ``variant_formats()``
+    format, keyed like ``webp_640``. Only the width is constrained.
+    """
+    return [
+        (f'{image_format.lower()}_{width}', (width, 1 << 16), image_format)
+        for image_format in variant_formats() for width in widths
+    ]
+
+
+def generate_renditions(instance, field_name, specs):
+    """
+    Render ``specs`` for ``instance.<field_name>`` in the image pool and
+    store them as renditions next to the original. Renditions for these keys
+    that weren't produced this time (e.g. widths larger than the new image)
+    are removed.
+    """
+    source = getattr(instance, field_name)
+    storage = source.storage
+    root, _ = os.path.splitext(source.name)
+
+    with local_path(source) as path:
+        # Background job: wait for a free worker rather than failing.
+        results = run(render_images, path, specs, wait=True)
+
+    renditions = {}
+    for key, data, width, height, image_format in results:
+        renditions[key] = {
+            'name': storage.save(f'{root}_{key}.{EXTENSIONS[image_format]}', ContentFile(data)),
+            'width': width,
+            'height': height,
+            'size': len(data),
+            'format': image_format.lower(),
+        }
+    keys = {key for key, _, _ in specs}
+    stale = [key for key in instance.renditions if key in keys and key not in renditions]
+    instance.update_renditions(remove=stale, **renditions)
+    return renditions
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import time
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from django.http import FileResponse
+from django.test import RequestFactory, override_settings
+from common.serving import StoredFile, serve_file
+
+
+class Command(BaseCommand):
+    help = "Compare media serving throughput: plain FileResponse vs. ranged serve_file vs. proxy offload."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=int, default=256, help="Size of the generated test file.")
+        parser.add_argument('--repeat', type=int, default=5, help="Requests per scenario.")
+
+    def handle(self, *args, **options):
+        size = options['size_mb'] * 1024 * 1024
+        repeat = options['repeat']
+        factory = RequestFactory()
+
+        with tempfile.TemporaryDirectory() as directory:
+            storage = FileSystemStorage(location=directory)
+            with open(os.path.join(directory, 'sermon.mp4'), 'wb') as f:
+                block = os.urandom(1024 * 1024)
+                for _ in range(options['size_mb']):
+                    f.write(block)
+            field_file = StoredFile(storage, 'sermon.mp4')
+            quarter = size // 4
+
+            pieces = ','.join(f'{i * quarter}-{i * quarter + quarter // 4 - 1}' for i in range(4))
+
+            def plain(request):
+                return FileResponse(open(field_file.path, 'rb'))
+
+            def ranged(request):
+                return serve_file(request, field_file)
+
+            scenarios = [
+                ("FileResponse, full file", plain, {}, size),
+                ("serve_file, full file", ranged, {}, size),
+                ("serve_file, one range (1/4)", ranged, {'HTTP_RANGE': f'bytes={quarter}-{2 * quarter - 1}'}, quarter),
+                ("serve_file, 4 ranges (1/4)", ranged, {'HTTP_RANGE': f'bytes={pieces}'}, quarter),
+            ]
+
+            self.stdout.write(f"{options['size_mb']} MB file, {repeat} requests per scenario")
+            for label, view, headers, expected in scenarios:
+                elapsed = 0.0
+                for _ in range(repeat):
+                    request = factory.get('/media/', **headers)
+                    start = time.perf_counter()
+                    response = view(request)
+                    for chunk in response:
+                        pass
+                    response.close()
+                    elapsed += time.perf_counter() - start
+                throughput = expected * repeat / elapsed / (1024 * 1024)
+                self.stdout.write(f"{label:<32} {throughput:10.1f} MB/s")
+
+            with override_settings(MEDIA_ACCEL_BACKEND='nginx'):
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    serve_file(factory.get('/media/'), field_file).close()
+                per_request = (time.perf_counter() - start) / repeat * 1000000
+            self.stdout.write(f"{'X-Accel-Redirect offload':<32} {per_request:10.1f} us/request (no bytes through Python)")
+
@@ -0,0 +1,131 @@
+import datetime
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import NoReverseMatch
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.viewsets import ViewSetMixin
+from common.querybudget import budgeted_views
+
+
+class _Rollback(Exception):
+    pass
+
+
+def seed(rows):
+    """
+    ``rows`` objects of every listed model, each with related users, tags,
+    attendees and scriptures, so per-row queries show up in the counts.
+    """
+    User = get_user_model()
+    now = timezone.now()
+    users = User.objects.bulk_create([User(username=f'budget-{i}', email=f'budget-{i}@example.com') for i in range(rows)])
+
+    def create(label, **fields):
+        """
+        One ``label`` object per user; callables in ``fields`` get the index
+        and the user.
+        """
+        model = apps.get_model(label)
+        return model.objects.bulk_create([
+            model(**{name: value(i, user) if callable(value) else value for name, value in fields.items()})
+            for i, user in enumerate(users)
+        ])
+
+    def link(objs, field, related):
+        # Three related objects each
+        through = getattr(type(objs[0]), field).through
+        source, target = f'{objs[0]._meta.model_name}_id', f'{related[0]._meta.model_name}_id'
+        through.objects.bulk_create([
+            through(**{source: obj.pk, target: related[(i + k) % len(related)].pk})
+            for i, obj in enumerate(objs) for k in range(3)
+        ])
+
+    if apps.is_installed('content'):
+        tags = create('content.Tag', name=lambda i, user: f'budget-tag-{i}')
+        for label in ('content.Article', 'content.BlogPost'):
+            link(create(label, title='Budget', content='<p>Django</p>', author=lambda i, user: user), 'tags', tags)
+        for label, file_field in [('content.Image', 'image'), ('content.Video', 'video'), ('content.Document', 'document')]:
+            objs = create(label, title=lambda i, user: f'Budget {i}', uploaded_by=lambda i, user: user, **{file_field: 'budget/file'})
+            link(objs, 'tags', tags)
+
+    if apps.is_installed('church'):
+        series = create('church.Series', title='Budget')
+        scriptures = create('church.Scripture', book='John', chapter=lambda i, user: i + 1, verse=1)
+        events = create(
+            'church.Event', title='Budget', description='', location='Hall', organizer=lambda i, user: user,
+            date=lambda i, user: now + datetime.timedelta(days=i),
+        )
+        link(events, 'attendees', users)
+        sermons = create(
+            'church.Sermon', title='Budget', description='', date=now, speaker=lambda i, user: user,
+            series=lambda i, user: series[i],
+        )
+        link(sermons, 'scriptures', scriptures)
+        create('church.RatingReview', sermon=lambda i, user: sermons[i], user=lambda i, user: user, rating=5)
+        create('church.Note', sermon=lambda i, user: sermons[i], user=lambda i, user: user, note='Note')
+        create('church.Member', user=lambda i, user: user)
+
+
+class Command(BaseCommand):
+    help = (
+        "Count the queries each list endpoint runs at page size 1 and at the largest page "
+        "size, on seeded data in a rolled-back transaction, and fail if any endpoint goes "
+        "over its declared query_budget."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        autodiscover_modules('views')
+        page_size = options['page_size']
+        failures = []
+        try:
+            # Requests come from the test client's host, whatever the site allows.
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']), transaction.atomic():
+                seed(page_size + 1)
+                admin = get_user_model().objects.create(username='budget-admin', is_superuser=True, is_staff=True)
+                for view_class in budgeted_views():
+                    failures += self._check(view_class, admin, page_size)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        if failures:
+            raise CommandError("Over budget: " + ', '.join(failures))
+        self.stdout.write(self.style.SUCCESS("All endpoints are within their query budgets."))
+
+    def _check(self, view_class, user, page_size):
+        if issubclass(view_class, ViewSetMixin):
+            view = view_class.as_view({'get': 'list'})
+        else:
+            view = view_class.as_view()
+        counts = []
+        for size in (1, page_size):
+            request = APIRequestFactory().get('/', {'page_size': size})
+            force_authenticate(request, user=user)
+            with CaptureQueriesContext(connection) as queries:
+                try:
+                    response = view(request)
+                    response.render()
+                except (ImproperlyConfigured, NoReverseMatch) as e:
+                    raise CommandError(
+                        f"{view_class.__name__} links to URLs that aren't mounted ({e}). "
+                        f"Include the app URLconfs in ROOT_URLCONF ({settings.ROOT_URLCONF})."
+                    )
+            if response.status_code != 200:
+                raise CommandError(f"{view_class.__name__} returned {response.status_code}: {response.content[:200]!r}")
+            counts.append(len(queries))
+
+        name = f'{view_class.__module__}.{view_class.__name__}'
+        ok = max(counts) <= view_class.query_budget
+        status = self.style.SUCCESS('ok') if ok else self.style.ERROR('OVER')
+        self.stdout.write(f"{name:<45} page 1: {counts[0]:3}  page {page_size}: {counts[1]:3}  budget {view_class.query_budget:3}  {status}")
+        return [] if ok else [name]
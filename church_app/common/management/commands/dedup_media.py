@@ -0,0 +1,57 @@
+import os
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from common import uploads
+
+
+class Command(BaseCommand):
+    help = (
+        "Move existing media into the deduplicated blob store and delete blobs nothing "
+        "refers to any more. Every file is converted atomically, so the command can be "
+        "interrupted and re-run at any time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gc-only', action='store_true', help="Only delete unreferenced blobs.")
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be changed.")
+
+    def handle(self, *args, **options):
+        if not hasattr(default_storage, 'intern'):
+            raise CommandError("The default storage is not common.storage.DedupStorage.")
+
+        if not options['gc_only']:
+            self._intern_all(options['dry_run'])
+
+        removed, freed = default_storage.collect_garbage(dry_run=options['dry_run'])
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {removed} unreferenced blobs ({freed / 1048576:.1f} MB)."))
+
+    def _intern_all(self, dry_run):
+        root = os.path.abspath(default_storage.location)
+        skip = {
+            os.path.join(root, default_storage.blob_dir),
+            os.path.abspath(uploads.upload_dir()),
+            os.path.abspath(settings.STATIC_ROOT) if getattr(settings, 'STATIC_ROOT', None) else None,
+        }
+        interned = skipped = saved = 0
+        for directory, subdirectories, files in os.walk(root):
+            subdirectories[:] = [d for d in subdirectories if os.path.join(directory, d) not in skip]
+            for filename in files:
+                path = os.path.join(directory, filename)
+                # A file with other links is already in the blob store; this is
+                # what makes re-runs cheap.
+                if os.stat(path).st_nlink > 1:
+                    skipped += 1
+                    continue
+                interned += 1
+                if dry_run:
+                    continue
+                _, bytes_saved = default_storage.intern(os.path.relpath(path, root))
+                saved += bytes_saved
+
+        verb = "Would move" if dry_run else "Moved"
+        self.stdout.write(
+            f"{verb} {interned} files into the blob store ({saved / 1048576:.1f} MB saved by "
+            f"deduplication), {skipped} already done."
+        )
@@ -0,0 +1,30 @@
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from common.models import SearchEntry
+from common.search import extract_and_index, indexed_fields
+
+
+class Command(BaseCommand):
+    help = "Backfill the full-text index with the text of existing documents and sermon slides."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Re-extract files that are already indexed.")
+
+    def handle(self, *args, **options):
+        indexed = failed = 0
+        for model, field_name in indexed_fields():
+            queryset = model._default_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            if not options['force']:
+                done = SearchEntry.objects.filter(
+                    content_type=ContentType.objects.get_for_model(model), kind=field_name,
+                ).values_list('object_id', flat=True)
+                queryset = queryset.exclude(pk__in=done)
+            for instance in queryset.iterator():
+                try:
+                    extract_and_index(instance, field_name)
+                    indexed += 1
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"{model._meta.label} {instance.pk}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {indexed} indexed, {failed} failed."))
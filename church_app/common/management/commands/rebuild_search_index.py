@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from common.search import index_records, indexed_models
+
+
+class Command(BaseCommand):
+    help = (
+        "Index the titles and text of every existing object of the searchable models "
+        "(articles, blog posts, media, sermons). Uploaded file text is indexed by index_files."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        for model in indexed_models():
+            count = index_records(model, model._default_manager.iterator(chunk_size=2000), options['batch_size'])
+            self.stdout.write(f"{model._meta.label}: {count} indexed")
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,37 @@
+import os
+from django.core.management.base import BaseCommand
+from common import uploads
+from common.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = "Delete chunked upload sessions (and their partial files) untouched for longer than CHUNKED_UPLOAD_EXPIRY."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be deleted.")
+
+    def handle(self, *args, **options):
+        stale = uploads.expired(UploadSession.objects.all())
+        sessions = 0
+        for session in stale.iterator():
+            sessions += 1
+            if not options['dry_run']:
+                path = uploads.partial_path(session)
+                if os.path.exists(path):
+                    os.unlink(path)
+        if not options['dry_run']:
+            stale.delete()
+
+        # Partial files whose session row is already gone.
+        orphans = 0
+        directory = uploads.upload_dir()
+        if os.path.isdir(directory):
+            known = {str(pk) for pk in UploadSession.objects.values_list('pk', flat=True)}
+            for entry in os.scandir(directory):
+                if entry.name.endswith('.part') and entry.name[:-len('.part')] not in known:
+                    orphans += 1
+                    if not options['dry_run']:
+                        os.unlink(entry.path)
+
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {sessions} expired sessions and {orphans} orphaned partial files."))
@@ -0,0 +1,83 @@
+# Generated by Django 5.0.2 on 2026-10-18 18:12
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UploadSession",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("target", models.CharField(max_length=50, verbose_name="Target")),
+                ("filename", models.CharField(max_length=255, verbose_name="Filename")),
+                ("size", models.PositiveBigIntegerField(verbose_name="Size")),
+                (
+                    "offset",
+                    models.PositiveBigIntegerField(default=0, verbose_name="Offset"),
+                ),
+                (
+                    "checksum",
+                    models.CharField(
+                        blank=True, max_length=64, verbose_name="SHA-256 Checksum"
+                    ),
+                ),
+                (
+                    "metadata",
+                    models.JSONField(blank=True, default=dict, verbose_name="Metadata"),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("active", "Active"), ("complete", "Complete")],
+                        default="active",
+                        max_length=10,
+                        verbose_name="Status",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created At"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated At"),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="upload_sessions",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="User",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Upload Session",
+                "verbose_name_plural": "Upload Sessions",
+                "indexes": [
+                    models.Index(
+                        fields=["status", "updated_at"], name="uploadsession_sweep_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,121 @@
+# Generated by Django 5.0.2 on 2026-10-18 18:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SQLITE_FTS = [
+    """
+    CREATE VIRTUAL TABLE common_searchentry_fts USING fts5(
+        title, body,
+        content='common_searchentry', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER common_searchentry_fts_ai AFTER INSERT ON common_searchentry BEGIN
+        INSERT INTO common_searchentry_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER common_searchentry_fts_ad AFTER DELETE ON common_searchentry BEGIN
+        INSERT INTO common_searchentry_fts(common_searchentry_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER common_searchentry_fts_au AFTER UPDATE ON common_searchentry BEGIN
+        INSERT INTO common_searchentry_fts(common_searchentry_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO common_searchentry_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+SQLITE_FTS_REVERSE = [
+    "DROP TRIGGER IF EXISTS common_searchentry_fts_au",
+    "DROP TRIGGER IF EXISTS common_searchentry_fts_ad",
+    "DROP TRIGGER IF EXISTS common_searchentry_fts_ai",
+    "DROP TABLE IF EXISTS common_searchentry_fts",
+]
+
+POSTGRES_FTS = [
+    """
+    ALTER TABLE common_searchentry ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(body, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX common_searchentry_search_idx ON common_searchentry USING GIN (search_vector)",
+]
+
+POSTGRES_FTS_REVERSE = [
+    "DROP INDEX IF EXISTS common_searchentry_search_idx",
+    "ALTER TABLE common_searchentry DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_fts_index(apps, schema_editor):
+    # The full-text index lives outside the ORM; see common/search.py.
+    # Note that a SQLite table rebuild of common_searchentry drops the triggers.
+    _run(schema_editor, {"sqlite": SQLITE_FTS, "postgresql": POSTGRES_FTS})
+
+
+def drop_fts_index(apps, schema_editor):
+    _run(
+        schema_editor,
+        {"sqlite": SQLITE_FTS_REVERSE, "postgresql": POSTGRES_FTS_REVERSE},
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("common", "0001_initial"),
+        ("contenttypes", "0002_remove_content_type_name"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("object_id", models.PositiveBigIntegerField(verbose_name="Object ID")),
+                ("kind", models.CharField(max_length=30, verbose_name="Kind")),
+                (
+                    "title",
+                    models.CharField(blank=True, max_length=200, verbose_name="Title"),
+                ),
+                ("body", models.TextField(blank=True, verbose_name="Body")),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated At"),
+                ),
+                (
+                    "content_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="contenttypes.contenttype",
+                        verbose_name="Content Type",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Search Entry",
+                "verbose_name_plural": "Search Entries",
+                "unique_together": {("content_type", "object_id", "kind")},
+            },
+        ),
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
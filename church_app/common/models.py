@@ -1,3 +1,136 @@
-from django.db import models
+import uuid
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+User = get_user_model()
+
+
+class RenditionsModel(models.Model):
+    """
+    Abstract base for models whose uploads get derived files (thumbnails,
+    posters, ...) written by the media pipeline. ``renditions`` maps a key to
+    the rendition's storage name plus whatever metadata the stage records.
+    """
+    renditions = models.JSONField(default=dict, blank=True, editable=False, verbose_name=_("Renditions"))
+
+    class Meta:
+        abstract = True
+
+    def rendition_url(self, key):
+        """
+        URL of a generated rendition, or None while it is still pending.
+        """
+        rendition = self.renditions.get(key)
+        if rendition:
+            return default_storage.url(rendition['name'])
+        return None
+
+    def update_renditions(self, remove=(), **renditions):
+        """
+        Merge ``renditions`` into the stored ones under a row lock, so stages
+        running for different fields of the same row don't overwrite each other.
+        Keys in ``remove`` are dropped. Files of replaced or removed renditions
+        are deleted afterwards.
+        """
+        model = type(self)
+        with transaction.atomic():
+            current = model.objects.select_for_update().values_list('renditions', flat=True).get(pk=self.pk) or {}
+            replaced = [
+                current[key]['name'] for key, rendition in renditions.items()
+                if key in current and current[key]['name'] != rendition['name']
+            ]
+            replaced += [current.pop(key)['name'] for key in remove if key in current]
+            current.update(renditions)
+            model.objects.filter(pk=self.pk).update(renditions=current)
+            # .update() sends no signals; keep HTTP validators current.
+            ResourceVersion.bump(model)
+        for name in replaced:
+            default_storage.delete(name)
+        self.renditions = current
+
+
+class UploadSession(models.Model):
+    """
+    A resumable chunked upload (see common/uploads.py). Bytes are appended to
+    a partial file on disk; ``offset`` is how much of it has been received.
+    """
+    STATUS_CHOICES = [
+        ('active', _('Active')),
+        ('complete', _('Complete')),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions', verbose_name=_("User"))
+    target = models.CharField(max_length=50, verbose_name=_("Target"))
+    filename = models.CharField(max_length=255, verbose_name=_("Filename"))
+    size = models.PositiveBigIntegerField(verbose_name=_("Size"))
+    offset = models.PositiveBigIntegerField(default=0, verbose_name=_("Offset"))
+    checksum = models.CharField(max_length=64, blank=True, verbose_name=_("SHA-256 Checksum"))
+    metadata = models.JSONField(default=dict, blank=True, verbose_name=_("Metadata"))
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active', verbose_name=_("Status"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
+
+    class Meta:
+        verbose_name = _("Upload Session")
+        verbose_name_plural = _("Upload Sessions")
+        indexes = [
+            models.Index(fields=['status', 'updated_at'], name='uploadsession_sweep_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+
+class SearchEntry(models.Model):
+    """
+    One searchable text for an object, e.g. the text extracted from an
+    uploaded file. The full-text index over ``title``/``body`` lives outside
+    the ORM (FTS5 on SQLite, tsvector + GIN on PostgreSQL); see common/search.py.
+    """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, verbose_name=_("Content Type"))
+    object_id = models.PositiveBigIntegerField(verbose_name=_("Object ID"))
+    kind = models.CharField(max_length=30, verbose_name=_("Kind"))
+    title = models.CharField(max_length=200, blank=True, verbose_name=_("Title"))
+    body = models.TextField(blank=True, verbose_name=_("Body"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
+
+    class Meta:
+        verbose_name = _("Search Entry")
+        verbose_name_plural = _("Search Entries")
+        unique_together = ('content_type', 'object_id', 'kind')
+
+    def __str__(self):
+        return f"{self.content_type.model} {self.object_id} ({self.kind})"
+
+
+class ResourceVersion(models.Model):
+    """
+    A counter per model, bumped on every change to its rows (see
+    common/conditional.py). API responses derive their ETag and
+    Last-Modified from these without reading the rows themselves.
+    """
+    label = models.CharField(max_length=100, unique=True, verbose_name=_("Model"))
+    version = models.PositiveBigIntegerField(default=0, verbose_name=_("Version"))
+    changed_at = models.DateTimeField(default=timezone.now, verbose_name=_("Changed At"))
+
+    class Meta:
+        verbose_name = _("Resource Version")
+        verbose_name_plural = _("Resource Versions")
+
+    def __str__(self):
+        return f"{self.label} v{self.version}"
+
+    @classmethod
+    def bump(cls, model):
+        label = model._meta.label_lower
+        now = timezone.now()
+        if not cls.objects.filter(label=label).update(version=F('version') + 1, changed_at=now):
+            _, created = cls.objects.get_or_create(label=label, defaults={'version': 1, 'changed_at': now})
+            if not created:
+                cls.objects.filter(label=label).update(version=F('version') + 1, changed_at=now)
@@ -0,0 +1,220 @@
+import logging
+import os
+import struct
+import tempfile
+from .models import ResourceVersion
+
+logger = logging.getLogger(__name__)
+
+COPY_CHUNK_SIZE = 1024 * 1024
+# moov holds only sample tables; anything bigger than this is not a file we
+# want to load into memory.
+MAX_MOOV_SIZE = 64 * 1024 * 1024
+
+# Boxes on the path from moov to the chunk offset tables.
+CONTAINER_BOXES = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+
+
+class MP4Error(Exception):
+    pass
+
+
+def read_top_level_boxes(f):
+    """
+    List the top-level boxes of an open MP4 file as ``(type, offset, size)``
+    tuples without reading their payloads.
+    """
+    f.seek(0, os.SEEK_END)
+    file_size = f.tell()
+    boxes = []
+    offset = 0
+    while offset < file_size:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            raise MP4Error("Truncated box header")
+        size, box_type = struct.unpack('>I4s', header)
+        if size == 1:
+            size = struct.unpack('>Q', f.read(8))[0]
+        elif size == 0:
+            size = file_size - offset
+        if size < 8 or offset + size > file_size:
+            raise MP4Error(f"Invalid size for box {box_type!r} at {offset}")
+        boxes.append((box_type, offset, size))
+        offset += size
+    return boxes
+
+
+def is_mp4(path):
+    with open(path, 'rb') as f:
+        header = f.read(8)
+    return len(header) == 8 and header[4:8] == b'ftyp'
+
+
+def _parse_children(data):
+    children = []
+    offset = 0
+    while offset < len(data):
+        size, box_type = struct.unpack_from('>I4s', data, offset)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack_from('>Q', data, offset + 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = len(data) - offset
+        if size < header_size or offset + size > len(data):
+            raise MP4Error(f"Invalid size for box {box_type!r} inside moov")
+        payload = data[offset + header_size:offset + size]
+        if box_type in CONTAINER_BOXES:
+            children.append([box_type, _parse_children(payload)])
+        else:
+            children.append([box_type, payload])
+        offset += size
+    return children
+
+
+def _serialize(boxes):
+    out = bytearray()
+    for box_type, payload in boxes:
+        body = _serialize(payload) if isinstance(payload, list) else payload
+        if len(body) + 8 > 0xFFFFFFFF:
+            out += struct.pack('>I4sQ', 1, box_type, len(body) + 16)
+        else:
+            out += struct.pack('>I4s', len(body) + 8, box_type)
+        out += body
+    return bytes(out)
+
+
+def _offset_tables(boxes):
+    for box in boxes:
+        if isinstance(box[1], list):
+            yield from _offset_tables(box[1])
+        elif box[0] in (b'stco', b'co64'):
+            yield box
+
+
+def _relocate_offsets(moov, relocate):
+    """
+    Map every chunk offset through ``relocate``, upgrading 32-bit ``stco``
+    tables to ``co64`` where the new offsets would overflow.
+    """
+    for box in _offset_tables(moov):
+        box_type, payload = box
+        version_flags, count = struct.unpack_from('>4sI', payload)
+        width = 'I' if box_type == b'stco' else 'Q'
+        offsets = [relocate(o) for o in struct.unpack_from(f'>{count}{width}', payload, 8)]
+        if width == 'I' and offsets and max(offsets) > 0xFFFFFFFF:
+            box[0], width = b'co64', 'Q'
+        box[1] = version_flags + struct.pack(f'>I{count}{width}', count, *offsets)
+
+
+def _relocated_moov(payload, moov_offset, moov_size):
+    """
+    Build the moov box for its new position in front of the media data.
+    Data before the old moov moves forward by the new moov size; data after it
+    only by however much moov grew.
+    """
+    new_size = moov_size
+    while True:
+        moov = _parse_children(payload)
+        _relocate_offsets(moov, lambda o: o + new_size if o < moov_offset else o + new_size - moov_size)
+        data = _serialize([[b'moov', moov]])
+        if len(data) == new_size:
+            return data
+        # An stco -> co64 upgrade grew moov; redo with the final size.
+        new_size = len(data)
+
+
+def _copy_range(src, dst, offset, size):
+    src.seek(offset)
+    remaining = size
+    while remaining > 0:
+        data = src.read(min(COPY_CHUNK_SIZE, remaining))
+        if not data:
+            raise MP4Error("Unexpected end of file")
+        dst.write(data)
+        remaining -= len(data)
+
+
+def faststart(path):
+    """
+    Move the ``moov`` box in front of the media data so playback can start
+    after the first few hundred KB. Boxes are streamed, nothing is re-encoded,
+    and only moov is held in memory. The rewritten file replaces ``path``
+    atomically.
+
+    Returns the top-level box index of the resulting file as a list of
+    ``(type, offset, size)`` and whether a rewrite was needed.
+    """
+    with open(path, 'rb') as src:
+        boxes = read_top_level_boxes(src)
+        types = [box[0] for box in boxes]
+        if b'moov' not in types or b'mdat' not in types:
+            raise MP4Error("Not a progressive MP4 (missing moov or mdat)")
+        moov_index = types.index(b'moov')
+        first_mdat = types.index(b'mdat')
+        if moov_index < first_mdat:
+            return boxes, False
+
+        _, moov_offset, moov_size = boxes[moov_index]
+        if moov_size > MAX_MOOV_SIZE:
+            raise MP4Error(f"moov box too large ({moov_size} bytes)")
+        src.seek(moov_offset)
+        header_size = 16 if struct.unpack('>I', src.read(4))[0] == 1 else 8
+        src.seek(moov_offset + header_size)
+        new_moov = _relocated_moov(src.read(moov_size - header_size), moov_offset, moov_size)
+
+        directory = os.path.dirname(path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.faststart')
+        try:
+            with os.fdopen(fd, 'wb') as dst:
+                for box_type, offset, size in boxes[:first_mdat]:
+                    _copy_range(src, dst, offset, size)
+                dst.write(new_moov)
+                for box_type, offset, size in boxes[first_mdat:]:
+                    if box_type != b'moov':
+                        _copy_range(src, dst, offset, size)
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    with open(path, 'rb') as f:
+        return read_top_level_boxes(f), True
+
+
+def faststart_stage(instance, field_name):
+    """
+    Media pipeline stage: rewrite an uploaded MP4 to fast-start layout and
+    record its top-level box index in ``instance.media_info['mp4']``, so
+    clients can fetch ``moov`` plus the first frames with one small Range
+    request.
+    """
+    source = getattr(instance, field_name)
+    try:
+        path = source.path
+    except NotImplementedError:
+        logger.warning(f"Skipping fast-start for {source.name}: storage has no local path")
+        return
+    if not is_mp4(path):
+        return
+
+    boxes, rewritten = faststart(path)
+    intern = getattr(source.storage, 'intern', None)
+    if rewritten and intern is not None:
+        # The rewrite replaced the file with a new inode; put it back in the
+        # deduplicated blob store.
+        intern(source.name)
+    media_info = dict(instance.media_info)
+    media_info['mp4'] = {
+        'faststart': True,
+        'boxes': [{'type': box_type.decode('latin-1'), 'offset': offset, 'size': size} for box_type, offset, size in boxes],
+    }
+    type(instance).objects.filter(pk=instance.pk).update(media_info=media_info)
+    ResourceVersion.bump(type(instance))
+    instance.media_info = media_info
+    if rewritten:
+        logger.info(f"Moved moov to the front of {source.name}")
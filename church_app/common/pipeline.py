@@ -0,0 +1,72 @@
+import logging
+from collections import defaultdict
+from django.apps import apps
+from django.db.models.signals import pre_save, post_save
+from . import tasks
+
+logger = logging.getLogger(__name__)
+
+# (model label, field name) -> [(priority, stage), ...]
+_stages = defaultdict(list)
+
+
+def register(model, field_name, stage, priority=100):
+    """
+    Register ``stage(instance, field_name)`` to run in the background whenever a
+    new file is saved to ``model.field_name``. Stages for the same field run one
+    after another, lowest ``priority`` first.
+    """
+    key = (model._meta.label_lower, field_name)
+    _stages[key].append((priority, stage))
+    _stages[key].sort(key=lambda item: item[0])
+
+    uid = f'media_pipeline_{model._meta.label_lower}'
+    pre_save.connect(_collect_new_files, sender=model, dispatch_uid=f'{uid}_pre')
+    post_save.connect(_schedule_new_files, sender=model, dispatch_uid=f'{uid}_post')
+
+
+def registered_fields(model):
+    label = model._meta.label_lower
+    return [field_name for (model_label, field_name) in _stages if model_label == label]
+
+
+def _collect_new_files(sender, instance, raw=False, **kwargs):
+    # FileField.pre_save commits the upload after this signal fires, so an
+    # uncommitted file here means a new upload for that field.
+    if raw:
+        return
+    pending = []
+    for field_name in registered_fields(sender):
+        file = getattr(instance, field_name)
+        if file and not file._committed:
+            pending.append(field_name)
+    instance._media_pipeline_pending = pending
+
+
+def _schedule_new_files(sender, instance, raw=False, **kwargs):
+    for field_name in instance.__dict__.pop('_media_pipeline_pending', []):
+        schedule(instance, field_name)
+
+
+def schedule(instance, field_name):
+    """
+    Queue every stage registered for ``instance.field_name``. Call this directly
+    when a file is attached without going through ``Model.save``.
+    """
+    tasks.enqueue(run_stages, instance._meta.label_lower, instance.pk, field_name)
+
+
+def run_stages(label, pk, field_name):
+    """
+    Run the stages registered for a field synchronously. Each stage gets a fresh
+    instance so it sees whatever earlier stages wrote.
+    """
+    model = apps.get_model(label)
+    for _, stage in _stages[(label, field_name)]:
+        instance = model._default_manager.filter(pk=pk).first()
+        if instance is None or not getattr(instance, field_name):
+            return
+        try:
+            stage(instance, field_name)
+        except Exception:
+            logger.exception(f"Media stage {stage.__name__} failed for {label} {pk} ({field_name})")
@@ -0,0 +1,36 @@
+_budgeted_views = []
+
+
+class QueryBudgetMixin:
+    """
+    Declares how a view loads related objects and how many queries one list
+    page may cost.
+
+    ``select_related_fields`` and ``prefetch_related_fields`` are applied to
+    ``get_queryset()``, so nested serializers never query per row.
+    ``query_budget`` is the number of queries a list request may run,
+    whatever the page size; ``manage.py check_query_budgets`` enforces it.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+    query_budget = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _budgeted_views.append(cls)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.select_related_fields:
+            queryset = queryset.select_related(*self.select_related_fields)
+        if self.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*self.prefetch_related_fields)
+        return queryset
+
+
+def budgeted_views():
+    """
+    Views that declare a ``query_budget``. Views modules must be imported
+    first (see ``check_query_budgets``).
+    """
+    return [view for view in _budgeted_views if view.query_budget is not None]
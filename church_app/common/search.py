@@ -0,0 +1,289 @@
+import logging
+import re
+from django.contrib.contenttypes.models import ContentType
+from django.db import DatabaseError, connection
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from rest_framework import filters
+from rest_framework.settings import api_settings
+from . import pipeline
+from .extract import can_extract, extract_text_in_pool
+from .files import local_path
+from .models import SearchEntry
+from .text import html_to_text
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on index hits merged into a filtered queryset.
+MAX_SEARCH_HITS = 1000
+
+FTS_TABLE = 'common_searchentry_fts'
+
+_term_re = re.compile(r'"([^"]*)"|(\S+)')
+_word_re = re.compile(r'\w+')
+
+# Entry kind for the text of an object's own fields (files use the field name).
+RECORD_KIND = 'record'
+
+# (model, field name) pairs whose files are indexed, for backfills.
+_indexed_fields = []
+# model -> (title field, body fields) for models whose own text is indexed.
+_indexed_models = {}
+
+
+def fts5_query(text):
+    """
+    Turn user input into a safe FTS5 query: every word or ``"quoted phrase"``
+    becomes a quoted FTS5 phrase and all of them must match.
+    """
+    phrases = []
+    for phrase, word in _term_re.findall(text):
+        words = _word_re.findall(phrase or word)
+        if words:
+            phrases.append('"' + ' '.join(words) + '"')
+    return ' '.join(phrases)
+
+
+def index(obj, kind, title, body):
+    """
+    Store (or replace) the searchable text of ``obj`` under ``kind``.
+    """
+    SearchEntry.objects.update_or_create(
+        content_type=ContentType.objects.get_for_model(obj),
+        object_id=obj.pk,
+        kind=kind,
+        defaults={'title': title[:200], 'body': body},
+    )
+
+
+def record_entry(obj):
+    """
+    ``(title, body)`` of a registered model instance, with HTML stripped.
+    """
+    title_field, body_fields = _indexed_models[type(obj)]
+    body = '\n'.join(html_to_text(getattr(obj, field_name)) for field_name in body_fields)
+    return str(getattr(obj, title_field) or ''), body
+
+
+def index_records(model, objs, batch_size=500):
+    """
+    Index the text of many ``model`` instances at once, e.g. after
+    ``bulk_create`` or for a rebuild. Returns the number indexed.
+    """
+    content_type = ContentType.objects.get_for_model(model)
+    count = 0
+    batch = []
+    for obj in objs:
+        title, body = record_entry(obj)
+        batch.append(SearchEntry(content_type=content_type, object_id=obj.pk, kind=RECORD_KIND, title=title[:200], body=body))
+        if len(batch) >= batch_size:
+            count += _upsert(batch)
+            batch = []
+    if batch:
+        count += _upsert(batch)
+    return count
+
+
+def _upsert(entries):
+    SearchEntry.objects.bulk_create(
+        entries,
+        update_conflicts=True,
+        unique_fields=['content_type', 'object_id', 'kind'],
+        update_fields=['title', 'body', 'updated_at'],
+    )
+    return len(entries)
+
+
+def unindex(obj, kind=None):
+    entries = SearchEntry.objects.filter(content_type=ContentType.objects.get_for_model(obj), object_id=obj.pk)
+    if kind is not None:
+        entries = entries.filter(kind=kind)
+    entries.delete()
+
+
+def _match_sql(model, query, within=None):
+    """
+    ``(sql, params, rank)``: SQL selecting the ids of ``model`` objects whose
+    indexed text matches ``query`` (restricted to the primary keys of the
+    queryset ``within``, if given), and the SQL expression of a row's rank,
+    lower is better. None if the query can't match anything.
+    """
+    content_type = ContentType.objects.get_for_model(model)
+    if within is not None:
+        within_sql, within_params = within.order_by().values('pk').query.sql_with_params()
+    if connection.vendor == 'sqlite':
+        match = fts5_query(query)
+        if not match:
+            return None
+        sql = (
+            f'SELECT e.object_id FROM {FTS_TABLE} f JOIN common_searchentry e ON e.id = f.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s AND e.content_type_id = %s'
+        )
+        params = [match, content_type.pk]
+        rank = f'bm25({FTS_TABLE}, 10.0, 1.0)'
+    elif connection.vendor == 'postgresql':
+        sql = (
+            "SELECT e.object_id FROM common_searchentry e, websearch_to_tsquery('english', %s) q "
+            "WHERE e.content_type_id = %s AND e.search_vector @@ q"
+        )
+        params = [query, content_type.pk]
+        rank = '-ts_rank(e.search_vector, q)'
+    else:
+        entries = SearchEntry.objects.filter(content_type=content_type, body__icontains=query)
+        if within is not None:
+            entries = entries.filter(object_id__in=within.order_by().values('pk'))
+        sql, params = entries.values('object_id').query.sql_with_params()
+        return sql, list(params), 'object_id'
+    if within is not None:
+        sql += f' AND e.object_id IN ({within_sql})'
+        params.extend(within_params)
+    return sql, params, rank
+
+
+def matching_ids(model, query, limit=MAX_SEARCH_HITS, within=None):
+    """
+    Primary keys of ``model`` objects whose indexed text matches ``query``,
+    best match first, at most ``limit``; only those also in the queryset
+    ``within`` if given. Uses FTS5 (bm25, title weighted over body) on
+    SQLite and the tsvector column on PostgreSQL; other backends fall back
+    to a plain substring scan. Words are stemmed and ``"quoted phrases"``
+    must match as phrases.
+    """
+    found = _match_sql(model, query, within)
+    if found is None:
+        return []
+    sql, params, rank = found
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{sql} ORDER BY {rank} LIMIT %s', [*params, limit])
+            rows = cursor.fetchall()
+    except DatabaseError:
+        logger.exception(f"Full-text query failed for {query!r}")
+        return []
+    # An object can match through several entries (its fields and files).
+    return list(dict.fromkeys(row[0] for row in rows))
+
+
+def matching(queryset, query):
+    """
+    ``queryset`` narrowed to objects whose indexed text matches ``query``.
+    The match is a subquery, so it has no limit and later filters, counts
+    and pages see every hit.
+    """
+    found = _match_sql(queryset.model, query)
+    if found is None:
+        return queryset.none()
+    sql, params, _ = found
+    return queryset.filter(pk__in=RawSQL(sql, params))
+
+
+def extract_and_index(instance, field_name):
+    """
+    Media pipeline stage: extract the text of an uploaded document in the
+    extraction process pool and index it under the field's name.
+    """
+    source = getattr(instance, field_name)
+    if not can_extract(source.name):
+        logger.info(f"No text extractor for {source.name}")
+        return
+    with local_path(source) as path:
+        text = extract_text_in_pool(path, source.name)
+    index(instance, field_name, str(instance), text)
+    logger.info(f"Indexed {len(text)} characters from {source.name}")
+
+
+def _unindex_deleted(sender, instance, **kwargs):
+    unindex(instance)
+
+
+def register(model, field_name):
+    """
+    Index the text of every new upload to ``model.field_name`` and drop the
+    entries when the object is deleted.
+    """
+    pipeline.register(model, field_name, extract_and_index)
+    post_delete.connect(_unindex_deleted, sender=model, dispatch_uid=f'search_index_{model._meta.label_lower}')
+    _indexed_fields.append((model, field_name))
+
+
+def indexed_fields():
+    return list(_indexed_fields)
+
+
+def _index_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    title_field, body_fields = _indexed_models[sender]
+    if update_fields is not None and not {title_field, *body_fields} & set(update_fields):
+        return
+    title, body = record_entry(instance)
+    index(instance, RECORD_KIND, title, body)
+
+
+def register_model(model, title_field='title', body_fields=()):
+    """
+    Keep the text of ``model``'s own fields in the full-text index: updated
+    on every save that touches them and dropped on delete. HTML is stripped
+    from body fields.
+    """
+    _indexed_models[model] = (title_field, tuple(body_fields))
+    uid = f'search_index_{model._meta.label_lower}'
+    post_save.connect(_index_saved, sender=model, dispatch_uid=f'{uid}_save')
+    post_delete.connect(_unindex_deleted, sender=model, dispatch_uid=uid)
+
+
+def indexed_models():
+    return list(_indexed_models)
+
+
+def rank_ordering(ids):
+    """
+    An ``order_by`` expression that sorts rows in the order of ``ids``.
+    """
+    return Case(*[When(pk=pk, then=Value(i)) for i, pk in enumerate(ids)], default=Value(len(ids)), output_field=IntegerField())
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    ``?search=`` backed by the full-text index (see ``register_model``).
+    For indexed models the index alone decides matches, with results in rank
+    order unless ``?ordering=`` is given; no LIKE scan is run. For other
+    models it is ``SearchFilter`` plus matches in their indexed file text.
+
+    Matches are narrowed by the filters that ran before this one without a
+    limit; only the rank order is bounded, to the best MAX_SEARCH_HITS of
+    them (the rest follow by primary key).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search = request.query_params.get(self.search_param, '')
+        if not search.strip():
+            return queryset
+        if queryset.model in _indexed_models:
+            matches = matching(queryset, search)
+            if 'ordering' not in request.query_params:
+                ids = matching_ids(queryset.model, search, within=queryset)
+                matches = matches.order_by(rank_ordering(ids), 'pk')
+            return matches
+
+        filtered = super().filter_queryset(request, queryset, view)
+        matches = matching(queryset, search)
+        if not self.get_search_fields(view, request):
+            return matches
+        if filtered.query.distinct:
+            matches = matches.distinct()
+        return filtered | matches
+
+
+class SearchAwareOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter that keeps the rank order of FullTextSearchFilter: the
+    view's default ``ordering`` only applies without ``?search=``.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        searching = request.query_params.get(api_settings.SEARCH_PARAM, '').strip()
+        if searching and self.ordering_param not in request.query_params:
+            return None
+        return super().get_ordering(request, queryset, view)
@@ -0,0 +1,91 @@
+from PIL import Image as PILImage
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+from . import imaging
+from .models import UploadSession
+from .uploads import UploadError, get_target
+
+
+class RenditionURLMixin:
+    """
+    Serializer helpers for exposing pipeline renditions (see
+    common.models.RenditionsModel) as absolute URLs without touching the files.
+    """
+
+    def absolute_url(self, url):
+        request = self.context.get('request')
+        if url and request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def rendition_url(self, obj, key):
+        return self.absolute_url(obj.rendition_url(key))
+
+    def rendition_data(self, obj, key):
+        """
+        The stored metadata of a rendition with its storage name swapped for a URL.
+        """
+        rendition = obj.renditions.get(key)
+        if not rendition:
+            return None
+        data = {k: v for k, v in rendition.items() if k != 'name'}
+        data['url'] = self.rendition_url(obj, key)
+        return data
+
+    def srcset(self, obj, formats=('avif', 'webp', 'jpeg')):
+        """
+        The responsive variants of ``obj`` (see common.imaging.variant_specs)
+        as ``{width, height, format, url, size}`` dicts, smallest first.
+        """
+        variants = [
+            self.rendition_data(obj, key) for key in obj.renditions
+            if key.split('_')[0] in formats
+        ]
+        return sorted(variants, key=lambda variant: (variant['width'], formats.index(variant['format'])))
+
+
+class ImagePoolBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "The server is busy processing other images. Please try again shortly."
+    default_code = 'image_pool_busy'
+
+
+class SafeImageField(serializers.ImageField):
+    """
+    ImageField that validates uploads in the bounded image pool (see
+    common/imaging.py) instead of decoding them in the web worker. When the
+    pool is saturated the request fails fast with 503.
+    """
+
+    def to_internal_value(self, data):
+        file_object = serializers.FileField.to_internal_value(self, data)
+        try:
+            info = imaging.inspect_upload(file_object)
+        except imaging.ImageRejected as e:
+            raise serializers.ValidationError(str(e), code='invalid_image')
+        except imaging.ImagePoolBusy:
+            raise ImagePoolBusy()
+        file_object.content_type = PILImage.MIME.get(info['format'])
+        return file_object
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'target', 'filename', 'size', 'offset', 'checksum', 'metadata', 'status', 'created_at', 'updated_at']
+        read_only_fields = ('id', 'offset', 'status', 'created_at', 'updated_at')
+
+    def validate_checksum(self, value):
+        if value and (len(value) != 64 or any(c not in '0123456789abcdefABCDEF' for c in value)):
+            raise serializers.ValidationError("Checksum must be a hex SHA-256 digest.")
+        return value.lower()
+
+    def validate(self, attrs):
+        try:
+            target = get_target(attrs['target'])
+            if target.max_size is not None and attrs['size'] > target.max_size:
+                raise UploadError({'size': [f"Uploads for '{target.name}' must be under {target.max_size // (1024 * 1024)} MB."]})
+            attrs['metadata'] = target.validate(attrs.get('metadata', {}), attrs['filename'], self.context['request'].user)
+        except UploadError as e:
+            raise serializers.ValidationError(e.detail)
+        return attrs
@@ -0,0 +1,313 @@
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import uuid
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.renderers import BaseRenderer
+
+STREAM_BLOCK_SIZE = 256 * 1024
+# More ranges than this in one request get the whole file instead; lots of
+# tiny ranges are a known amplification trick.
+MAX_RANGES = 16
+
+_range_re = re.compile(r'^\s*(\d*)\s*-\s*(\d*)\s*$')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Image variant formats, best first, and the media types that ask for them.
+IMAGE_FORMAT_PREFERENCE = ('avif', 'webp', 'jpeg')
+IMAGE_MEDIA_TYPES = {
+    'image/avif': 'avif',
+    'image/webp': 'webp',
+    'image/jpeg': 'jpeg',
+    'image/*': 'jpeg',
+    '*/*': 'jpeg',
+}
+
+
+class PassthroughRenderer(BaseRenderer):
+    """
+    Lets media actions answer any ``Accept`` header (players send things like
+    ``video/*``); error payloads are still rendered as JSON.
+    """
+    media_type = '*/*'
+    format = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, bytes):
+            return data
+        return json.dumps(data).encode()
+
+
+class StoredFile:
+    """
+    A stored file that isn't attached to a model field (e.g. a rendition),
+    with the bits of FieldFile that serve_file uses.
+    """
+
+    def __init__(self, storage, name):
+        self.storage = storage
+        self.name = name
+
+    @property
+    def path(self):
+        return self.storage.path(self.name)
+
+
+def file_version(rendition, storage=default_storage):
+    """
+    Short token that changes whenever the content of a rendition changes,
+    for cache-busting ``?v=`` parameters. Storage names are reused once the
+    old file is deleted, so the token comes from the stored ``sha256`` of
+    the content, or else from the file's size and modification time.
+    """
+    digest = rendition.get('sha256')
+    if not digest:
+        try:
+            stat = os.stat(storage.path(rendition['name']))
+        except (OSError, NotImplementedError):
+            return ''
+        digest = hashlib.sha1(f"{rendition['name']}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()
+    return digest[:12]
+
+
+def parse_range_header(header, size):
+    """
+    Parse ``Range: bytes=...`` into a sorted list of merged, inclusive
+    ``(start, end)`` pairs clipped to ``size``. Returns None if the header
+    should be ignored and ``[]`` if no range is satisfiable.
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes':
+        return None
+    ranges = []
+    for part in spec.split(','):
+        match = _range_re.match(part)
+        if not match:
+            return None
+        first, last = match.groups()
+        if first == '' and last == '':
+            return None
+        if first == '':
+            # Suffix range: the last N bytes.
+            length = int(last)
+            if length == 0:
+                continue
+            start, end = max(size - length, 0), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            if last and int(last) < start:
+                return None
+            if start >= size:
+                continue
+        ranges.append((start, end))
+    if len(ranges) > MAX_RANGES:
+        return None
+
+    ranges.sort()
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _read_range(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            data = f.read(min(STREAM_BLOCK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def _multipart(path, ranges, size, content_type, boundary):
+    for start, end in ranges:
+        yield _part_header(boundary, content_type, start, end, size)
+        yield from _read_range(path, start, end)
+    yield f'\r\n--{boundary}--\r\n'.encode()
+
+
+def _part_header(boundary, content_type, start, end, size):
+    return (
+        f'\r\n--{boundary}\r\n'
+        f'Content-Type: {content_type}\r\n'
+        f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n'
+    ).encode()
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in [t.strip() for t in if_none_match.split(',')]
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+    return if_modified_since is not None and int(mtime) <= if_modified_since
+
+
+def _if_range_matches(request, etag, mtime):
+    if_range = request.headers.get('If-Range')
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    date = parse_http_date_safe(if_range)
+    return date is not None and int(mtime) == date
+
+
+def _offload_response(field_file, path, content_type):
+    """
+    Hand the transfer to the front proxy. It does Range and conditional
+    handling itself, so Python never reads the media bytes.
+    """
+    backend = getattr(settings, 'MEDIA_ACCEL_BACKEND', None)
+    response = HttpResponse(content_type=content_type)
+    if backend == 'nginx':
+        prefix = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix + field_file.name.replace(os.sep, '/')
+    elif backend in ('apache', 'sendfile'):
+        response['X-Sendfile'] = path
+    else:
+        raise ValueError(f"Unknown MEDIA_ACCEL_BACKEND '{backend}'")
+    return response
+
+
+def serve_file(request, field_file, content_type=None):
+    """
+    Serve a stored file with support for conditional requests, single and
+    multiple byte ranges and ``If-Range``. With ``MEDIA_ACCEL_BACKEND`` set
+    (``'nginx'`` for X-Accel-Redirect, ``'apache'`` for X-Sendfile) the
+    transfer is delegated to the front proxy instead.
+    """
+    path = field_file.path
+    content_type = content_type or mimetypes.guess_type(field_file.name)[0] or 'application/octet-stream'
+
+    if getattr(settings, 'MEDIA_ACCEL_BACKEND', None):
+        return _offload_response(field_file, path, content_type)
+
+    stat = os.stat(path)
+    size, mtime = stat.st_size, stat.st_mtime
+    etag = f'"{size:x}-{int(mtime * 1000000):x}"'
+
+    def finish(response):
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(mtime)
+        return response
+
+    if _not_modified(request, etag, mtime):
+        return finish(HttpResponse(status=304))
+
+    range_header = request.headers.get('Range')
+    ranges = None
+    if range_header and _if_range_matches(request, etag, mtime):
+        ranges = parse_range_header(range_header, size)
+
+    if ranges is None:
+        # Whole file: FileResponse lets the WSGI server use sendfile.
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['Content-Length'] = size
+        return finish(response)
+
+    if not ranges:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return finish(response)
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        response = StreamingHttpResponse(_read_range(path, start, end), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+        return finish(response)
+
+    boundary = uuid.uuid4().hex
+    length = sum(
+        len(_part_header(boundary, content_type, start, end, size)) + end - start + 1
+        for start, end in ranges
+    ) + len(f'\r\n--{boundary}--\r\n')
+    response = StreamingHttpResponse(
+        _multipart(path, ranges, size, content_type, boundary),
+        status=206,
+        content_type=f'multipart/byteranges; boundary={boundary}',
+    )
+    response['Content-Length'] = length
+    return finish(response)
+
+
+def accepted_image_formats(accept):
+    """
+    Variant formats an ``Accept`` header allows. Only explicitly listed
+    modern formats count; wildcards just mean JPEG is fine.
+    """
+    if not accept:
+        return {'jpeg'}
+    formats = set()
+    for part in accept.split(','):
+        media_type, *params = [p.strip() for p in part.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    pass
+        if quality > 0 and media_type.lower() in IMAGE_MEDIA_TYPES:
+            formats.add(IMAGE_MEDIA_TYPES[media_type.lower()])
+    return formats
+
+
+def pick_variant(renditions, accept, width=None):
+    """
+    The responsive variant (see common.imaging.variant_specs) to send a
+    client: the best format it accepts, at the smallest width covering
+    ``width`` (or the largest one). None means serve the original.
+    """
+    accepted = accepted_image_formats(accept)
+    for image_format in IMAGE_FORMAT_PREFERENCE:
+        if image_format not in accepted:
+            continue
+        candidates = sorted(
+            (rendition for key, rendition in renditions.items() if key.startswith(f'{image_format}_')),
+            key=lambda rendition: rendition['width'],
+        )
+        if not candidates:
+            continue
+        if width:
+            for rendition in candidates:
+                if rendition['width'] >= width:
+                    return rendition
+        return candidates[-1]
+    return None
+
+
+def serve_image(request, instance, field_name):
+    """
+    Serve the image in ``instance.<field_name>`` as the smallest good variant
+    for the client's ``Accept`` header and ``?w=`` width, falling back to the
+    original.
+    """
+    try:
+        width = int(request.GET.get('w', ''))
+    except ValueError:
+        width = None
+    variant = pick_variant(instance.renditions, request.headers.get('Accept', ''), width)
+    if variant is not None:
+        response = serve_file(request, StoredFile(default_storage, variant['name']), f"image/{variant['format']}")
+    else:
+        response = serve_file(request, getattr(instance, field_name))
+    patch_vary_headers(response, ['Accept'])
+    return response
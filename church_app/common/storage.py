@@ -0,0 +1,246 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+from .files import file_sha256
+
+# Spooled uploads older than this are leftovers of a crashed save.
+STALE_SPOOL_AGE = 24 * 60 * 60
+
+
+@deconstructible
+class DedupStorage(FileSystemStorage):
+    """
+    FileSystemStorage that keeps one copy of each distinct file.
+
+    Every saved file is hashed (SHA-256) while it is written and stored once
+    as a blob under ``<location>/.blobs/ab/cd/<digest>``; the name handed back
+    to the model is a hard link to that blob. Names, URLs and ``path()`` work
+    exactly as before, and the blob's link count is its reference count: a
+    blob with a single link is no longer used by any name.
+
+    Stored files must never be modified in place (write a new file and
+    ``os.replace`` it, then call ``intern``), or every name sharing the blob
+    would change with it.
+
+    ``<location>/.blobs/inodes/<inode>`` symlinks hold each blob's digest, so
+    a name's blob is found from its inode without reading the file.
+    """
+    blob_dir = '.blobs'
+    inode_dir = 'inodes'
+
+    def _blob_root(self):
+        return os.path.join(self.location, self.blob_dir)
+
+    def blob_path(self, digest):
+        return os.path.join(self._blob_root(), digest[:2], digest[2:4], digest)
+
+    def _inode_path(self, inode):
+        return os.path.join(self._blob_root(), self.inode_dir, f'{inode % 256:02x}', str(inode))
+
+    def _remember(self, digest, inode):
+        # Record which digest the blob with this inode has.
+        entry = self._inode_path(inode)
+        try:
+            if os.readlink(entry) == digest:
+                return
+        except OSError:
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+        tmp_entry = f'{entry}.{os.getpid()}.{threading.get_ident()}'
+        os.symlink(digest, tmp_entry)
+        os.replace(tmp_entry, entry)
+
+    def _forget(self, digest, inode):
+        entry = self._inode_path(inode)
+        try:
+            if os.readlink(entry) == digest:
+                os.unlink(entry)
+        except OSError:
+            pass
+
+    def _digest_of(self, path, inode):
+        try:
+            return os.readlink(self._inode_path(inode))
+        except OSError:
+            # A blob stored before the index existed (dedup_media fills it in).
+            return file_sha256(path)
+
+    def has_blob(self, digest):
+        return os.path.exists(self.blob_path(digest))
+
+    def open_blob(self, digest):
+        return open(self.blob_path(digest), 'rb')
+
+    def _spool(self, content):
+        """
+        Copy ``content`` into a temporary file next to the blobs, hashing it on
+        the way. Uploads Django already spooled to disk are moved, not copied.
+        Returns ``(digest, temporary path)``.
+        """
+        spool_dir = os.path.join(self._blob_root(), 'tmp')
+        os.makedirs(spool_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=spool_dir)
+        try:
+            if hasattr(content, 'temporary_file_path'):
+                os.close(fd)
+                file_move_safe(content.temporary_file_path(), tmp_path, allow_overwrite=True)
+                return getattr(content, 'sha256', None) or file_sha256(tmp_path), tmp_path
+            digest = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    f.write(chunk)
+            return digest.hexdigest(), tmp_path
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _publish(self, digest, tmp_path):
+        """
+        Make ``tmp_path`` the blob for ``digest`` unless an identical blob
+        already exists.
+        """
+        blob = self.blob_path(digest)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        try:
+            os.link(tmp_path, blob)
+        except FileExistsError:
+            return
+        if self.file_permissions_mode is not None:
+            os.chmod(blob, self.file_permissions_mode)
+        self._remember(digest, os.stat(blob).st_ino)
+
+    def _save(self, name, content):
+        # Callers that already know the digest (e.g. a verified chunked
+        # upload) skip the copy entirely when the blob exists.
+        digest, tmp_path = getattr(content, 'sha256', None), None
+        if not (digest and self.has_blob(digest)):
+            digest, tmp_path = self._spool(content)
+            self._publish(digest, tmp_path)
+        try:
+            return self._link(digest, name, tmp_path)
+        finally:
+            if tmp_path is not None:
+                os.unlink(tmp_path)
+
+    def _link(self, digest, name, tmp_path):
+        blob = self.blob_path(digest)
+        directory = os.path.dirname(self.path(name))
+        if self.directory_permissions_mode is not None:
+            old_umask = os.umask(0o777 & ~self.directory_permissions_mode)
+            try:
+                os.makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+            finally:
+                os.umask(old_umask)
+        else:
+            os.makedirs(directory, exist_ok=True)
+
+        while True:
+            try:
+                os.link(blob, self.path(name))
+                return str(name).replace('\\', '/')
+            except FileExistsError:
+                name = self.get_available_name(name)
+            except FileNotFoundError:
+                # The blob was garbage-collected after we checked for it.
+                if tmp_path is None:
+                    raise
+                self._publish(digest, tmp_path)
+
+    def delete(self, name):
+        if not name:
+            raise ValueError("The name must be given to delete().")
+        path = self.path(name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+        if stat.st_nlink == 2:
+            # Only this name and the blob are left: drop the blob too.
+            digest = self._digest_of(path, stat.st_ino)
+            blob = self.blob_path(digest)
+            if os.path.exists(blob) and os.path.samefile(blob, path):
+                os.unlink(blob)
+                self._forget(digest, stat.st_ino)
+        super().delete(name)
+
+    def listdir(self, path):
+        directories, files = super().listdir(path)
+        if os.path.normpath(self.path(path)) == os.path.normpath(self.location):
+            directories = [d for d in directories if d != self.blob_dir]
+        return directories, files
+
+    def intern(self, name):
+        """
+        Move an existing file into the blob store, replacing it with a link
+        to an identical blob if there is one. Safe to repeat. Returns
+        ``(digest, bytes saved)``.
+        """
+        path = self.path(name)
+        digest = file_sha256(path)
+        blob = self.blob_path(digest)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        try:
+            os.link(path, blob)
+            self._remember(digest, os.stat(blob).st_ino)
+            return digest, 0
+        except FileExistsError:
+            pass
+        if os.path.samefile(blob, path):
+            self._remember(digest, os.stat(blob).st_ino)
+            return digest, 0
+        size = os.path.getsize(path)
+        tmp_path = f'{path}.{os.getpid()}.dedup'
+        os.link(blob, tmp_path)
+        os.replace(tmp_path, path)
+        return digest, size
+
+    def collect_garbage(self, dry_run=False):
+        """
+        Delete blobs no name links to any more, plus stale spool files, and
+        bring the inode index up to date. Returns ``(blobs removed, bytes
+        freed)``.
+        """
+        removed = freed = 0
+        cutoff = time.time() - STALE_SPOOL_AGE
+        root = self._blob_root()
+        for directory, subdirectories, files in os.walk(root):
+            if directory == root:
+                subdirectories[:] = [d for d in subdirectories if d != self.inode_dir]
+            spool = os.path.basename(directory) == 'tmp'
+            for filename in files:
+                path = os.path.join(directory, filename)
+                stat = os.stat(path)
+                if (spool and stat.st_mtime < cutoff) or (not spool and stat.st_nlink == 1):
+                    removed += 1
+                    freed += stat.st_size
+                    if not dry_run:
+                        os.unlink(path)
+                        if not spool:
+                            self._forget(filename, stat.st_ino)
+                elif not spool and not dry_run:
+                    # Blob file names are their digests.
+                    self._remember(filename, stat.st_ino)
+        if not dry_run:
+            self._prune_inodes()
+        return removed, freed
+
+    def _prune_inodes(self):
+        # Entries whose blob is gone, or whose inode now belongs to another file.
+        for directory, _, files in os.walk(os.path.join(self._blob_root(), self.inode_dir)):
+            for filename in files:
+                entry = os.path.join(directory, filename)
+                try:
+                    if os.stat(self.blob_path(os.readlink(entry))).st_ino == int(filename):
+                        continue
+                except (OSError, ValueError):
+                    pass
+                try:
+                    os.unlink(entry)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,26 @@
+"""
+Synthetic text for the benchmark commands.
+"""
+
+WORDS = (
+    'grace faith hope love mercy prayer worship psalm gospel kingdom shepherd covenant '
+    'spirit light river mountain bread wine harvest journey community service mission '
+    'family children youth choir music study reading quiet rest peace joy thanksgiving'
+).split()
+
+SYLLABLES = 'ba ke li mo nu ra se ti vo za'.split()
+
+
+def vocabulary(rng, size=5000):
+    """
+    ``size`` words with Zipf-like weights, so that, as in real text, a few
+    words are everywhere and most are rare. The real words above are spread
+    over the ranks.
+    """
+    words = {''.join(rng.choices(SYLLABLES, k=3)) for _ in range(size * 2)}
+    words = sorted(words - set(WORDS))[:size - len(WORDS)]
+    rng.shuffle(words)
+    step = len(words) // len(WORDS)
+    for i, word in enumerate(WORDS):
+        words.insert(i * step, word)
+    return words, [1 / rank for rank in range(1, len(words) + 1)]
@@ -0,0 +1,49 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Return the process-wide media worker pool, creating it on first use.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'MEDIA_WORKERS', 2),
+                    thread_name_prefix='media-worker',
+                )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception(f"Background job {func.__name__} failed")
+    finally:
+        # Worker threads open their own connections; don't leak them.
+        connections.close_all()
+
+
+def enqueue(func, *args, **kwargs):
+    """
+    Run ``func(*args, **kwargs)`` in the media worker pool once the current
+    transaction commits, so jobs never see uncommitted rows.
+
+    With ``MEDIA_TASKS_EAGER`` set the job runs inline instead, which is handy
+    for management commands and local debugging.
+    """
+    if getattr(settings, 'MEDIA_TASKS_EAGER', False):
+        transaction.on_commit(lambda: func(*args, **kwargs))
+    else:
+        transaction.on_commit(lambda: get_executor().submit(_run, func, args, kwargs))
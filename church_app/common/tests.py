@@ -1,3 +1,763 @@
-from django.test import TestCase
+import datetime
+import hashlib
+import io
+import os
+import shutil
+import struct
+import zlib
+import tempfile
+import time
+import zipfile
+from unittest import mock
+from defusedxml import EntitiesForbidden
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import set_script_prefix
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+from PIL import Image as PILImage
+from content.models import Article, Document, Video
+from content.renditions import rendition_specs
+from . import extract, imaging, mp4, pipeline, search, uploads, video
+from .audio import _ffmpeg_blocks
+from .hyperlinks import CachedHyperlinkedIdentityField
+from .models import SearchEntry, UploadSession
+from .serializers import SafeImageField
+from .serving import MAX_RANGES, StoredFile, parse_range_header, serve_file
+from .storage import DedupStorage
+from .video import VideoToolError
 
-# Create your tests here.
+
+User = get_user_model()
+
+
+def _jpeg(width, height):
+    buffer = io.BytesIO()
+    PILImage.new('RGB', (width, height), 'white').save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+class RenderImagesTests(TestCase):
+    def render(self, width, height, specs):
+        results = imaging.run(imaging.render_images, _jpeg(width, height), specs, timeout=60)
+        return {key: (w, h) for key, _, w, h, _ in results}
+
+    def test_portrait_variants_keep_their_width(self):
+        sizes = self.render(3000, 4000, rendition_specs())
+        self.assertEqual(sizes['medium'], (600, 800))
+        self.assertEqual(sizes['small'], (240, 320))
+        self.assertEqual(sizes['thumb'], (75, 100))
+        for image_format in imaging.variant_formats():
+            prefix = image_format.lower()
+            self.assertEqual(sizes[f'{prefix}_320'], (320, 427))
+            self.assertEqual(sizes[f'{prefix}_640'], (640, 853))
+            self.assertEqual(sizes[f'{prefix}_1024'], (1024, 1365))
+            self.assertEqual(sizes[f'{prefix}_1600'], (1600, 2133))
+
+    def test_landscape_variants(self):
+        sizes = self.render(4000, 3000, rendition_specs())
+        self.assertEqual(sizes['medium'], (800, 600))
+        self.assertEqual(sizes['jpeg_640'], (640, 480))
+        self.assertEqual(sizes['jpeg_1600'], (1600, 1200))
+
+    def test_small_image_is_encoded_once_per_series(self):
+        sizes = self.render(500, 400, imaging.variant_specs((320, 640, 1024)))
+        self.assertEqual(sizes['jpeg_320'], (320, 256))
+        self.assertEqual(sizes['jpeg_640'], (500, 400))
+        self.assertNotIn('jpeg_1024', sizes)
+
+
+def _png_bomb(width, height, rows=None):
+    """
+    A grayscale PNG of ``width`` x ``height`` black pixels: a few KB on disk,
+    ``width * height`` bytes once decoded. Only the first ``rows`` rows are
+    written if given, for headers too big to back with real data.
+    """
+    def chunk(chunk_type, data):
+        return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+    compressor = zlib.compressobj(9)
+    row = bytes(width + 1)
+    idat = b''.join(compressor.compress(row) for _ in range(height if rows is None else rows)) + compressor.flush()
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)) + chunk(b'IDAT', idat) + chunk(b'IEND', b'')
+
+
+class DecompressionBombTests(TestCase):
+    def test_oversized_images_are_rejected_before_decoding(self):
+        # Just over IMAGE_MAX_PIXELS (Pillow itself only warns here), and far over it.
+        for width, height in [(8000, 5001), (60000, 60000)]:
+            with self.subTest(size=(width, height)):
+                bomb = _png_bomb(width, height, rows=10)
+                with self.assertRaisesMessage(imaging.ImageRejected, 'too many pixels'):
+                    imaging.run(imaging.inspect_image, bomb, timeout=30)
+
+    def test_uploads_of_bombs_fail_validation(self):
+        upload = SimpleUploadedFile('bomb.png', _png_bomb(8000, 5001), content_type='image/png')
+        self.assertLess(upload.size, 100 * 1024)
+        with self.assertRaises(serializers.ValidationError) as cm:
+            SafeImageField().to_internal_value(upload)
+        self.assertEqual(cm.exception.detail[0].code, 'invalid_image')
+
+    def test_images_within_the_limit_pass(self):
+        info = imaging.inspect_upload(SimpleUploadedFile('ok.png', _png_bomb(4000, 3000)))
+        self.assertEqual((info['format'], info['width'], info['height']), ('PNG', 4000, 3000))
+
+
+def _fake_tool(test, script):
+    """
+    A shell script standing in for ffmpeg/ffprobe, removed after ``test``.
+    """
+    handle, path = tempfile.mkstemp()
+    with os.fdopen(handle, 'w') as f:
+        f.write('#!/bin/sh\n' + script + '\n')
+    os.chmod(path, 0o755)
+    test.addCleanup(os.unlink, path)
+    return path
+
+
+class FfmpegDeadlineTests(TestCase):
+    def fake_ffmpeg(self, script):
+        return _fake_tool(self, script)
+
+    def test_hung_decode_is_killed(self):
+        # Writes nothing and never exits: only the deadline can stop the read.
+        with override_settings(FFMPEG_BINARY=self.fake_ffmpeg('exec sleep 60'), FFMPEG_TIMEOUT=1):
+            started = time.monotonic()
+            with self.assertRaisesMessage(VideoToolError, 'timed out'):
+                list(_ffmpeg_blocks('sermon.mp3'))
+        self.assertLess(time.monotonic() - started, 10)
+
+    def test_decoded_samples_and_failures(self):
+        with override_settings(FFMPEG_BINARY=self.fake_ffmpeg("printf '\\001\\000\\002\\000'")):
+            blocks = list(_ffmpeg_blocks('sermon.mp3'))
+        self.assertEqual([list(block) for _, block in blocks], [[1, 2]])
+        with override_settings(FFMPEG_BINARY=self.fake_ffmpeg('exit 1')):
+            with self.assertRaisesMessage(VideoToolError, 'could not decode'):
+                list(_ffmpeg_blocks('sermon.mp3'))
+
+
+class DedupStorageTests(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        self.storage = DedupStorage(location=self.location)
+
+    def blobs(self):
+        root = os.path.join(self.location, DedupStorage.blob_dir)
+        return sorted(
+            name for directory, _, files in os.walk(root) for name in files
+            if os.path.basename(os.path.dirname(directory)) != DedupStorage.inode_dir and os.path.basename(directory) != 'tmp'
+        )
+
+    def test_last_delete_finds_the_blob_without_reading_it(self):
+        first = self.storage.save('a.bin', ContentFile(b'sermon audio'))
+        second = self.storage.save('b.bin', ContentFile(b'sermon audio'))
+        with mock.patch('common.storage.file_sha256', side_effect=AssertionError("rehashed")):
+            self.storage.delete(first)
+            self.assertEqual(len(self.blobs()), 1)
+            self.storage.delete(second)
+        self.assertEqual(self.blobs(), [])
+
+    def test_identical_content_is_stored_once(self):
+        first = self.storage.save('one/a.bin', ContentFile(b'same bytes'))
+        second = self.storage.save('two/a.bin', ContentFile(b'same bytes'))
+        other = self.storage.save('two/b.bin', ContentFile(b'other bytes'))
+        self.assertTrue(os.path.samefile(self.storage.path(first), self.storage.path(second)))
+        self.assertFalse(os.path.samefile(self.storage.path(first), self.storage.path(other)))
+        self.assertEqual(os.stat(self.storage.path(first)).st_nlink, 3)
+        self.assertEqual(self.blobs(), sorted(hashlib.sha256(data).hexdigest() for data in (b'same bytes', b'other bytes')))
+        # Blobs stay out of listings.
+        self.assertEqual(self.storage.listdir('')[0], ['one', 'two'])
+
+    def test_delete_keeps_the_blob_until_the_last_name(self):
+        first = self.storage.save('a.bin', ContentFile(b'same bytes'))
+        second = self.storage.save('b.bin', ContentFile(b'same bytes'))
+        self.storage.delete(first)
+        self.assertFalse(self.storage.exists(first))
+        with self.storage.open(second) as f:
+            self.assertEqual(f.read(), b'same bytes')
+        self.assertTrue(self.storage.has_blob(hashlib.sha256(b'same bytes').hexdigest()))
+        self.storage.delete(second)
+        self.assertFalse(self.storage.has_blob(hashlib.sha256(b'same bytes').hexdigest()))
+
+    def test_collect_garbage_only_reaps_unlinked_blobs(self):
+        kept = self.storage.save('kept.bin', ContentFile(b'kept'))
+        dropped = self.storage.save('dropped.bin', ContentFile(b'dropped'))
+        # Removing the name behind the storage's back leaves an unused blob.
+        os.unlink(self.storage.path(dropped))
+        self.assertEqual(self.storage.collect_garbage(dry_run=True), (1, len(b'dropped')))
+        self.assertEqual(len(self.blobs()), 2)
+        self.assertEqual(self.storage.collect_garbage(), (1, len(b'dropped')))
+        self.assertEqual(self.blobs(), [hashlib.sha256(b'kept').hexdigest()])
+        with self.storage.open(kept) as f:
+            self.assertEqual(f.read(), b'kept')
+
+    def test_collect_garbage_indexes_older_blobs(self):
+        name = self.storage.save('a.bin', ContentFile(b'older'))
+        shutil.rmtree(os.path.join(self.location, DedupStorage.blob_dir, DedupStorage.inode_dir))
+        self.storage.collect_garbage()
+        with mock.patch('common.storage.file_sha256', side_effect=AssertionError("rehashed")):
+            self.storage.delete(name)
+        self.assertEqual(self.blobs(), [])
+
+    def test_intern_replaces_a_copy_with_a_link(self):
+        name = self.storage.save('a.bin', ContentFile(b'same bytes'))
+        with open(os.path.join(self.location, 'copy.bin'), 'wb') as f:
+            f.write(b'same bytes')
+        self.assertEqual(self.storage.intern('copy.bin'), (hashlib.sha256(b'same bytes').hexdigest(), len(b'same bytes')))
+        self.assertTrue(os.path.samefile(self.storage.path(name), self.storage.path('copy.bin')))
+        self.assertEqual(self.storage.intern('copy.bin')[1], 0)
+
+
+class KnownBlobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create(username='alice')
+        cls.bob = User.objects.create(username='bob')
+
+    def test_only_the_uploader_may_reuse_a_blob(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        digest = hashlib.sha256(b'sermon').hexdigest()
+        with self.settings(MEDIA_ROOT=media):
+            self.assertFalse(uploads.known_blob(digest, self.alice))
+            default_storage.save('videos/sermon.mp4', ContentFile(b'sermon'))
+            # Stored, but nobody has proved they have the file.
+            self.assertFalse(uploads.known_blob(digest, self.alice))
+            UploadSession.objects.create(
+                user=self.alice, target='video', filename='sermon.mp4', size=6, offset=6, checksum=digest, status='complete',
+            )
+            self.assertTrue(uploads.known_blob(digest, self.alice))
+            self.assertFalse(uploads.known_blob(digest, self.bob))
+            self.assertFalse(uploads.known_blob('', self.alice))
+
+
+class UploadSessionTests(TestCase):
+    body = bytes(range(256)) + b'sermon video' * 20
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create(username='alice')
+        cls.bob = User.objects.create(username='bob')
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        settings = self.settings(MEDIA_ROOT=media, CHUNKED_UPLOAD_DIR=os.path.join(media, 'sessions'))
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def start(self, checksum=None, title='Easter'):
+        data = {'target': 'video', 'filename': 'easter.mp4', 'size': len(self.body), 'metadata': {'title': title}}
+        if checksum is not None:
+            data['checksum'] = checksum
+        response = self.client.post('/uploads/', data, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def put(self, session, start, end, **headers):
+        return self.client.generic(
+            'PUT', f'/uploads/{session}/', self.body[start:end], content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end - 1}/{len(self.body)}', **headers,
+        )
+
+    def offset(self, session):
+        return self.client.get(f'/uploads/{session}/').data['offset']
+
+    def test_chunks_then_finalize(self):
+        session = self.start(hashlib.sha256(self.body).hexdigest())
+        checksum = 'sha256 ' + hashlib.sha256(self.body[:100]).hexdigest()
+        response = self.put(session, 0, 100, HTTP_UPLOAD_CHECKSUM=checksum)
+        self.assertEqual((response.status_code, response.data['offset'], response['Upload-Offset']), (200, 100, '100'))
+        self.assertEqual(self.put(session, 100, len(self.body)).data['offset'], len(self.body))
+
+        response = self.client.post(f'/uploads/{session}/finalize/')
+        self.assertEqual(response.status_code, 201, response.data)
+        video = Video.objects.get(pk=response.data['object_id'])
+        with video.video.open('rb') as f:
+            self.assertEqual(f.read(), self.body)
+        self.assertFalse(os.path.exists(uploads.partial_path(UploadSession.objects.get(pk=session))))
+        self.assertEqual(self.client.post(f'/uploads/{session}/finalize/').status_code, 409)
+
+    def test_resume_after_a_gap_or_a_stale_offset(self):
+        session = self.start()
+        self.put(session, 0, 100)
+        # A chunk past the end of what was received, or one already received
+        for start, end in [(200, 300), (50, 150)]:
+            with self.subTest(start=start):
+                response = self.put(session, start, end)
+                self.assertEqual(response.status_code, 409)
+                self.assertEqual(self.offset(session), 100)
+        response = self.put(session, 100, 200, HTTP_UPLOAD_CHECKSUM='sha256 ' + '0' * 64)
+        self.assertEqual(response.status_code, 460)
+        self.assertEqual(self.offset(session), 100)
+        # Resume from the offset the server reports.
+        self.assertEqual(self.put(session, self.offset(session), len(self.body)).status_code, 200)
+        self.assertEqual(self.client.post(f'/uploads/{session}/finalize/').status_code, 201)
+
+    def test_finalize_checks_the_whole_file(self):
+        session = self.start(hashlib.sha256(b'another file').hexdigest())
+        response = self.client.post(f'/uploads/{session}/finalize/')
+        self.assertEqual(response.status_code, 409)
+        self.put(session, 0, len(self.body))
+        response = self.client.post(f'/uploads/{session}/finalize/')
+        self.assertEqual(response.status_code, 460)
+        self.assertEqual(UploadSession.objects.get(pk=session).status, 'active')
+        self.assertFalse(Video.objects.exists())
+
+    def test_sessions_are_private_to_their_user(self):
+        session = self.start()
+        self.put(session, 0, len(self.body))
+        self.client.force_authenticate(self.bob)
+        self.assertEqual(self.client.get(f'/uploads/{session}/').status_code, 404)
+        self.assertEqual(self.put(session, 0, 10).status_code, 404)
+        self.assertEqual(self.client.post(f'/uploads/{session}/finalize/').status_code, 404)
+        self.assertEqual(self.client.delete(f'/uploads/{session}/').status_code, 404)
+        self.assertEqual(UploadSession.objects.get(pk=session).status, 'active')
+        self.assertFalse(Video.objects.exists())
+
+    def test_sweep_removes_expired_sessions(self):
+        stale, fresh = self.start(title='Stale'), self.start(title='Fresh')
+        self.put(stale, 0, 100)
+        self.put(fresh, 0, 100)
+        UploadSession.objects.filter(pk=stale).update(updated_at=timezone.now() - datetime.timedelta(days=2))
+        stale_path = uploads.partial_path(UploadSession.objects.get(pk=stale))
+        orphan = os.path.join(uploads.upload_dir(), 'gone.part')
+        open(orphan, 'wb').close()
+
+        call_command('sweep_uploads', stdout=io.StringIO())
+        self.assertEqual(list(UploadSession.objects.values_list('pk', flat=True)), [UploadSession.objects.get(pk=fresh).pk])
+        self.assertFalse(os.path.exists(stale_path))
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(uploads.partial_path(UploadSession.objects.get(pk=fresh))))
+
+
+class RangeHeaderTests(SimpleTestCase):
+    def test_ranges(self):
+        for header, expected in [
+            ('bytes=0-99', [(0, 99)]),
+            ('bytes=900-', [(900, 999)]),
+            ('bytes=-100', [(900, 999)]),
+            ('bytes=-5000', [(0, 999)]),
+            ('bytes=500-5000', [(500, 999)]),
+            ('bytes=0-9, 5-20, 50-59', [(0, 20), (50, 59)]),
+            ('bytes=1000-', []),
+            ('bytes=-0', []),
+            ('bytes=0-9x', None),
+            ('bytes=9-0', None),
+            ('bytes=-', None),
+            ('items=0-9', None),
+            ('bytes=' + ','.join(f'{i * 10}-{i * 10}' for i in range(MAX_RANGES + 1)), None),
+        ]:
+            with self.subTest(header=header):
+                self.assertEqual(parse_range_header(header, 1000), expected)
+
+
+class ServeFileTests(SimpleTestCase):
+    data = bytes(range(256)) * 4
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        storage = FileSystemStorage(location=location)
+        self.file = StoredFile(storage, storage.save('sermons/talk.mp3', ContentFile(self.data)))
+
+    def get(self, **headers):
+        response = serve_file(RequestFactory().get('/', **headers), self.file)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_whole_file(self):
+        response, body = self.get()
+        self.assertEqual((response.status_code, body), (200, self.data))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'audio/mpeg')
+
+    def test_single_ranges(self):
+        for header, start, end in [('bytes=10-19', 10, 19), ('bytes=-24', 1000, 1023), ('bytes=1000-', 1000, 1023)]:
+            with self.subTest(header=header):
+                response, body = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(body, self.data[start:end + 1])
+                self.assertEqual(response['Content-Range'], f'bytes {start}-{end}/1024')
+                self.assertEqual(response['Content-Length'], str(end - start + 1))
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.get(HTTP_RANGE='bytes=2000-3000')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+    def test_multiple_ranges(self):
+        response, body = self.get(HTTP_RANGE='bytes=0-9,100-109')
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response['Content-Type'].startswith('multipart/byteranges; boundary='))
+        self.assertEqual(int(response['Content-Length']), len(body))
+        self.assertIn(b'Content-Range: bytes 0-9/1024\r\n\r\n' + self.data[0:10], body)
+        self.assertIn(b'Content-Range: bytes 100-109/1024\r\n\r\n' + self.data[100:110], body)
+
+    def test_ignored_ranges_get_the_whole_file(self):
+        many = 'bytes=' + ','.join(f'{i * 10}-{i * 10}' for i in range(MAX_RANGES + 1))
+        for header in ('bytes=abc', 'lines=1-2', many):
+            with self.subTest(header=header):
+                response, body = self.get(HTTP_RANGE=header)
+                self.assertEqual((response.status_code, body), (200, self.data))
+
+    def test_conditional_requests(self):
+        response, _ = self.get()
+        etag = response['ETag']
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag)[0].status_code, 304)
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)[0].status_code, 206)
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')[0].status_code, 200)
+
+    def test_proxy_offload(self):
+        with self.settings(MEDIA_ACCEL_BACKEND='nginx', MEDIA_ACCEL_PREFIX='/protected/'):
+            response, body = self.get(HTTP_RANGE='bytes=0-9')
+            self.assertEqual(response['X-Accel-Redirect'], '/protected/sermons/talk.mp3')
+        with self.settings(MEDIA_ACCEL_BACKEND='apache'):
+            response, body = self.get()
+            self.assertEqual(response['X-Sendfile'], self.file.path)
+        self.assertEqual((response.status_code, body), (200, b''))
+        self.assertEqual(response['Content-Type'], 'audio/mpeg')
+
+
+class FullTextSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='searcher')
+        # Created first, so primary key order alone would put it first.
+        cls.in_body = Article.objects.create(title='Sunday notes', content='<p>Where is our hope found?</p>', author=cls.user)
+        cls.in_title = Article.objects.create(title='Hope', content='<p>A short reflection.</p>', author=cls.user)
+        cls.running = Article.objects.create(title='Endurance', content='<p>Running the race with patience.</p>', author=cls.user)
+        cls.phrase = Article.objects.create(title='Abundance', content='<p>Where sin increased, grace abounds.</p>', author=cls.user)
+        cls.reversed = Article.objects.create(title='Gifts', content='<p>He abounds in grace and truth.</p>', author=cls.user)
+
+    def search(self, text):
+        response = self.client.get('/articles/', {'search': text})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_words_are_stemmed(self):
+        self.assertEqual(self.search('run'), [self.running.pk])
+        self.assertEqual(self.search('runs'), [self.running.pk])
+
+    def test_quoted_phrases_match_in_order(self):
+        self.assertEqual(self.search('"grace abounds"'), [self.phrase.pk])
+        self.assertCountEqual(self.search('grace abounds'), [self.phrase.pk, self.reversed.pk])
+
+    def test_query_syntax_is_taken_literally(self):
+        self.assertEqual(search.fts5_query('AND OR ( NEAR'), '"AND" "OR" "NEAR"')
+        for text in ('"unbalanced', 'AND OR (', 'hope NOT', '*', 'title:hope', '^"'):
+            with self.subTest(text=text):
+                self.assertNotIn(self.running.pk, self.search(text))
+        self.assertEqual(search.matching_ids(Article, '"( ) *"'), [])
+
+    def test_failed_match_returns_nothing(self):
+        with mock.patch('common.search.fts5_query', return_value='AND OR ('), self.assertLogs('common.search', 'ERROR'):
+            self.assertEqual(search.matching_ids(Article, 'hope'), [])
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search('hope'), [self.in_title.pk, self.in_body.pk])
+        self.assertEqual(search.matching_ids(Article, 'hope'), [self.in_title.pk, self.in_body.pk])
+
+    def test_triggers_follow_updates_and_deletes(self):
+        self.running.content = '<p>Walking in the light.</p>'
+        self.running.save()
+        self.assertEqual(search.matching_ids(Article, 'run'), [])
+        self.assertEqual(search.matching_ids(Article, 'walk'), [self.running.pk])
+        # Writes that skip the model signals still reach the FTS table.
+        SearchEntry.objects.filter(object_id=self.running.pk, content_type__model='article').update(body='Seek first the kingdom')
+        self.assertEqual(search.matching_ids(Article, 'walk'), [])
+        self.assertEqual(search.matching_ids(Article, 'seeking'), [self.running.pk])
+        self.running.delete()
+        self.assertEqual(search.matching_ids(Article, 'kingdom'), [])
+
+    def test_rebuild_search_index(self):
+        SearchEntry.objects.all().delete()
+        self.assertEqual(self.search('hope'), [])
+        out = io.StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('content.Article: 5 indexed', out.getvalue())
+        self.assertEqual(self.search('hope'), [self.in_title.pk, self.in_body.pk])
+        # Rebuilding again replaces the entries instead of duplicating them.
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        self.assertEqual(SearchEntry.objects.filter(content_type__model='article').count(), 5)
+
+
+def _box(box_type, payload):
+    return struct.pack('>I4s', len(payload) + 8, box_type) + payload
+
+
+def _stco(offsets, box_type=b'stco'):
+    width = 'I' if box_type == b'stco' else 'Q'
+    return _box(box_type, b'\0\0\0\0' + struct.pack(f'>I{len(offsets)}{width}', len(offsets), *offsets))
+
+
+def _moov(*tables):
+    tracks = b''.join(_box(b'trak', _box(b'mdia', _box(b'minf', _box(b'stbl', table)))) for table in tables)
+    return _box(b'moov', _box(b'mvhd', bytes(100)) + tracks)
+
+
+class FaststartTests(SimpleTestCase):
+    chunks = [b'first chunk of samples', b'second chunk', b'audio']
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'clip.mp4')
+
+    def write(self, boxes):
+        with open(self.path, 'wb') as f:
+            f.write(b''.join(boxes))
+
+    def chunk_offsets(self):
+        with open(self.path, 'rb') as f:
+            data = f.read()
+            boxes = mp4.read_top_level_boxes(f)
+        types = [box[0] for box in boxes]
+        _, offset, size = boxes[types.index(b'moov')]
+        moov = mp4._parse_children(data[offset + 8:offset + size])
+        tables = []
+        for box_type, payload in mp4._offset_tables(moov):
+            count = struct.unpack_from('>I', payload, 4)[0]
+            tables.append((box_type, list(struct.unpack_from(f'>{count}{"I" if box_type == b"stco" else "Q"}', payload, 8))))
+        return data, types, tables
+
+    def test_moov_moves_ahead_of_mdat_and_offsets_follow(self):
+        ftyp = _box(b'ftyp', b'isom\0\0\2\0isomiso2mp41')
+        free = _box(b'free', bytes(8))
+        mdat_start = len(ftyp) + len(free) + 8
+        first, second, audio = self.chunks
+        offsets = [mdat_start, mdat_start + len(first)]
+        audio_offset = mdat_start + len(first) + len(second)
+        self.write([ftyp, free, _box(b'mdat', first + second + audio), _moov(_stco(offsets), _stco([audio_offset]))])
+
+        boxes, rewritten = mp4.faststart(self.path)
+        self.assertTrue(rewritten)
+        data, types, tables = self.chunk_offsets()
+        self.assertEqual(types, [b'ftyp', b'free', b'moov', b'mdat'])
+        self.assertEqual([box[0] for box in boxes], types)
+        moov_size = boxes[2][2]
+        self.assertEqual(tables, [(b'stco', [o + moov_size for o in offsets]), (b'stco', [audio_offset + moov_size])])
+        # Every chunk offset still points at its samples.
+        for chunk, offset in zip(self.chunks, tables[0][1] + tables[1][1]):
+            self.assertEqual(data[offset:offset + len(chunk)], chunk)
+
+        self.assertEqual(mp4.faststart(self.path), (boxes, False))
+
+    def test_stco_becomes_co64_past_4gb(self):
+        moov = mp4._parse_children(_stco([10, 0xFFFFFFF0]))
+        mp4._relocate_offsets(moov, lambda o: o + 0x100)
+        self.assertEqual(moov[0][0], b'co64')
+        self.assertEqual(struct.unpack_from('>I2Q', moov[0][1], 4), (2, 0x10A, 0x1000000F0))
+
+    def test_files_without_moov_or_mdat_are_refused(self):
+        self.write([_box(b'ftyp', b'isom'), _box(b'mdat', b'data')])
+        with self.assertRaises(mp4.MP4Error):
+            mp4.faststart(self.path)
+        self.write([_box(b'ftyp', b'isom'), struct.pack('>I4s', 100, b'mdat')])
+        with self.assertRaises(mp4.MP4Error):
+            mp4.faststart(self.path)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver', 'example.org', 'church.example'])
+class CachedHyperlinkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='linker')
+        cls.articles = [Article.objects.create(title=title, content='', author=user) for title in ('One', 'Grace & peace, 100%')]
+
+    def request(self, host, secure):
+        return Request(APIRequestFactory().get('/articles/', HTTP_HOST=host, secure=secure))
+
+    def assertMatchesReverse(self, request, format=None, lookup_field='pk'):
+        field = CachedHyperlinkedIdentityField(view_name='article-detail', lookup_field=lookup_field, lookup_url_kwarg='pk')
+        for article in self.articles:
+            expected = reverse('article-detail', kwargs={'pk': getattr(article, lookup_field)}, request=request, format=format)
+            self.assertEqual(field.get_url(article, 'article-detail', request, format), expected)
+
+    def test_urls_match_reverse(self):
+        for host in ('testserver', 'example.org:8443', 'church.example'):
+            for secure in (False, True):
+                for format in (None, 'json'):
+                    with self.subTest(host=host, secure=secure, format=format):
+                        self.assertMatchesReverse(self.request(host, secure), format)
+        self.assertMatchesReverse(None)
+        self.assertMatchesReverse(None, 'json')
+
+    def test_string_lookups_are_quoted_like_reverse(self):
+        self.assertMatchesReverse(self.request('testserver', False), lookup_field='title')
+        self.assertMatchesReverse(None, 'json', lookup_field='title')
+
+    def test_script_prefix_is_part_of_the_template(self):
+        self.assertMatchesReverse(self.request('testserver', False))
+        set_script_prefix('/parish/')
+        self.addCleanup(set_script_prefix, '/')
+        request = self.request('testserver', False)
+        self.assertMatchesReverse(request)
+        self.assertIn('/parish/', CachedHyperlinkedIdentityField(view_name='article-detail').get_url(self.articles[0], 'article-detail', request, None))
+
+    def test_unsaved_objects_have_no_url(self):
+        field = CachedHyperlinkedIdentityField(view_name='article-detail')
+        self.assertIsNone(field.get_url(Article(title='Draft'), 'article-detail', self.request('testserver', False), None))
+
+
+@override_settings(MEDIA_TASKS_EAGER=True)
+class MediaPipelineTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(self.settings(MEDIA_ROOT=media_root))
+        self.user = User.objects.create(username='uploader')
+        self.calls = []
+        stages = [(10, self.stage('first')), (20, self.stage('broken')), (30, self.stage('last'))]
+        self.enterContext(mock.patch.dict(pipeline._stages, {('content.document', 'document'): stages}))
+
+    def stage(self, name):
+        def stage(instance, field_name):
+            self.calls.append((name, instance.title, getattr(instance, field_name).name))
+            if name == 'broken':
+                raise ValueError(name)
+        stage.__name__ = name
+        return stage
+
+    def test_new_files_run_each_stage_in_order(self):
+        with self.assertLogs('common.pipeline', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            document = Document.objects.create(title='Bulletin', uploaded_by=self.user, document=ContentFile(b'text', name='bulletin.txt'))
+        self.assertEqual([name for name, _, _ in self.calls], ['first', 'broken', 'last'])
+        self.assertEqual(self.calls[0][2], document.document.name)
+
+        # Saves that don't bring a new file schedule nothing.
+        self.calls.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            document.title = 'Weekly bulletin'
+            document.save()
+        self.assertEqual(self.calls, [])
+
+    def test_stages_see_earlier_changes_and_stop_when_the_object_is_gone(self):
+        document = Document.objects.create(title='Draft', uploaded_by=self.user, document=ContentFile(b'text', name='draft.txt'))
+
+        def rename(instance, field_name):
+            Document.objects.filter(pk=instance.pk).update(title='Renamed')
+
+        def delete(instance, field_name):
+            instance.delete()
+
+        stages = [(1, rename), (2, self.stage('after rename')), (3, delete), (4, self.stage('after delete'))]
+        with mock.patch.dict(pipeline._stages, {('content.document', 'document'): stages}):
+            pipeline.run_stages('content.document', document.pk, 'document')
+        self.assertEqual([(name, title) for name, title, _ in self.calls], [('after rename', 'Renamed')])
+
+
+class VideoRenditionTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(self.settings(
+            MEDIA_ROOT=media_root,
+            FFPROBE_BINARY=_fake_tool(self, "printf 'width=1920\\nheight=1080\\nduration=250.0\\n'"),
+            # Echo the arguments back, so the test can see what was asked for.
+            FFMPEG_BINARY=_fake_tool(self, 'echo "$@"'),
+        ))
+
+    def test_probe(self):
+        self.assertEqual(video.probe('clip.mp4'), (250.0, 1920, 1080))
+        with override_settings(FFPROBE_BINARY=_fake_tool(self, "echo 'width=N/A'")):
+            with self.assertRaises(VideoToolError):
+                video.probe('clip.mp4')
+        with override_settings(FFPROBE_BINARY=_fake_tool(self, "echo 'moov atom not found' >&2; exit 1")):
+            with self.assertRaisesMessage(VideoToolError, 'moov atom not found'):
+                video.probe('clip.mp4')
+        with override_settings(FFPROBE_BINARY='/nonexistent/ffprobe'):
+            with self.assertRaisesMessage(VideoToolError, 'is not installed'):
+                video.probe('clip.mp4')
+
+    def test_sprite_layout(self):
+        # Long videos get the full grid, short ones one tile per second.
+        args, layout = video.build_sprite('clip.mp4', 250.0)
+        self.assertEqual((layout['columns'], layout['rows'], layout['count'], layout['interval']), (10, 10, 100, 2.5))
+        self.assertIn(b'-skip_frame nokey', args)
+        self.assertIn(b'tile=10x10', args)
+        _, layout = video.build_sprite('clip.mp4', 14.5)
+        self.assertEqual((layout['columns'], layout['rows'], layout['count'], layout['interval']), (10, 2, 14, 1.0))
+
+    def test_poster_and_sprite_renditions(self):
+        user = User.objects.create(username='filmmaker')
+        clip = Video.objects.create(title='Baptism', uploaded_by=user, video=ContentFile(b'not really a video', name='baptism.mp4'))
+        video.generate_video_renditions(clip, 'video')
+        clip.refresh_from_db()
+        poster, sprite = clip.renditions['poster'], clip.renditions['sprite']
+        # The poster frame is taken 10% in, at most 10 seconds in.
+        self.assertIn(b'-ss 10.000', default_storage.open(poster['name']).read())
+        self.assertEqual((sprite['tile_height'], sprite['duration'], sprite['count']), (90, 250.0, 100))
+        self.assertTrue(sprite['name'].startswith('videos/baptism_sprite'))
+
+
+def _xml(tag, *texts):
+    ns = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+    return f'<root xmlns:a="{ns}">' + ''.join(f'<a:{tag}>{text}</a:{tag}>' for text in texts) + '</root>'
+
+
+class ExtractTextTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, members=None, data=None):
+        path = os.path.join(self.directory, name)
+        if members is None:
+            with open(path, 'wb') as f:
+                f.write(data)
+        else:
+            with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for member, text in members.items():
+                    archive.writestr(member, text)
+        return path
+
+    def test_slides_in_slide_order_then_notes(self):
+        path = self.write('talk.pptx', {
+            'ppt/slides/slide10.xml': _xml('t', 'Ten'),
+            'ppt/slides/slide2.xml': _xml('t', 'Two', '&amp; more'),
+            'ppt/slides/slide1.xml': _xml('t', 'One'),
+            'ppt/notesSlides/notesSlide1.xml': _xml('t', 'Speaker   notes'),
+            'ppt/media/image1.xml': _xml('t', 'Not a slide'),
+        })
+        self.assertEqual(extract.extract_text(path), 'One\nTwo & more\nTen\nSpeaker notes')
+
+    def test_documents(self):
+        docx = self.write('bulletin.docx', {'word/document.xml': _xml('t', 'Welcome'), 'word/footnotes.xml': _xml('t', 'Note')})
+        self.assertEqual(extract.extract_text(docx), 'Welcome\nNote')
+        odt = self.write('minutes.odt', {'content.xml': _xml('p', 'Minutes', 'Approved')})
+        self.assertEqual(extract.extract_text(odt), 'Minutes Approved')
+        # The stored name decides the format, not the temporary path.
+        plain = self.write('upload.tmp', data='Hymn  list\n\n\xe2\x80\x94'.encode('latin-1'))
+        self.assertEqual(extract.extract_text(plain, 'hymns.txt'), 'Hymn list \u2014')
+
+    def test_legacy_ppt_text_runs(self):
+        path = self.write('old.ppt', data=b'\x00\x01' + 'Sermon title'.encode('utf-16-le') + b'\xff\xfe\x00' + 'ab'.encode('utf-16-le'))
+        self.assertEqual(extract.extract_text(path), 'Sermon title')
+
+    def test_text_is_capped(self):
+        path = self.write('long.txt', data=b'word ' * 100)
+        with mock.patch.object(extract, 'MAX_TEXT_LENGTH', 42):
+            self.assertEqual(len(extract.extract_text(path)), 42)
+
+    def test_refused_files(self):
+        with self.assertRaisesMessage(extract.ExtractionError, 'No text extractor'):
+            extract.extract_text(self.write('photo.jpg', data=b''))
+        with self.assertRaises(extract.ExtractionError):
+            extract.extract_text(self.write('broken.docx', data=b'not a zip'))
+        bomb = self.write('bomb.docx', {'word/document.xml': _xml('t', 'x' * 1000)})
+        with mock.patch.object(extract, 'MAX_XML_MEMBER_SIZE', 100), self.assertRaisesMessage(extract.ExtractionError, 'too large'):
+            extract.extract_text(bomb)
+        entities = self.write('entities.docx', {'word/document.xml': '<!DOCTYPE r [<!ENTITY e "boom">]><r>&e;</r>'})
+        with self.assertRaises(EntitiesForbidden):
+            extract.extract_text(entities)
@@ -0,0 +1,10 @@
+import html
+from django.utils.html import strip_tags
+
+
+def html_to_text(value):
+    """
+    Plain text of a rich-text (HTML) value, with entities decoded.
+    """
+    # Pad tags so words in adjacent blocks (``</p><p>``) don't run together.
+    return html.unescape(strip_tags((value or '').replace('>', '> ')))
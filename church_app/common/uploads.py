@@ -0,0 +1,193 @@
+import base64
+import binascii
+import hashlib
+import os
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from .files import file_sha256
+from .models import UploadSession
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# target name -> UploadTarget
+_targets = {}
+
+
+class UploadError(Exception):
+    """
+    Raised for client errors while receiving or finalizing an upload.
+    ``status`` is the HTTP status the view should answer with.
+    """
+
+    def __init__(self, detail, status=400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+class UploadTarget:
+    """
+    Where a finished upload ends up. Apps subclass this and call
+    ``register_target`` from ``AppConfig.ready``.
+    """
+    name = None
+    max_size = None
+
+    def validate(self, metadata, filename, user):
+        """
+        Check the init request before any bytes are sent; return cleaned
+        metadata or raise UploadError.
+        """
+        return metadata
+
+    def attach(self, session, file):
+        """
+        Attach the finished ``file`` and return the model instance it was saved on.
+        """
+        raise NotImplementedError
+
+
+def register_target(target):
+    _targets[target.name] = target
+
+
+def get_target(name):
+    try:
+        return _targets[name]
+    except KeyError:
+        raise UploadError(f"Unknown upload target '{name}'. Expected one of: {', '.join(sorted(_targets))}.")
+
+
+def upload_dir():
+    return str(getattr(settings, 'CHUNKED_UPLOAD_DIR', os.path.join(settings.MEDIA_ROOT, 'upload_sessions')))
+
+
+def partial_path(session):
+    return os.path.join(upload_dir(), f'{session.pk}.part')
+
+
+class PartialUploadFile(File):
+    """
+    A finished partial file. Exposing ``temporary_file_path`` lets
+    FileSystemStorage move it into place instead of copying it.
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def parse_chunk_checksum(header):
+    """
+    Parse an ``Upload-Checksum: sha256 <base64 digest>`` header (as in tus);
+    a hex digest is accepted too. Returns the raw digest or None.
+    """
+    if not header:
+        return None
+    algorithm, _, value = header.strip().partition(' ')
+    if algorithm.lower() != 'sha256':
+        raise UploadError("Only sha256 chunk checksums are supported.")
+    value = value.strip()
+    try:
+        if len(value) == 64:
+            return bytes.fromhex(value)
+        return base64.b64decode(value, validate=True)
+    except (ValueError, binascii.Error):
+        raise UploadError("Malformed Upload-Checksum header.")
+
+
+def write_chunk(session, stream, offset, length, expected_digest=None):
+    """
+    Stream ``length`` bytes from ``stream`` into the partial file at
+    ``offset`` in fixed-size pieces, so memory use doesn't depend on the chunk
+    size. On a checksum mismatch or short read the file is truncated back to
+    ``offset`` and UploadError is raised. Returns the new offset.
+    """
+    if offset != session.offset:
+        raise UploadError(f"Chunk starts at {offset} but the upload is at {session.offset}.", status=409)
+    if offset + length > session.size:
+        raise UploadError("Chunk runs past the declared upload size.")
+
+    os.makedirs(upload_dir(), exist_ok=True)
+    path = partial_path(session)
+    digest = hashlib.sha256()
+    received = 0
+    with open(path, 'r+b' if os.path.exists(path) else 'w+b') as f:
+        f.seek(offset)
+        while received < length:
+            data = stream.read(min(STREAM_CHUNK_SIZE, length - received))
+            if not data:
+                break
+            f.write(data)
+            digest.update(data)
+            received += len(data)
+        if received != length or (expected_digest is not None and digest.digest() != expected_digest):
+            f.truncate(offset)
+            if received != length:
+                raise UploadError(f"Expected {length} bytes but received {received}.")
+            raise UploadError("Chunk checksum mismatch.", status=460)
+        f.truncate(offset + length)
+    return offset + length
+
+
+def known_blob(digest, user):
+    """
+    Whether ``user`` may skip sending the file with this SHA-256: the default
+    storage already holds it (see common.storage.DedupStorage) and the user
+    has uploaded it before. Knowing a digest alone proves nothing about
+    having the file, so other users' blobs are never offered.
+    """
+    has_blob = getattr(default_storage, 'has_blob', None)
+    if not digest or has_blob is None or not has_blob(digest):
+        return False
+    return UploadSession.objects.filter(user=user, checksum=digest, status='complete').exists()
+
+
+def _attach_known_blob(session):
+    # The session was created with the checksum of a file the user already
+    # uploaded and no bytes were sent; link the existing blob instead.
+    try:
+        if not known_blob(session.checksum, session.user_id):
+            raise FileNotFoundError(session.checksum)
+        blob = default_storage.open_blob(session.checksum)
+    except (AttributeError, FileNotFoundError):
+        type(session).objects.filter(pk=session.pk).update(offset=0)
+        raise UploadError("The file is no longer stored; upload it from offset 0.", status=409)
+    with blob:
+        file = File(blob, name=session.filename)
+        file.sha256 = session.checksum
+        return get_target(session.target).attach(session, file)
+
+
+def finalize(session):
+    """
+    Verify the complete partial file and hand it to the session's target.
+    Returns the instance the file was attached to.
+    """
+    if session.offset != session.size:
+        raise UploadError(f"Upload incomplete: {session.offset} of {session.size} bytes received.", status=409)
+    path = partial_path(session)
+    if session.size and not os.path.exists(path):
+        return _attach_known_blob(session)
+    if session.size == 0:
+        open(path, 'ab').close()
+    if session.checksum and file_sha256(path) != session.checksum.lower():
+        raise UploadError("Upload checksum mismatch.", status=460)
+
+    with open(path, 'rb') as f:
+        file = PartialUploadFile(f, name=session.filename)
+        # Already verified; lets a deduplicating storage skip hashing again.
+        file.sha256 = session.checksum or None
+        instance = get_target(session.target).attach(session, file)
+    if os.path.exists(path):
+        os.unlink(path)
+    return instance
+
+
+def expired(queryset):
+    """
+    Sessions untouched for longer than CHUNKED_UPLOAD_EXPIRY seconds.
+    """
+    cutoff = timezone.now() - timezone.timedelta(seconds=getattr(settings, 'CHUNKED_UPLOAD_EXPIRY', 24 * 60 * 60))
+    return queryset.filter(updated_at__lt=cutoff)
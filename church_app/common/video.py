@@ -0,0 +1,123 @@
+import logging
+import math
+import os
+import subprocess
+from django.conf import settings
+from django.core.files.base import ContentFile
+from .files import local_path
+
+logger = logging.getLogger(__name__)
+
+# Scrub strip layout: up to COLUMNS x ROWS tiles, TILE_WIDTH px wide each.
+SPRITE_COLUMNS = 10
+SPRITE_ROWS = 10
+SPRITE_TILE_WIDTH = 160
+POSTER_WIDTH = 1280
+
+
+class VideoToolError(Exception):
+    pass
+
+
+def _ffmpeg():
+    return getattr(settings, 'FFMPEG_BINARY', 'ffmpeg')
+
+
+def _ffprobe():
+    return getattr(settings, 'FFPROBE_BINARY', 'ffprobe')
+
+
+def _run(args):
+    try:
+        result = subprocess.run(
+            args,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            timeout=getattr(settings, 'FFMPEG_TIMEOUT', 600),
+            check=False,
+        )
+    except FileNotFoundError as e:
+        raise VideoToolError(f"{args[0]} is not installed") from e
+    except subprocess.TimeoutExpired as e:
+        raise VideoToolError(f"{args[0]} timed out") from e
+    if result.returncode != 0:
+        raise VideoToolError(result.stderr.decode(errors='replace')[-500:])
+    return result.stdout
+
+
+def probe(path):
+    """
+    Return ``(duration_seconds, width, height)`` of the first video stream.
+    """
+    out = _run([
+        _ffprobe(), '-v', 'error', '-select_streams', 'v:0',
+        '-show_entries', 'stream=width,height:format=duration',
+        '-of', 'default=noprint_wrappers=1', path,
+    ])
+    info = dict(line.split('=', 1) for line in out.decode().splitlines() if '=' in line)
+    try:
+        return float(info['duration']), int(info['width']), int(info['height'])
+    except (KeyError, ValueError) as e:
+        raise VideoToolError(f"Could not probe {path}") from e
+
+
+def extract_poster(path, at):
+    """
+    JPEG bytes of the frame at ``at`` seconds. ``-ss`` before ``-i`` seeks by
+    keyframe, so only a handful of frames are decoded.
+    """
+    return _run([
+        _ffmpeg(), '-v', 'error', '-threads', '1', '-ss', f'{at:.3f}', '-i', path,
+        '-frames:v', '1', '-vf', f"scale='min({POSTER_WIDTH},iw)':-2",
+        '-q:v', '3', '-f', 'image2pipe', '-vcodec', 'mjpeg', 'pipe:1',
+    ])
+
+
+def build_sprite(path, duration):
+    """
+    Build a scrub strip: evenly spaced frames tiled into one JPEG. Only
+    keyframes are decoded, which keeps this cheap even for long recordings.
+
+    Returns ``(jpeg_bytes, metadata)``.
+    """
+    count = SPRITE_COLUMNS * SPRITE_ROWS
+    interval = max(duration / count, 1.0)
+    count = min(count, max(int(duration // interval), 1))
+    rows = math.ceil(count / SPRITE_COLUMNS)
+    columns = min(count, SPRITE_COLUMNS)
+    data = _run([
+        _ffmpeg(), '-v', 'error', '-threads', '1', '-skip_frame', 'nokey', '-i', path,
+        '-vf', f'fps=1/{interval:.3f},scale={SPRITE_TILE_WIDTH}:-2,tile={columns}x{rows}',
+        '-frames:v', '1', '-fps_mode', 'vfr', '-q:v', '5',
+        '-f', 'image2pipe', '-vcodec', 'mjpeg', 'pipe:1',
+    ])
+    return data, {'columns': columns, 'rows': rows, 'count': count, 'interval': interval, 'tile_width': SPRITE_TILE_WIDTH}
+
+
+def generate_video_renditions(instance, field_name):
+    """
+    Media pipeline stage: store a poster frame and a scrub sprite for
+    ``instance.<field_name>`` as the ``poster`` and ``sprite`` renditions.
+    """
+    source = getattr(instance, field_name)
+    storage = source.storage
+    root, _ = os.path.splitext(source.name)
+
+    with local_path(source) as path:
+        duration, width, height = probe(path)
+        # Skip the first seconds, which are often black or a fade-in.
+        poster = extract_poster(path, min(duration * 0.1, 10.0))
+        sprite, sprite_info = build_sprite(path, duration)
+
+    tile_height = round(height * SPRITE_TILE_WIDTH / width / 2) * 2 if width else None
+    instance.update_renditions(
+        poster={'name': storage.save(f'{root}_poster.jpg', ContentFile(poster)), 'size': len(poster)},
+        sprite={
+            'name': storage.save(f'{root}_sprite.jpg', ContentFile(sprite)),
+            'size': len(sprite),
+            'tile_height': tile_height,
+            'duration': duration,
+            **sprite_info,
+        },
+    )
+    logger.info(f"Generated poster and scrub sprite for {instance._meta.label} {instance.pk}")
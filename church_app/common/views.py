@@ -1,3 +1,116 @@
-from django.shortcuts import render
+import os
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from . import uploads
+from .models import UploadSession
+from .serializers import UploadSessionSerializer
 
-# Create your views here.
+
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable chunked uploads.
+
+    1. ``POST /uploads/`` with ``target``, ``filename``, ``size``, optional
+       ``checksum`` (hex SHA-256 of the whole file) and target ``metadata``.
+       If the user has uploaded a file with that checksum before and it is
+       still stored, the session starts with ``offset == size`` and step 2
+       is skipped.
+    2. ``PUT /uploads/{id}/`` with the raw bytes and a
+       ``Content-Range: bytes <start>-<end>/<size>`` header, repeated until
+       ``offset == size``. An optional ``Upload-Checksum: sha256 <digest>``
+       header is verified per chunk. After a dropped connection, ``GET`` the
+       session and resume from ``offset``.
+    3. ``POST /uploads/{id}/finalize/`` attaches the file to its target.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        checksum = serializer.validated_data.get('checksum')
+        if uploads.known_blob(checksum, self.request.user):
+            # Already stored: nothing to send, the client can finalize right away.
+            serializer.save(user=self.request.user, offset=serializer.validated_data['size'])
+        else:
+            serializer.save(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        path = uploads.partial_path(instance)
+        instance.delete()
+        if os.path.exists(path):
+            os.unlink(path)
+
+    def _error(self, e):
+        detail = e.detail if isinstance(e.detail, (dict, list)) else {'detail': str(e.detail)}
+        return Response(detail, status=e.status)
+
+    def _parse_content_range(self, request, session):
+        # Content-Range: bytes <start>-<end>/<total>
+        header = request.headers.get('Content-Range')
+        length = int(request.headers.get('Content-Length') or 0)
+        if not header:
+            return session.offset, length
+        try:
+            unit, _, spec = header.partition(' ')
+            span, _, total = spec.partition('/')
+            start, _, end = span.partition('-')
+            start, end = int(start), int(end)
+        except ValueError:
+            raise uploads.UploadError("Malformed Content-Range header.")
+        if unit != 'bytes' or end < start or end - start + 1 != length:
+            raise uploads.UploadError("Content-Range does not match the request body.")
+        if total not in ('*', str(session.size)):
+            raise uploads.UploadError("Content-Range total does not match the upload size.")
+        return start, length
+
+    def update(self, request, *args, **kwargs):
+        session = self.get_object()
+        if session.status != 'active':
+            return Response({'detail': "Upload already finalized."}, status=status.HTTP_409_CONFLICT)
+        try:
+            offset, length = self._parse_content_range(request, session)
+            max_chunk = getattr(settings, 'CHUNKED_UPLOAD_MAX_CHUNK_SIZE', 64 * 1024 * 1024)
+            if length > max_chunk:
+                raise uploads.UploadError(f"Chunks must be at most {max_chunk} bytes.", status=413)
+            digest = uploads.parse_chunk_checksum(request.headers.get('Upload-Checksum'))
+            # Read the raw WSGI stream; request.data would buffer the whole body.
+            new_offset = uploads.write_chunk(session, request._request, offset, length, digest)
+        except uploads.UploadError as e:
+            return self._error(e)
+
+        # Compare-and-set so a concurrent duplicate of this chunk can't move
+        # the offset twice.
+        updated = UploadSession.objects.filter(pk=session.pk, offset=offset).update(
+            offset=new_offset, updated_at=timezone.now()
+        )
+        if not updated:
+            session.refresh_from_db()
+            return Response({'detail': "Upload offset changed concurrently.", 'offset': session.offset}, status=status.HTTP_409_CONFLICT)
+        session.offset = new_offset
+        return Response({'id': session.pk, 'offset': new_offset, 'size': session.size}, headers={'Upload-Offset': str(new_offset)})
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        session = self.get_object()
+        if session.status != 'active':
+            return Response({'detail': "Upload already finalized."}, status=status.HTTP_409_CONFLICT)
+        try:
+            with transaction.atomic():
+                instance = uploads.finalize(session)
+                session.status = 'complete'
+                session.save(update_fields=['status', 'updated_at'])
+        except uploads.UploadError as e:
+            return self._error(e)
+        return Response({
+            'id': session.pk,
+            'status': session.status,
+            'target': session.target,
+            'object_id': instance.pk,
+        }, status=status.HTTP_201_CREATED)
@@ -4,3 +4,37 @@ from django.apps import AppConfig
 class ContentConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "content"
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from common import conditional, pipeline, search, uploads
+        from common.mp4 import faststart_stage
+        from common.video import generate_video_renditions
+        from . import tagindex
+        from .models import Article, BlogPost, Document, Image, Tag, Video
+        from .renditions import generate_image_renditions
+        from .uploads import VideoUploadTarget
+
+        # Background processing for new uploads: fast-start MP4s first, then
+        # thumbnails and posters
+        pipeline.register(Image, 'image', generate_image_renditions)
+        pipeline.register(Video, 'video', faststart_stage, priority=10)
+        pipeline.register(Video, 'video', generate_video_renditions)
+
+        # Full-text index of titles and text, and of uploaded document text
+        search.register_model(Article, body_fields=['content'])
+        search.register_model(BlogPost, body_fields=['content'])
+        search.register_model(Image, body_fields=['description'])
+        search.register_model(Video, body_fields=['description'])
+        search.register_model(Document, body_fields=['description'])
+        search.register(Document, 'document')
+
+        # Tag autocomplete ranked by usage, built in the background
+        tagindex.register(Article, BlogPost, Image, Video, Document)
+        tagindex.tag_index.start()
+
+        # Versions behind ETag/Last-Modified
+        conditional.track(Tag, Article, BlogPost, Image, Video, Document, get_user_model())
+
+        # Resumable chunked uploads for large videos
+        uploads.register_target(VideoUploadTarget())
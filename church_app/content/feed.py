@@ -0,0 +1,95 @@
+import base64
+import binascii
+import heapq
+import json
+from itertools import islice
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from .models import Article, BlogPost, Image, Video, Document
+from .serializers import ArticleSerializer, BlogPostSerializer, ImageSerializer, VideoSerializer, DocumentSerializer
+
+# (type, model, timestamp field, serializer). The position breaks ties between
+# items of different types published at the same instant.
+FEED_SOURCES = [
+    ('article', Article, 'created_at', ArticleSerializer),
+    ('blogpost', BlogPost, 'created_at', BlogPostSerializer),
+    ('image', Image, 'uploaded_at', ImageSerializer),
+    ('video', Video, 'uploaded_at', VideoSerializer),
+    ('document', Document, 'uploaded_at', DocumentSerializer),
+]
+FEED_TYPES = [source[0] for source in FEED_SOURCES]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(position):
+    """
+    Opaque token for a feed position ``(timestamp, type, pk)``.
+    """
+    timestamp, type_name, pk = position
+    data = json.dumps([timestamp.isoformat(), type_name, pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        data = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        timestamp, type_name, pk = json.loads(data)
+        timestamp = parse_datetime(timestamp)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor(token)
+    if timestamp is None or type_name not in FEED_TYPES or not isinstance(pk, int):
+        raise InvalidCursor(token)
+    return timestamp, type_name, pk
+
+
+def _after(rank, time_field, cursor):
+    """
+    Condition for rows of the type at ``rank`` that come after ``cursor`` in
+    feed order: newest first, then by type, then newest pk first.
+    """
+    timestamp, type_name, pk = cursor
+    cursor_rank = FEED_TYPES.index(type_name)
+    older = Q(**{f'{time_field}__lt': timestamp})
+    if rank < cursor_rank:
+        return older
+    # The plain upper bound lets the database seek into the index rather
+    # than scan it from the newest row.
+    not_newer = Q(**{f'{time_field}__lte': timestamp})
+    if rank > cursor_rank:
+        return not_newer
+    return not_newer & (older | Q(pk__lt=pk))
+
+
+def _stream(rank, type_name, queryset, time_field, cursor, limit):
+    if cursor is not None:
+        queryset = queryset.filter(_after(rank, time_field, cursor))
+    # Served by the (-<time field>, -id) index; at most ``limit`` rows are read.
+    for obj in queryset.order_by(f'-{time_field}', '-pk')[:limit]:
+        yield (getattr(obj, time_field), -rank, obj.pk), type_name, obj
+
+
+def feed_page(querysets, cursor=None, size=20):
+    """
+    One page of the merged feed. ``querysets`` maps a type to the queryset to
+    draw it from (types left out are not included).
+
+    Each type is read with one indexed query for the ``size + 1`` rows after
+    the cursor, and the sorted streams are merged k-way, so every page costs
+    the same however deep it is. Returns ``([(type, obj), ...], next cursor
+    or None)``.
+    """
+    streams = []
+    for rank, (type_name, model, time_field, _) in enumerate(FEED_SOURCES):
+        if type_name in querysets:
+            streams.append(_stream(rank, type_name, querysets[type_name], time_field, cursor, size + 1))
+
+    merged = list(islice(heapq.merge(*streams, key=lambda item: item[0], reverse=True), size + 1))
+    items = [(type_name, obj) for _, type_name, obj in merged[:size]]
+    next_cursor = None
+    if len(merged) > size:
+        (timestamp, _, pk), type_name, _ = merged[size - 1]
+        next_cursor = encode_cursor((timestamp, type_name, pk))
+    return items, next_cursor
@@ -0,0 +1,89 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.urls import set_urlconf
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from content.models import Article, Tag
+from content.serializers import ArticleSerializer, TagSerializer
+
+
+class _Rollback(Exception):
+    pass
+
+
+class StockTagSerializer(TagSerializer):
+    serializer_url_field = serializers.HyperlinkedIdentityField
+
+
+class StockArticleSerializer(ArticleSerializer):
+    serializer_url_field = serializers.HyperlinkedIdentityField
+    tags = StockTagSerializer(many=True, read_only=True)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare serializing a page of articles (each with tags) using reverse() per "
+        "hyperlink against the cached route templates of common.hyperlinks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help="Articles per page.")
+        parser.add_argument('--tags', type=int, default=5, help="Tags per article.")
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        # Content routes on their own, so the benchmark doesn't depend on
+        # where the project mounts them.
+        set_urlconf('content.urls')
+        try:
+            with transaction.atomic():
+                self._run(options['rows'], options['tags'], options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+        finally:
+            set_urlconf(None)
+
+    def _run(self, rows, tag_count, repeat):
+        author = get_user_model().objects.create(username='benchmark-hyperlinks')
+        tags = Tag.objects.bulk_create([Tag(name=f'benchmark-{i}') for i in range(tag_count)])
+        articles = Article.objects.bulk_create([
+            Article(title=f'Benchmark {i}', content='<p>Django</p>', author=author) for i in range(rows)
+        ])
+        through = Article.tags.through
+        through.objects.bulk_create([through(article_id=a.pk, tag_id=t.pk) for a in articles for t in tags])
+        page = list(Article.objects.filter(pk__in=[a.pk for a in articles]).select_related('author').prefetch_related('tags'))
+        request = Request(APIRequestFactory().get('/articles/'))
+        context = {'request': request}
+
+        stock = StockArticleSerializer(page, many=True, context=context).data
+        cached = ArticleSerializer(page, many=True, context=context).data
+        if stock != cached:
+            raise CommandError("Cached hyperlinks differ from reverse().")
+
+        links = rows * (1 + tag_count)
+        self.stdout.write(f"{rows} articles x {tag_count} tags = {links} hyperlinks per page, {repeat} runs")
+        timings = {}
+        for label, serializer_class in [("reverse() per link", StockArticleSerializer), ("cached templates", ArticleSerializer)]:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                serializer_class(page, many=True, context={'request': Request(APIRequestFactory().get('/articles/'))}).data
+            timings[label] = (time.perf_counter() - start) / repeat
+            self.stdout.write(f"{label:<20} {timings[label] * 1000:8.2f} ms/page")
+
+        field = serializers.HyperlinkedIdentityField(view_name='tag-detail')
+        cached_field = ArticleSerializer.serializer_url_field(view_name='tag-detail')
+        for label, url_field in [("reverse() per link", field), ("cached templates", cached_field)]:
+            objs = tags * rows
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for tag in objs:
+                    url_field.get_url(tag, 'tag-detail', request, None)
+            per_link = (time.perf_counter() - start) / (repeat * len(objs)) * 1000000
+            self.stdout.write(f"{label:<20} {per_link:8.2f} us/link (URL only)")
+
+        speedup = timings["reverse() per link"] / timings["cached templates"]
+        self.stdout.write(self.style.SUCCESS(f"Page serialization {speedup:.2f}x faster with cached templates"))
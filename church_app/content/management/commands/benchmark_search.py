@@ -0,0 +1,78 @@
+import random
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from common.search import index_records, matching_ids
+from common.synthetic import vocabulary
+from content.models import Article
+
+QUERIES = ['grace', 'shepherd covenant', '"quiet rest"', 'harvesting']
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare article search with icontains (LIKE) scans against the full-text index "
+        "on synthetic articles. Everything is created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articles', type=int, default=100_000, help="Number of synthetic articles.")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per query.")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options['articles'], options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, count, repeat):
+        rng = random.Random(0)
+        author, _ = get_user_model().objects.get_or_create(username='benchmark-search')
+        words, weights = vocabulary(rng)
+
+        def text(k):
+            return ' '.join(rng.choices(words, weights, k=k))
+
+        start = time.perf_counter()
+        articles = [
+            Article(
+                title=text(5).capitalize(),
+                content=''.join(f'<p>{text(60)}.</p>' for _ in range(5)),
+                author=author,
+            )
+            for _ in range(count)
+        ]
+        Article.objects.bulk_create(articles, batch_size=2000)
+        self.stdout.write(f"Created {count} articles in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        index_records(Article, articles)
+        self.stdout.write(f"Indexed them in {time.perf_counter() - start:.1f}s")
+
+        for query in QUERIES:
+            terms = [query.strip('"')] if query.startswith('"') else query.split()
+            like = Q()
+            for term in terms:
+                like &= Q(title__icontains=term) | Q(content__icontains=term)
+
+            scan, scan_hits = self._time(repeat, lambda: list(Article.objects.filter(like).order_by('-created_at').values_list('pk', flat=True)[:20]))
+            fts, fts_hits = self._time(repeat, lambda: matching_ids(Article, query, limit=20))
+            self.stdout.write(
+                f"{query:<20} icontains {scan * 1000:9.1f} ms ({len(scan_hits)} hits)   "
+                f"full-text {fts * 1000:9.1f} ms ({len(fts_hits)} hits, ranked)"
+            )
+
+    def _time(self, repeat, func):
+        result = func()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        return (time.perf_counter() - start) / repeat, result
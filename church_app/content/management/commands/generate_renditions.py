@@ -0,0 +1,49 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.db import connections
+from content.models import Image
+from content.renditions import RENDITION_SIZES, generate_image_renditions
+
+
+def _generate(pk):
+    try:
+        image = Image.objects.get(pk=pk)
+        generate_image_renditions(image)
+    finally:
+        connections.close_all()
+
+
+def _has_variants(renditions):
+    return any(key.startswith('jpeg_') for key in renditions or {})
+
+
+class Command(BaseCommand):
+    help = "Backfill thumbnail renditions and responsive variants for existing content images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help="Number of images processed in parallel.")
+        parser.add_argument('--force', action='store_true', help="Regenerate renditions that already exist.")
+
+    def handle(self, *args, **options):
+        queryset = Image.objects.exclude(image='')
+        pks = [
+            pk for pk, renditions in queryset.values_list('pk', 'renditions').iterator()
+            if options['force'] or set(RENDITION_SIZES) - set(renditions or {}) or not _has_variants(renditions)
+        ]
+        if not pks:
+            self.stdout.write("All images already have renditions.")
+            return
+
+        self.stdout.write(f"Generating renditions for {len(pks)} images with {options['workers']} workers...")
+        failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {executor.submit(_generate, pk): pk for pk in pks}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"Image {futures[future]}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {len(pks) - failed} generated, {failed} failed."))
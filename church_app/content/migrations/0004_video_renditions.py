@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("content", "0003_image_renditions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="video",
+            name="renditions",
+            field=models.JSONField(
+                blank=True, default=dict, editable=False, verbose_name="Renditions"
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-18 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("content", "0004_video_renditions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="video",
+            name="media_info",
+            field=models.JSONField(
+                blank=True, default=dict, editable=False, verbose_name="Media Info"
+            ),
+        ),
+    ]
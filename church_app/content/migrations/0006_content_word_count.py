@@ -0,0 +1,74 @@
+# Generated by Django 5.0.2 on 2026-10-18 18:28
+
+import html
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+BATCH_SIZE = 500
+
+# Frozen copies of content.text as of this migration, so later changes to it
+# can't change what this migration does.
+WORDS_PER_MINUTE = 200
+
+
+def count_words(rich_text):
+    # Pad tags so words in adjacent blocks (``</p><p>``) don't run together.
+    return len(html.unescape(strip_tags((rich_text or '').replace('>', '> '))).split())
+
+
+def reading_minutes(word_count):
+    return word_count // WORDS_PER_MINUTE
+
+
+def backfill_word_counts(apps, schema_editor):
+    for model_name in ("Article", "BlogPost"):
+        model = apps.get_model("content", model_name)
+        batch = []
+        for obj in model.objects.only("pk", "content").iterator(chunk_size=BATCH_SIZE):
+            obj.word_count = count_words(obj.content)
+            obj.reading_time = reading_minutes(obj.word_count)
+            batch.append(obj)
+            if len(batch) >= BATCH_SIZE:
+                model.objects.bulk_update(batch, ["word_count", "reading_time"])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ["word_count", "reading_time"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("content", "0005_video_media_info"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="reading_time",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Reading Time (minutes)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="word_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Word Count"
+            ),
+        ),
+        migrations.AddField(
+            model_name="blogpost",
+            name="reading_time",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Reading Time (minutes)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="blogpost",
+            name="word_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Word Count"
+            ),
+        ),
+        migrations.RunPython(backfill_word_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.2 on 2026-10-18 18:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("content", "0006_content_word_count"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="content_article_feed_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="blogpost",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="content_blogpost_feed_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="document",
+            index=models.Index(
+                fields=["-uploaded_at", "-id"], name="content_document_feed_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="image",
+            index=models.Index(
+                fields=["-uploaded_at", "-id"], name="content_image_feed_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="video",
+            index=models.Index(
+                fields=["-uploaded_at", "-id"], name="content_video_feed_idx"
+            ),
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
 from ckeditor.fields import RichTextField
+from common.models import RenditionsModel
+from .text import count_words, reading_minutes
 
 User = get_user_model()
 
@@ -23,6 +25,9 @@ class Content(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
     updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
     tags = models.ManyToManyField(Tag, blank=True, verbose_name=_("Tags"))
+    # Derived from ``content`` on save so list views never parse the body.
+    word_count = models.PositiveIntegerField(default=0, editable=False, verbose_name=_("Word Count"))
+    reading_time = models.PositiveIntegerField(default=0, editable=False, verbose_name=_("Reading Time (minutes)"))
 
     class Meta:
         abstract = True
@@ -33,19 +38,32 @@ class Content(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            self.word_count = count_words(self.content)
+            self.reading_time = reading_minutes(self.word_count)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'word_count', 'reading_time'}
+        super().save(*args, **kwargs)
+
 class Article(Content):
     class Meta:
         verbose_name = _("Article")
         verbose_name_plural = _("Articles")
         ordering = ['-created_at']
+        # Newest-first keyset reads (the feed)
+        indexes = [models.Index(fields=['-created_at', '-id'], name='content_article_feed_idx')]
 
 class BlogPost(Content):
     class Meta:
         verbose_name = _("Blog Post")
         verbose_name_plural = _("Blog Posts")
         ordering = ['-created_at']
+        # Newest-first keyset reads (the feed)
+        indexes = [models.Index(fields=['-created_at', '-id'], name='content_blogpost_feed_idx')]
 
-class Image(models.Model):
+class Image(RenditionsModel):
     title = models.CharField(max_length=200, verbose_name=_("Title"))
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name=_("Uploaded By"))
     uploaded_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Uploaded At"))
@@ -57,38 +75,28 @@ class Image(models.Model):
         verbose_name = _("Image")
         verbose_name_plural = _("Images")
         ordering = ['-uploaded_at']
+        # Newest-first keyset reads (the feed)
+        indexes = [models.Index(fields=['-uploaded_at', '-id'], name='content_image_feed_idx')]
         unique_together = ('title', 'uploaded_by')
 
     def __str__(self):
         return self.title
 
-    @property
-    def thumbnail(self):
-        from PIL import Image as PILImage
-        from io import BytesIO
-        from django.core.files.uploadedfile import InMemoryUploadedFile
-
-        if self.image:
-            img = PILImage.open(self.image)
-            img.thumbnail((100, 100), PILImage.ANTIALIAS)
-            thumb_io = BytesIO()
-            img.save(thumb_io, format='JPEG')
-            thumbnail = InMemoryUploadedFile(thumb_io, None, 'thumbnail.jpg', 'image/jpeg', thumb_io.getbuffer().nbytes, None)
-            return thumbnail
-        return None
-
-class Video(models.Model):
+class Video(RenditionsModel):
     title = models.CharField(max_length=200, verbose_name=_("Title"))
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name=_("Uploaded By"))
     uploaded_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Uploaded At"))
     description = models.TextField(blank=True, verbose_name=_("Description"))
     tags = models.ManyToManyField(Tag, blank=True, verbose_name=_("Tags"))
     video = models.FileField(upload_to='videos/', verbose_name=_("Video"))
+    media_info = models.JSONField(default=dict, blank=True, editable=False, verbose_name=_("Media Info"))
 
     class Meta:
         verbose_name = _("Video")
         verbose_name_plural = _("Videos")
         ordering = ['-uploaded_at']
+        # Newest-first keyset reads (the feed)
+        indexes = [models.Index(fields=['-uploaded_at', '-id'], name='content_video_feed_idx')]
         unique_together = ('title', 'uploaded_by')
 
     def __str__(self):
@@ -106,6 +114,8 @@ class Document(models.Model):
         verbose_name = _("Document")
         verbose_name_plural = _("Documents")
         ordering = ['-uploaded_at']
+        # Newest-first keyset reads (the feed)
+        indexes = [models.Index(fields=['-uploaded_at', '-id'], name='content_document_feed_idx')]
 
     def __str__(self):
         return self.title
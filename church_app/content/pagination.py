@@ -0,0 +1,171 @@
+import json
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+# ``?count=`` values for page-number pagination.
+COUNT_EXACT = 'exact'
+COUNT_ESTIMATE = 'estimate'
+COUNT_NONE = 'none'
+
+
+def estimate_count(queryset):
+    """
+    Row count of ``queryset`` from the PostgreSQL planner's estimate, which
+    costs no scan. Other databases have no usable estimate and get an exact
+    ``COUNT(*)``.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        try:
+            plan = json.loads(queryset.order_by().explain(format='json'))
+            return int(plan[0]['Plan']['Plan Rows'])
+        except (DatabaseError, KeyError, IndexError, TypeError, ValueError):
+            pass
+    return queryset.count()
+
+
+class UncountedPage(Page):
+    has_more = False
+
+    def has_next(self):
+        return self.has_more
+
+
+class UncountedPaginator(Paginator):
+    """
+    Paginator that never counts: it reads one row past the page to find out
+    whether there is a next one. ``num_pages`` is only as far as that.
+    """
+    known_pages = 1
+
+    @property
+    def num_pages(self):
+        return self.known_pages
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages['no_results'])
+        page = UncountedPage(rows[:self.per_page], number, self)
+        page.has_more = len(rows) > self.per_page
+        self.known_pages = number + page.has_more
+        return page
+
+
+class EstimatedCountPaginator(UncountedPaginator):
+    """
+    Paginator whose ``count`` is the planner's estimate. The estimate can be
+    low (stale statistics, filters), so pages are found the way
+    ``UncountedPaginator`` finds them, from the rows actually read. The count
+    is never less than the rows known to exist, and is exact on the last page.
+    """
+    rows_seen = 0
+    read_to_end = False
+
+    @cached_property
+    def estimated_count(self):
+        return estimate_count(self.object_list)
+
+    @property
+    def count(self):
+        if self.read_to_end:
+            return self.rows_seen
+        return max(self.estimated_count, self.rows_seen)
+
+    def page(self, number):
+        page = super().page(number)
+        self.rows_seen = (page.number - 1) * self.per_page + len(page) + page.has_more
+        self.read_to_end = not page.has_more
+        return page
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination: every page is one indexed range read, with
+    no COUNT(*) and no OFFSET. The view's ``cursor_ordering`` must match an
+    index, e.g. ``('-created_at', '-id')``.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, 'cursor_ordering', self.ordering)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'links': {
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link()
+            },
+            'results': data
+        })
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    """
+    Page-number pagination with two opt-ins per request:
+
+    - ``?pagination=cursor`` (or any ``?cursor=``) switches to
+      ``KeysetPagination``, whose cost doesn't grow with depth;
+    - ``?count=estimate`` reports the planner's row estimate instead of
+      running ``COUNT(*)``, and ``?count=none`` leaves the count out.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+
+    keyset = None
+    count_mode = COUNT_EXACT
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if params.get('pagination') == 'cursor' or KeysetPagination.cursor_query_param in params:
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+
+        self.count_mode = params.get(self.count_query_param)
+        if self.count_mode not in (COUNT_ESTIMATE, COUNT_NONE):
+            self.count_mode = COUNT_EXACT
+        self.django_paginator_class = {
+            COUNT_ESTIMATE: EstimatedCountPaginator,
+            COUNT_NONE: UncountedPaginator,
+        }.get(self.count_mode, Paginator)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        response = {
+            'links': {
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link()
+            },
+        }
+        if self.count_mode != COUNT_NONE:
+            response['count'] = self.page.paginator.count
+            if self.count_mode == COUNT_ESTIMATE:
+                response['count_is_estimate'] = True
+        response['results'] = data
+        return Response(response)
+
+    def get_html_context(self):
+        if self.keyset is not None:
+            return self.keyset.get_html_context()
+        return super().get_html_context()
@@ -0,0 +1,24 @@
+from common import imaging
+
+# Fixed rendition sizes (bounding boxes, JPEG); aspect ratio is preserved.
+RENDITION_SIZES = {
+    'thumb': (100, 100),
+    'small': (320, 320),
+    'medium': (800, 800),
+}
+
+# Widths of the responsive WebP/AVIF/JPEG variants behind ``srcset``.
+VARIANT_WIDTHS = (320, 640, 1024, 1600)
+
+
+def rendition_specs():
+    return [(key, size, 'JPEG') for key, size in RENDITION_SIZES.items()] + imaging.variant_specs(VARIANT_WIDTHS)
+
+
+def generate_image_renditions(image, field_name='image'):
+    """
+    Decode ``image.<field_name>`` once in the image pool and write the fixed
+    sizes in RENDITION_SIZES plus the responsive variants. The storage names
+    are merged into ``image.renditions``.
+    """
+    return imaging.generate_renditions(image, field_name, rendition_specs())
@@ -1,5 +1,8 @@
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 from django.contrib.auth import get_user_model
+from common.hyperlinks import CachedHyperlinkedModelSerializer
+from common.serializers import RenditionURLMixin, SafeImageField
 from .models import Tag, Article, BlogPost, Image, Video, Document
 
 User = get_user_model()
@@ -9,11 +12,11 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'username', 'email']
 
-class TagSerializer(serializers.HyperlinkedModelSerializer):
+class TagSerializer(CachedHyperlinkedModelSerializer):
     name = serializers.CharField(
         max_length=50,
         validators=[
-            serializers.UniqueValidator(queryset=Tag.objects.all(), message="Tag with this name already exists.")
+            UniqueValidator(queryset=Tag.objects.all(), message="Tag with this name already exists.")
         ]
     )
 
@@ -21,7 +24,7 @@ class TagSerializer(serializers.HyperlinkedModelSerializer):
         model = Tag
         fields = ['url', 'id', 'name']
 
-class ArticleSerializer(serializers.HyperlinkedModelSerializer):
+class ArticleSerializer(CachedHyperlinkedModelSerializer):
     author = UserSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     title = serializers.CharField(max_length=200)
@@ -30,13 +33,12 @@ class ArticleSerializer(serializers.HyperlinkedModelSerializer):
 
     class Meta:
         model = Article
-        fields = ['url', 'id', 'title', 'content', 'author', 'created_at', 'updated_at', 'tags', 'reading_time']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['url', 'id', 'title', 'content', 'author', 'created_at', 'updated_at', 'tags', 'word_count', 'reading_time']
+        read_only_fields = ['created_at', 'updated_at', 'word_count']
 
     def get_reading_time(self, obj):
-        word_count = len(obj.content.split())
-        reading_time = word_count // 200  # Assuming an average reading speed of 200 words per minute
-        return f"{reading_time} min read"
+        # Stored on save (see content.models.Content); the body isn't needed here.
+        return f"{obj.reading_time} min read"
 
     def validate_title(self, value):
         if len(value) < 5:
@@ -48,7 +50,7 @@ class ArticleSerializer(serializers.HyperlinkedModelSerializer):
             raise serializers.ValidationError("Content must mention 'Django'.")
         return data
 
-class BlogPostSerializer(serializers.HyperlinkedModelSerializer):
+class BlogPostSerializer(CachedHyperlinkedModelSerializer):
     author = UserSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     title = serializers.CharField(max_length=200)
@@ -57,13 +59,12 @@ class BlogPostSerializer(serializers.HyperlinkedModelSerializer):
 
     class Meta:
         model = BlogPost
-        fields = ['url', 'id', 'title', 'content', 'author', 'created_at', 'updated_at', 'tags', 'reading_time']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['url', 'id', 'title', 'content', 'author', 'created_at', 'updated_at', 'tags', 'word_count', 'reading_time']
+        read_only_fields = ['created_at', 'updated_at', 'word_count']
 
     def get_reading_time(self, obj):
-        word_count = len(obj.content.split())
-        reading_time = word_count // 200  # Assuming an average reading speed of 200 words per minute
-        return f"{reading_time} min read"
+        # Stored on save (see content.models.Content); the body isn't needed here.
+        return f"{obj.reading_time} min read"
 
     def validate_title(self, value):
         if len(value) < 5:
@@ -75,42 +76,60 @@ class BlogPostSerializer(serializers.HyperlinkedModelSerializer):
             raise serializers.ValidationError("Content must mention 'Django'.")
         return data
 
-class ImageSerializer(serializers.HyperlinkedModelSerializer):
+class ImageSerializer(RenditionURLMixin, CachedHyperlinkedModelSerializer):
     uploaded_by = UserSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     thumbnail = serializers.SerializerMethodField()
-    preview = serializers.ImageField(read_only=True)
+    preview = serializers.SerializerMethodField()
+    renditions = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
     title = serializers.CharField(max_length=200)
     description = serializers.CharField(allow_blank=True)
+    image = SafeImageField()
 
     class Meta:
         model = Image
-        fields = ['url', 'id', 'title', 'uploaded_by', 'uploaded_at', 'description', 'tags', 'image', 'thumbnail', 'preview']
+        fields = ['url', 'id', 'title', 'uploaded_by', 'uploaded_at', 'description', 'tags', 'image', 'thumbnail', 'preview', 'renditions', 'srcset']
         read_only_fields = ['uploaded_at']
 
+    # Renditions are generated in the background after upload, so these only
+    # build URLs from stored names and never open the image.
     def get_thumbnail(self, obj):
-        return obj.thumbnail.url if obj.thumbnail else None
+        return self.rendition_url(obj, 'thumb')
+
+    def get_preview(self, obj):
+        return self.rendition_url(obj, 'medium')
+
+    def get_renditions(self, obj):
+        return {size_name: self.rendition_data(obj, size_name) for size_name in obj.renditions}
+
+    def get_srcset(self, obj):
+        return self.srcset(obj)
 
     def validate_title(self, value):
         if len(value) < 5:
             raise serializers.ValidationError("Title must be at least 5 characters long.")
         return value
 
-class VideoSerializer(serializers.HyperlinkedModelSerializer):
+class VideoSerializer(RenditionURLMixin, CachedHyperlinkedModelSerializer):
     uploaded_by = UserSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     title = serializers.CharField(max_length=200)
     description = serializers.CharField(allow_blank=True)
     thumbnail = serializers.SerializerMethodField()
+    scrub_sprite = serializers.SerializerMethodField()
 
     class Meta:
         model = Video
-        fields = ['url', 'id', 'title', 'uploaded_by', 'uploaded_at', 'description', 'tags', 'video', 'thumbnail']
-        read_only_fields = ['uploaded_at']
+        fields = ['url', 'id', 'title', 'uploaded_by', 'uploaded_at', 'description', 'tags', 'video', 'thumbnail', 'scrub_sprite', 'media_info']
+        read_only_fields = ['uploaded_at', 'media_info']
 
+    # Poster frame and sprite are extracted offline by common.video
     def get_thumbnail(self, obj):
-        # Implement thumbnail generation logic here
-        return None
+        return self.rendition_url(obj, 'poster')
+
+    def get_scrub_sprite(self, obj):
+        return self.rendition_data(obj, 'sprite')
 
     def validate_title(self, value):
         if len(value) < 5:
@@ -122,7 +141,7 @@ class VideoSerializer(serializers.HyperlinkedModelSerializer):
             raise serializers.ValidationError("Video file size must be under 2500 MB.")
         return value
 
-class DocumentSerializer(serializers.HyperlinkedModelSerializer):
+class DocumentSerializer(CachedHyperlinkedModelSerializer):
     uploaded_by = UserSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     title = serializers.CharField(max_length=200)
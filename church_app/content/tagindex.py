@@ -0,0 +1,238 @@
+import bisect
+import heapq
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Count
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from .models import Tag
+
+logger = logging.getLogger(__name__)
+
+# Default for TAG_INDEX_MAX_AGE. Signals only reach the process that made the
+# change, so other workers pick it up when their copy is rebuilt.
+DEFAULT_MAX_AGE = 300
+
+# Seconds a lookup waits for the first build before answering with nothing.
+BUILD_WAIT = 5
+
+# Default for TAG_INDEX_CACHE_SIZE: completions kept, least recently used
+# dropped first, so random prefixes can't grow the cache without bound.
+DEFAULT_CACHE_SIZE = 512
+
+
+class _Snapshot:
+    """
+    One build of the index: ``keys`` is a sorted list of ``(lowercased name,
+    tag id)`` for prefix lookups. ``names`` and ``keys`` are never changed in
+    place (a renamed or deleted tag gets a new snapshot), so a lookup can
+    read them without the lock; ``counts`` is shared and updated in place.
+    """
+
+    def __init__(self, names, counts, keys=None):
+        self.names = names
+        self.counts = counts
+        self.keys = sorted((name.lower(), pk) for pk, name in names.items()) if keys is None else keys
+
+
+class TagIndex:
+    """
+    In-process autocomplete index of tag names with usage counts (how many
+    articles, blog posts, images, videos and documents carry each tag).
+
+    Lookups are a bisect into the sorted names plus a top-k by usage, with no
+    database access. A background thread, started with the app, builds the
+    index and rebuilds it (swapping it in whole) every TAG_INDEX_MAX_AGE
+    seconds; in between the ``m2m_changed``/delete signals of the tagged
+    models keep it current.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._built = threading.Event()
+        self._lock = threading.RLock()
+        self._cache = OrderedDict()
+        self._generation = 0  # bumped by every change, so stale results aren't cached
+        self._refresher_pid = None
+        self.tagged_models = []
+
+    def rebuild(self):
+        names = dict(Tag.objects.values_list('pk', 'name'))
+        counts = dict.fromkeys(names, 0)
+        for model in self.tagged_models:
+            through = model.tags.through
+            for tag_id, used in through.objects.values_list('tag_id').annotate(used=Count('pk')).order_by():
+                counts[tag_id] = counts.get(tag_id, 0) + used
+        snapshot = _Snapshot(names, counts)
+        with self._lock:
+            self._snapshot = snapshot
+            self._cache = OrderedDict()
+            self._generation += 1
+        self._built.set()
+        logger.info(f"Tag index rebuilt with {len(names)} tags")
+
+    def start(self):
+        """
+        Start the background thread that builds the index and keeps
+        rebuilding it. Does nothing if this process already has one (a
+        forked worker starts its own).
+        """
+        with self._lock:
+            if self._refresher_pid == os.getpid():
+                return
+            self._refresher_pid = os.getpid()
+        threading.Thread(target=self._refresh, name='tag-index', daemon=True).start()
+
+    def _refresh(self):
+        while True:
+            try:
+                self.rebuild()
+            except DatabaseError as exc:
+                # e.g. during the first migrate; try again next time
+                logger.info(f"Tag index not built: {exc}")
+            except Exception:
+                logger.exception("Tag index rebuild failed")
+            finally:
+                connections.close_all()
+            time.sleep(getattr(settings, 'TAG_INDEX_MAX_AGE', DEFAULT_MAX_AGE))
+
+    def _current(self):
+        self.start()
+        if self._snapshot is None:
+            self._built.wait(BUILD_WAIT)
+        return self._snapshot
+
+    def complete(self, prefix, limit=10):
+        """
+        Up to ``limit`` tags whose name starts with ``prefix`` (case
+        insensitive), most used first: ``[(id, name, count), ...]``.
+        """
+        prefix = prefix.strip().lower()
+        if self._current() is None:
+            return []
+        with self._lock:
+            snapshot, generation = self._snapshot, self._generation
+            cached = self._cache.get((prefix, limit))
+            if cached is not None:
+                self._cache.move_to_end((prefix, limit))
+                return cached
+
+        start = bisect.bisect_left(snapshot.keys, (prefix,))
+        end = bisect.bisect_left(snapshot.keys, (prefix + '\U0010ffff',), lo=start)
+        counts = snapshot.counts
+        best = heapq.nsmallest(
+            limit, snapshot.keys[start:end], key=lambda key: (-counts.get(key[1], 0), key[0]),
+        )
+        result = [(pk, snapshot.names[pk], counts.get(pk, 0)) for _, pk in best]
+        with self._lock:
+            if self._generation == generation:
+                self._cache[(prefix, limit)] = result
+                while len(self._cache) > getattr(settings, 'TAG_INDEX_CACHE_SIZE', DEFAULT_CACHE_SIZE):
+                    self._cache.popitem(last=False)
+        return result
+
+    # -- Incremental updates ---------------------------------------------
+
+    def _update(self, change):
+        # ``change`` updates the counts in place, or returns a new snapshot.
+        def apply():
+            with self._lock:
+                if self._snapshot is not None:
+                    self._snapshot = change(self._snapshot) or self._snapshot
+                    self._cache = OrderedDict()
+                    self._generation += 1
+        # A rolled-back change never reaches the index.
+        transaction.on_commit(apply)
+
+    def add_usage(self, tag_ids, delta):
+        def change(snapshot):
+            for pk in tag_ids:
+                snapshot.counts[pk] = max(snapshot.counts.get(pk, 0) + delta, 0)
+        self._update(change)
+
+    def put_tag(self, pk, name):
+        def change(snapshot):
+            old = snapshot.names.get(pk)
+            if old == name:
+                return None
+            names, keys = dict(snapshot.names), list(snapshot.keys)
+            if old is not None:
+                keys.remove((old.lower(), pk))
+            names[pk] = name
+            bisect.insort(keys, (name.lower(), pk))
+            snapshot.counts.setdefault(pk, 0)
+            return _Snapshot(names, snapshot.counts, keys)
+        self._update(change)
+
+    def drop_tag(self, pk):
+        def change(snapshot):
+            if pk not in snapshot.names:
+                return None
+            names, keys = dict(snapshot.names), list(snapshot.keys)
+            keys.remove((names.pop(pk).lower(), pk))
+            snapshot.counts.pop(pk, None)
+            return _Snapshot(names, snapshot.counts, keys)
+        self._update(change)
+
+
+tag_index = TagIndex()
+
+
+def _tags_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action == 'post_add':
+        # pk_set only holds the links that were actually added.
+        if reverse:
+            # tag.article_set.add(...): one tag, many objects
+            tag_index.add_usage([instance.pk] * len(pk_set), 1)
+        else:
+            tag_index.add_usage(pk_set, 1)
+    elif action == 'pre_remove':
+        # pk_set is whatever was passed to remove(), linked or not; note the
+        # links that exist before they are deleted.
+        if reverse:
+            source = model.tags.field.m2m_field_name()
+            used = sender.objects.filter(tag_id=instance.pk, **{f'{source}_id__in': pk_set}).count()
+            instance._tag_index_removed = [instance.pk] * used
+        else:
+            instance._tag_index_removed = list(instance.tags.filter(pk__in=pk_set).values_list('pk', flat=True))
+    elif action == 'post_remove':
+        tag_index.add_usage(instance.__dict__.pop('_tag_index_removed', ()), -1)
+    elif action == 'pre_clear':
+        # The cleared rows are gone by post_clear; note them now.
+        if reverse:
+            used = sender.objects.filter(tag_id=instance.pk).count()
+            instance._tag_index_cleared = [instance.pk] * used
+        else:
+            instance._tag_index_cleared = list(instance.tags.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        tag_index.add_usage(instance.__dict__.pop('_tag_index_cleared', ()), -1)
+
+
+def _tagged_deleted(sender, instance, **kwargs):
+    # Deleting an object drops its tag links without m2m_changed.
+    tag_index.add_usage(list(instance.tags.values_list('pk', flat=True)), -1)
+
+
+def _tag_saved(sender, instance, **kwargs):
+    tag_index.put_tag(instance.pk, instance.name)
+
+
+def _tag_deleted(sender, instance, **kwargs):
+    tag_index.drop_tag(instance.pk)
+
+
+def register(*models):
+    """
+    Count tag usage on ``models`` (each with a ``tags`` many-to-many to Tag).
+    """
+    for model in models:
+        tag_index.tagged_models.append(model)
+        uid = f'tag_index_{model._meta.label_lower}'
+        m2m_changed.connect(_tags_changed, sender=model.tags.through, dispatch_uid=uid)
+        pre_delete.connect(_tagged_deleted, sender=model, dispatch_uid=uid)
+    post_save.connect(_tag_saved, sender=Tag, dispatch_uid='tag_index_tag')
+    post_delete.connect(_tag_deleted, sender=Tag, dispatch_uid='tag_index_tag')
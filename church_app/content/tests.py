@@ -1,3 +1,273 @@
+import datetime
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from .pagination import EstimatedCountPaginator
+from .tagindex import tag_index
+from .feed import InvalidCursor, _after, decode_cursor, encode_cursor, feed_page
+from .models import Article, BlogPost, Document, Tag
 
-# Create your tests here.
+User = get_user_model()
+
+
+class FeedPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='feed')
+        cls.now = timezone.now().replace(microsecond=0)
+        # Three instants shared by every type, so each page boundary falls
+        # inside a tie on the timestamp.
+        for model, field, fields in [
+            (Article, 'created_at', {'content': '', 'author': user}),
+            (BlogPost, 'created_at', {'content': '', 'author': user}),
+            (Document, 'uploaded_at', {'uploaded_by': user, 'document': 'documents/feed.pdf'}),
+        ]:
+            objs = model.objects.bulk_create([model(title=f'{model.__name__} {i}', **fields) for i in range(6)])
+            for i, obj in enumerate(objs):
+                model.objects.filter(pk=obj.pk).update(**{field: cls.now - datetime.timedelta(minutes=i // 2)})
+
+    def querysets(self):
+        return {'article': Article.objects.all(), 'blogpost': BlogPost.objects.all(), 'document': Document.objects.all()}
+
+    def expected(self):
+        # Newest first, then by type in FEED_SOURCES order, then newest pk first.
+        rows = []
+        for rank, (type_name, queryset, field) in enumerate([
+            ('article', Article.objects.all(), 'created_at'),
+            ('blogpost', BlogPost.objects.all(), 'created_at'),
+            ('document', Document.objects.all(), 'uploaded_at'),
+        ]):
+            rows += [(getattr(obj, field), -rank, obj.pk, type_name) for obj in queryset]
+        return [(type_name, pk) for _, _, pk, type_name in sorted(rows, reverse=True)]
+
+    def walk(self, size):
+        seen, cursor = [], None
+        # A cursor that doesn't move forward would page forever.
+        for _ in range(len(self.expected()) + 1):
+            items, token = feed_page(self.querysets(), cursor, size)
+            seen += [(type_name, obj.pk) for type_name, obj in items]
+            if token is None:
+                return seen
+            cursor = decode_cursor(token)
+        self.fail("The feed cursor doesn't advance.")
+
+    def test_pages_cover_every_item_once_in_order(self):
+        for size in (1, 2, 4, 5, 18, 50):
+            with self.subTest(size=size):
+                self.assertEqual(self.walk(size), self.expected())
+
+    def test_last_page_has_no_cursor(self):
+        items, cursor = feed_page(self.querysets(), size=18)
+        self.assertEqual(len(items), 18)
+        self.assertIsNone(cursor)
+
+    def test_after_breaks_ties_by_type_then_pk(self):
+        newest = BlogPost.objects.filter(created_at=self.now).order_by('-pk').first()
+        cursor = (self.now, 'blogpost', newest.pk)
+        # Same instant: articles come before blog posts, documents after them.
+        self.assertFalse(Article.objects.filter(_after(0, 'created_at', cursor), created_at=self.now).exists())
+        self.assertEqual(Document.objects.filter(_after(2, 'uploaded_at', cursor), uploaded_at=self.now).count(), 2)
+        self.assertEqual(BlogPost.objects.filter(_after(1, 'created_at', cursor), created_at=self.now).count(), 1)
+
+    def test_cursor_round_trip(self):
+        position = (self.now, 'document', 42)
+        self.assertEqual(decode_cursor(encode_cursor(position)), position)
+        for token in ('', 'not base64!', encode_cursor((self.now, 'document', 1))[:-4]):
+            with self.subTest(token=token), self.assertRaises(InvalidCursor):
+                decode_cursor(token)
+
+
+class EstimatedCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='estimate')
+        Article.objects.bulk_create([Article(title=f'Article {i}', content='', author=user) for i in range(7)])
+
+    def test_pages_past_a_low_estimate_are_served(self):
+        with mock.patch('content.pagination.estimate_count', return_value=1):
+            response = self.client.get('/articles/', {'count': 'estimate', 'page_size': 2, 'page': 3})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), 2)
+            self.assertIsNotNone(response.data['links']['next'])
+            self.assertEqual(response.data['count'], 7)
+            self.assertTrue(response.data['count_is_estimate'])
+
+            response = self.client.get('/articles/', {'count': 'estimate', 'page_size': 2, 'page': 4})
+            self.assertEqual(len(response.data['results']), 1)
+            self.assertIsNone(response.data['links']['next'])
+            self.assertEqual(response.data['count'], 7)
+
+            response = self.client.get('/articles/', {'count': 'estimate', 'page_size': 2, 'page': 5})
+            self.assertEqual(response.status_code, 404)
+
+    def test_count_is_exact_once_the_end_is_read(self):
+        with mock.patch('content.pagination.estimate_count', return_value=100):
+            paginator = EstimatedCountPaginator(Article.objects.order_by('pk'), 5)
+            self.assertTrue(paginator.page(1).has_next())
+            self.assertEqual(paginator.count, 100)
+            self.assertFalse(paginator.page(2).has_next())
+            self.assertEqual(paginator.count, 7)
+
+
+class TagIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='tagger')
+        cls.grace, cls.gratitude, cls.hope = (Tag.objects.create(name=name) for name in ('Grace', 'gratitude', 'Hope'))
+        cls.article = Article.objects.create(title='One', content='', author=user)
+        cls.article.tags.set([cls.grace, cls.gratitude])
+        Article.objects.create(title='Two', content='', author=user).tags.set([cls.gratitude])
+
+    def setUp(self):
+        tag_index.rebuild()
+
+    def test_prefix_most_used_first(self):
+        self.assertEqual(tag_index.complete('GR'), [(self.gratitude.pk, 'gratitude', 2), (self.grace.pk, 'Grace', 1)])
+        self.assertEqual(tag_index.complete('gr', limit=1), [(self.gratitude.pk, 'gratitude', 2)])
+        self.assertEqual(tag_index.complete('x'), [])
+
+    def test_tag_changes_replace_the_snapshot(self):
+        before, grace = tag_index._snapshot, self.grace.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grace.delete()
+            Tag.objects.create(name='Grit')
+        # A lookup still reading the old snapshot sees it unchanged.
+        self.assertIn(grace, before.names)
+        self.assertEqual([name for _, name, _ in tag_index.complete('gr')], ['gratitude', 'Grit'])
+
+    def test_removing_and_clearing_count_only_real_links(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.tags.remove(self.hope)
+            self.article.tags.clear()
+            self.article.tags.clear()
+        self.assertEqual(tag_index.complete('gr'), [(self.gratitude.pk, 'gratitude', 1), (self.grace.pk, 'Grace', 0)])
+
+
+class FacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob = User.objects.create(username='alice'), User.objects.create(username='bob')
+        cls.prayer, cls.worship = Tag.objects.create(name='prayer'), Tag.objects.create(name='worship')
+        for title, content, author, tags in [
+            ('Morning prayer', '<p>Begin the day in prayer.</p>', cls.alice, [cls.prayer, cls.worship]),
+            ('Evening prayer', '<p>End the day in prayer.</p>', cls.bob, [cls.prayer]),
+            ('Hymns', '<p>Songs of praise.</p>', cls.alice, [cls.worship]),
+        ]:
+            Article.objects.create(title=title, content=content, author=author).tags.set(tags)
+
+    def facets(self, **params):
+        response = self.client.get('/articles/', {'facets': 'true', **params})
+        self.assertEqual(response.status_code, 200)
+        facets = response.data['facets']
+        return {relation: {row['label']: row['count'] for row in rows} for relation, rows in facets.items() if relation != 'month'}
+
+    def test_counts_cover_the_whole_list(self):
+        self.assertEqual(self.facets(), {'tags': {'prayer': 2, 'worship': 2}, 'author': {'alice': 2, 'bob': 1}})
+
+    def test_counts_follow_a_filter(self):
+        # Filtering on one tag still counts the other tags of the matches.
+        self.assertEqual(self.facets(tags=self.prayer.pk), {'tags': {'prayer': 2, 'worship': 1}, 'author': {'alice': 1, 'bob': 1}})
+        self.assertEqual(self.facets(author=self.alice.pk), {'tags': {'prayer': 1, 'worship': 2}, 'author': {'alice': 2}})
+
+    def test_counts_follow_a_search(self):
+        self.assertEqual(self.facets(search='evening'), {'tags': {'prayer': 1}, 'author': {'bob': 1}})
+        self.assertEqual(self.facets(search='praise', author=self.bob.pk), {'tags': {}, 'author': {}})
+
+    def test_month_counts_and_limit(self):
+        response = self.client.get('/articles/', {'facets': 'true', 'facet_limit': 1})
+        self.assertEqual(response.data['facets']['month'], [{'value': timezone.localtime().strftime('%Y-%m'), 'count': 3}])
+        self.assertEqual(len(response.data['facets']['tags']), 1)
+        self.assertNotIn('facets', self.client.get('/articles/').data)
+
+
+class SparseFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='sparse')
+        tag = Tag.objects.create(name='psalms')
+        for i in range(3):
+            Article.objects.create(title=f'Psalm {i}', content='<p>' + 'Selah. ' * 50 + '</p>', author=user).tags.set([tag])
+
+    def get(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/articles/', params)
+        self.assertEqual(response.status_code, 200)
+        article_queries = [q['sql'] for q in queries.captured_queries if 'FROM "content_article"' in q['sql'] and 'COUNT(' not in q['sql']]
+        self.assertEqual(len(article_queries), 1)
+        return response.data['results'], article_queries[0]
+
+    def test_full_rows_select_content(self):
+        rows, sql = self.get()
+        self.assertIn('"content_article"."content"', sql)
+        self.assertIn('content', rows[0])
+
+    def test_fields_drop_the_column(self):
+        rows, sql = self.get(fields='id,title')
+        self.assertNotIn('"content_article"."content"', sql)
+        self.assertEqual(set(rows[0]), {'id', 'title'})
+
+    def test_summary_drops_the_column(self):
+        rows, sql = self.get(summary='true')
+        self.assertNotIn('"content_article"."content"', sql)
+        self.assertNotIn('content', rows[0])
+        self.assertEqual(rows[0]['tags'][0]['name'], 'psalms')
+
+    def test_omitted_relations_skip_their_prefetch(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/articles/', {'omit': 'tags'})
+        self.assertFalse(any('content_tag' in q['sql'] for q in queries.captured_queries))
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get('/articles/', {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='etag', first_name='Ann')
+        cls.tag = Tag.objects.create(name='advent')
+        cls.article = Article.objects.create(title='Waiting', content='<p>Come.</p>', author=cls.author)
+        cls.article.tags.set([cls.tag])
+
+    def etag(self, url='/articles/'):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        return response['ETag']
+
+    def test_matching_etag_gets_304_without_reading_rows(self):
+        etag = self.etag()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/articles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(any('content_article' in q['sql'] for q in queries.captured_queries))
+        self.assertEqual(self.client.get('/articles/', HTTP_IF_NONE_MATCH='W/"stale"').status_code, 200)
+
+    def test_etag_depends_on_the_url(self):
+        self.assertNotEqual(self.etag(), self.etag(f'/articles/{self.article.pk}/'))
+
+    def test_related_changes_give_a_new_etag(self):
+        etags = [self.etag(f'/articles/{self.article.pk}/')]
+        self.tag.name = 'Advent'
+        self.tag.save()
+        etags.append(self.etag(f'/articles/{self.article.pk}/'))
+        self.author.username = 'etag2'
+        self.author.save()
+        etags.append(self.etag(f'/articles/{self.article.pk}/'))
+        self.article.tags.clear()
+        etags.append(self.etag(f'/articles/{self.article.pk}/'))
+        self.assertEqual(len(set(etags)), 4)
+        response = self.client.get(f'/articles/{self.article.pk}/', HTTP_IF_NONE_MATCH=etags[0])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['tags'], [])
+
+    def test_logins_keep_the_etag(self):
+        etag = self.etag()
+        self.author.last_login = timezone.now()
+        self.author.save(update_fields=['last_login'])
+        self.assertEqual(self.etag(), etag)
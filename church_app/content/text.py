@@ -0,0 +1,15 @@
+from common.text import html_to_text
+
+# Average reading speed used for ``reading_time``.
+WORDS_PER_MINUTE = 200
+
+
+def count_words(rich_text):
+    """
+    Number of words in a rich-text (HTML) body, ignoring tags and entities.
+    """
+    return len(html_to_text(rich_text).split())
+
+
+def reading_minutes(word_count):
+    return word_count // WORDS_PER_MINUTE
@@ -0,0 +1,37 @@
+from common.uploads import UploadError, UploadTarget
+from .models import Video
+from .serializers import VideoSerializer
+
+
+class VideoUploadTarget(UploadTarget):
+    """
+    Chunked uploads that create a new Video owned by the uploader.
+    Metadata: ``title`` and optional ``description``.
+    """
+    name = 'video'
+    max_size = 2500 * 1024 * 1024  # same limit as VideoSerializer.validate_video
+
+    def validate(self, metadata, filename, user):
+        serializer = VideoSerializer(data=metadata, partial=True)
+        if not serializer.is_valid():
+            raise UploadError(serializer.errors)
+        if 'title' not in serializer.validated_data:
+            raise UploadError({'title': ["This field is required."]})
+        if Video.objects.filter(title=serializer.validated_data['title'], uploaded_by=user).exists():
+            raise UploadError({'title': ["You already have a video with this title."]})
+        return {
+            'title': serializer.validated_data['title'],
+            'description': serializer.validated_data.get('description', ''),
+        }
+
+    def attach(self, session, file):
+        # Assigning an uncommitted file lets Model.save store it and kick off
+        # the media pipeline exactly like a regular multipart upload.
+        video = Video(
+            title=session.metadata['title'],
+            description=session.metadata.get('description', ''),
+            uploaded_by=session.user,
+        )
+        video.video = file
+        video.save()
+        return video
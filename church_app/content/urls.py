@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TagViewSet, ArticleViewSet, BlogPostViewSet, ImageViewSet, VideoViewSet, DocumentViewSet
+from .views import TagViewSet, ArticleViewSet, BlogPostViewSet, ImageViewSet, VideoViewSet, DocumentViewSet, FeedView
 
 # Create a router and register our viewsets with it.
 router = DefaultRouter()
@@ -13,6 +13,7 @@ router.register(r'documents', DocumentViewSet)
 
 # The API URLs are now determined automatically by the router.
 urlpatterns = [
+    path('feed/', FeedView.as_view(), name='feed'),
     path('', include(router.urls)),
 ]
 
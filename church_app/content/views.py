@@ -1,89 +1,279 @@
-from rest_framework import viewsets, permissions, filters
-from rest_framework.pagination import PageNumberPagination
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+from django.http import Http404
+from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.utils.urls import replace_query_param
 from django_filters.rest_framework import DjangoFilterBackend
+from common.conditional import ConditionalGetMixin, conditional
+from common.fieldsets import SparseFieldsMixin
+from common.querybudget import QueryBudgetMixin
+from common.search import FullTextSearchFilter
+from common.serving import PassthroughRenderer, serve_file, serve_image
+from .feed import FEED_SOURCES, FEED_TYPES, InvalidCursor, decode_cursor, feed_page
+from .pagination import StandardResultsSetPagination
+from .tagindex import tag_index
 from .models import Tag, Article, BlogPost, Image, Video, Document
 from .serializers import TagSerializer, ArticleSerializer, BlogPostSerializer, ImageSerializer, VideoSerializer, DocumentSerializer
 from .permissions import IsAuthorOrReadOnly
 
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
-    def get_paginated_response(self, data):
-        return Response({
-            'links': {
-                'next': self.get_next_link(),
-                'previous': self.get_previous_link()
-            },
-            'count': self.page.paginator.count,
-            'results': data
-        })
-
-class TagViewSet(viewsets.ModelViewSet):
+User = get_user_model()
+
+class FacetMixin:
+    """
+    ``?facets=true`` on a list adds ``facets``: counts by each of
+    ``facet_fields`` (``(relation, label lookup)`` pairs) and by month of
+    ``facet_date_field``, for the current search and filters.
+
+    Each facet is one grouped query over the same filtered queryset the page
+    uses (a search is a subquery of it), returning at most
+    ``?facet_limit=`` values: by default 10, never more than the page size.
+    """
+    facet_fields = ()
+    facet_date_field = None
+    facet_limit = 10
+
+    def wants_facets(self):
+        return self.action == 'list' and self.request.query_params.get('facets') in ('1', 'true')
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        self.filtered_queryset = queryset
+        return queryset
+
+    def get_facet_limit(self):
+        try:
+            limit = int(self.request.query_params.get('facet_limit', self.facet_limit))
+        except ValueError:
+            limit = self.facet_limit
+        page_size = self.paginator.get_page_size(self.request) if self.paginator else None
+        return min(max(limit, 1), page_size or self.facet_limit)
+
+    def get_facets(self, queryset):
+        # The filtered queryset becomes a subquery, so its joins (e.g. for
+        # ?tags=) don't narrow the groups.
+        queryset = queryset.model._default_manager.filter(pk__in=queryset.order_by().values('pk'))
+        limit = self.get_facet_limit()
+        facets = {}
+        for relation, label in self.facet_fields:
+            rows = (
+                queryset.exclude(**{f'{relation}__isnull': True})
+                .values(relation, label)
+                .annotate(count=Count('pk', distinct=True))
+                .order_by('-count', label)[:limit]
+            )
+            facets[relation] = [{'value': row[relation], 'label': row[label], 'count': row['count']} for row in rows]
+        if self.facet_date_field:
+            rows = (
+                queryset.annotate(month=TruncMonth(self.facet_date_field))
+                .values('month')
+                .annotate(count=Count('pk', distinct=True))
+                .order_by('-month')[:limit]
+            )
+            facets['month'] = [{'value': row['month'].strftime('%Y-%m'), 'count': row['count']} for row in rows]
+        return facets
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if self.wants_facets() and isinstance(response.data, dict):
+            response.data['facets'] = self.get_facets(self.filtered_queryset)
+        return response
+
+class TagViewSet(ConditionalGetMixin, QueryBudgetMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = StandardResultsSetPagination
+    query_budget = 3
+    version_models = (Tag,)
+    cursor_ordering = ('name',)
+    autocomplete_limit = 10
+    max_autocomplete_limit = 50
 
-class ArticleViewSet(viewsets.ModelViewSet):
+    @action(detail=False)
+    def autocomplete(self, request):
+        """
+        Tags starting with ``?q=``, most used first, from the in-process tag
+        index (no database query). ``?limit=`` defaults to 10.
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', self.autocomplete_limit)), 1), self.max_autocomplete_limit)
+        except ValueError:
+            limit = self.autocomplete_limit
+        matches = tag_index.complete(request.query_params.get('q', ''), limit)
+        return Response([{'id': pk, 'name': name, 'count': count} for pk, name, count in matches])
+
+class ArticleViewSet(SparseFieldsMixin, ConditionalGetMixin, QueryBudgetMixin, FacetMixin, viewsets.ModelViewSet):
     queryset = Article.objects.all()
     serializer_class = ArticleSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
     pagination_class = StandardResultsSetPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    select_related_fields = ('author',)
+    prefetch_related_fields = ('tags',)
+    query_budget = 4
+    version_models = (Article, Tag, User)
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     filterset_fields = ['tags', 'author']
     search_fields = ['title', 'content']
+    facet_fields = [('tags', 'tags__name'), ('author', 'author__username')]
+    facet_date_field = 'created_at'
+    summary_omit = deferred_fields = ('content',)
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-class BlogPostViewSet(viewsets.ModelViewSet):
+class BlogPostViewSet(SparseFieldsMixin, ConditionalGetMixin, QueryBudgetMixin, FacetMixin, viewsets.ModelViewSet):
     queryset = BlogPost.objects.all()
     serializer_class = BlogPostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
     pagination_class = StandardResultsSetPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    select_related_fields = ('author',)
+    prefetch_related_fields = ('tags',)
+    query_budget = 4
+    version_models = (BlogPost, Tag, User)
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     filterset_fields = ['tags', 'author']
     search_fields = ['title', 'content']
+    facet_fields = [('tags', 'tags__name'), ('author', 'author__username')]
+    facet_date_field = 'created_at'
+    summary_omit = deferred_fields = ('content',)
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-class ImageViewSet(viewsets.ModelViewSet):
+class ImageViewSet(ConditionalGetMixin, QueryBudgetMixin, FacetMixin, viewsets.ModelViewSet):
     queryset = Image.objects.all()
     serializer_class = ImageSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
     pagination_class = StandardResultsSetPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    select_related_fields = ('uploaded_by',)
+    prefetch_related_fields = ('tags',)
+    query_budget = 4
+    version_models = (Image, Tag, User)
+    cursor_ordering = ('-uploaded_at', '-id')
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     filterset_fields = ['tags', 'uploaded_by']
     search_fields = ['title', 'description']
+    facet_fields = [('tags', 'tags__name'), ('uploaded_by', 'uploaded_by__username')]
+    facet_date_field = 'uploaded_at'
 
     def perform_create(self, serializer):
         serializer.save(uploaded_by=self.request.user)
 
-class VideoViewSet(viewsets.ModelViewSet):
+    @action(detail=True, renderer_classes=[PassthroughRenderer])
+    def raw(self, request, pk=None):
+        """
+        Serve the image in the best format the client accepts (AVIF, WebP or
+        JPEG) at the smallest variant at least ``?w=`` pixels wide.
+        """
+        image = self.get_object()
+        if not image.image:
+            raise Http404
+        return serve_image(request, image, 'image')
+
+class VideoViewSet(ConditionalGetMixin, QueryBudgetMixin, FacetMixin, viewsets.ModelViewSet):
     queryset = Video.objects.all()
     serializer_class = VideoSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
     pagination_class = StandardResultsSetPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    select_related_fields = ('uploaded_by',)
+    prefetch_related_fields = ('tags',)
+    query_budget = 4
+    version_models = (Video, Tag, User)
+    cursor_ordering = ('-uploaded_at', '-id')
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     filterset_fields = ['tags', 'uploaded_by']
     search_fields = ['title', 'description']
+    facet_fields = [('tags', 'tags__name'), ('uploaded_by', 'uploaded_by__username')]
+    facet_date_field = 'uploaded_at'
 
     def perform_create(self, serializer):
         serializer.save(uploaded_by=self.request.user)
 
-class DocumentViewSet(viewsets.ModelViewSet):
+    @action(detail=True, renderer_classes=[PassthroughRenderer])
+    def stream(self, request, pk=None):
+        """
+        Serve the video with HTTP Range support so players can seek.
+        """
+        video = self.get_object()
+        if not video.video:
+            raise Http404
+        return serve_file(request, video.video)
+
+class DocumentViewSet(ConditionalGetMixin, QueryBudgetMixin, FacetMixin, viewsets.ModelViewSet):
     queryset = Document.objects.all()
     serializer_class = DocumentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
     pagination_class = StandardResultsSetPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    select_related_fields = ('uploaded_by',)
+    prefetch_related_fields = ('tags',)
+    query_budget = 4
+    version_models = (Document, Tag, User)
+    cursor_ordering = ('-uploaded_at', '-id')
+    # Also matches text inside the uploaded file (see common.search)
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     filterset_fields = ['tags', 'uploaded_by']
     search_fields = ['title', 'description']
+    facet_fields = [('tags', 'tags__name'), ('uploaded_by', 'uploaded_by__username')]
+    facet_date_field = 'uploaded_at'
 
     def perform_create(self, serializer):
         serializer.save(uploaded_by=self.request.user)
 
+class FeedView(QueryBudgetMixin, APIView):
+    """
+    Articles, blog posts, images, videos and documents in one stream, newest
+    first. Page with the opaque ``?cursor=`` from ``links.next``; narrow with
+    ``?types=article,video``.
+    """
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    page_size = StandardResultsSetPagination.page_size
+    max_page_size = StandardResultsSetPagination.max_page_size
+    # One read and one tags prefetch per type, plus the versions lookup
+    query_budget = 2 * len(FEED_SOURCES) + 1
+    version_models = tuple(model for _, model, _, _ in FEED_SOURCES) + (Tag, User)
+
+    def get_querysets(self, types):
+        querysets = {}
+        for type_name, model, _, _ in FEED_SOURCES:
+            if type_name in types:
+                user_field = 'author' if type_name in ('article', 'blogpost') else 'uploaded_by'
+                querysets[type_name] = model.objects.select_related(user_field).prefetch_related('tags')
+        return querysets
+
+    def get(self, request, *args, **kwargs):
+        return conditional(request, self.version_models, self.get_feed, *args, **kwargs)
+
+    def get_feed(self, request, *args, **kwargs):
+        params = request.query_params
+        types = params.get('types')
+        types = types.split(',') if types else FEED_TYPES
+        unknown = set(types) - set(FEED_TYPES)
+        if unknown:
+            raise ValidationError({'types': f"Unknown types: {', '.join(sorted(unknown))}. Choose from {', '.join(FEED_TYPES)}."})
+        try:
+            size = min(max(int(params.get('page_size', self.page_size)), 1), self.max_page_size)
+        except ValueError:
+            size = self.page_size
+        cursor = None
+        if params.get('cursor'):
+            try:
+                cursor = decode_cursor(params['cursor'])
+            except InvalidCursor:
+                raise NotFound("Invalid cursor.")
+
+        items, next_cursor = feed_page(self.get_querysets(types), cursor, size)
+        serializers = {type_name: serializer for type_name, _, _, serializer in FEED_SOURCES}
+        context = {'request': request, 'view': self}
+        results = [
+            {'type': type_name, 'object': serializers[type_name](obj, context=context).data}
+            for type_name, obj in items
+        ]
+        next_link = None
+        if next_cursor:
+            next_link = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+        return Response({'links': {'next': next_link}, 'results': results})
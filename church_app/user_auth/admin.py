@@ -1,11 +1,16 @@
 # user_auth/admin.py
 from django.contrib import admin
+from django.db import models
+from common.forms import SafeImageFormField
 from .models import UserProfile, FacebookSocialAccount, GoogleSocialAccount, ChurchBranch
 
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'membership_status', 'role', 'church_branch')
     search_fields = ('username', 'email', 'first_name', 'last_name')
     list_filter = ('membership_status', 'role', 'church_branch')
+    formfield_overrides = {
+        models.ImageField: {'form_class': SafeImageFormField},
+    }
     fieldsets = (
         (None, {'fields': ('username', 'password')}),
         ('Personal info', {'fields': ('first_name', 'last_name', 'email', 'date_of_birth', 'profile_picture', 'address', 'phone_number', 'emergency_contact_name', 'emergency_contact_phone_number')}),
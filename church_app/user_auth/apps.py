@@ -6,9 +6,14 @@ class UserAuthConfig(AppConfig):
     name = "user_auth"
 
     def ready(self):
+        from common import pipeline
         from .models import UserProfile
+        from .renditions import generate_profile_picture_renditions
         from .signals import user_profile_post_save_handler
 
         # Register post-save signals
         post_save.connect(user_profile_post_save_handler, sender=UserProfile)
 
+        # Responsive variants of new profile pictures
+        pipeline.register(UserProfile, 'profile_picture', generate_profile_picture_renditions)
+
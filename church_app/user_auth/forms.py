@@ -1,5 +1,6 @@
 from django import forms
-from django.contrib.auth.forms import UserCreationForm, UserChangeForm, AuthenticationForm
+from django.contrib.auth.forms import UserCreationForm, UserChangeForm, AuthenticationForm, UsernameField
+from common.forms import SafeImageFormField
 from .models import UserProfile
 from django.utils.translation import gettext_lazy as _
 
@@ -17,6 +18,10 @@ class BaseUserProfileForm(forms.ModelForm):
             'emergency_contact_phone_number': forms.TextInput(attrs={'placeholder': '+999999999', 'class': 'form-control'}),
             'profile_picture': forms.FileInput(attrs={'class': 'form-control'}),
         }
+        field_classes = {
+            'username': UsernameField,  # as in UserCreationForm/UserChangeForm, which this Meta shadows
+            'profile_picture': SafeImageFormField,
+        }
         help_texts = {
             'username': _('Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only.'),
             'phone_number': _('Phone number must be entered in the format: "+999999999". Up to 15 digits allowed.'),
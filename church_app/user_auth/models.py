@@ -7,6 +7,7 @@ from django.core.mail import send_mail
 from django.conf import settings
 from allauth.socialaccount.models import SocialAccount
 from dirtyfields import DirtyFieldsMixin
+from common.models import RenditionsModel
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 import phonenumbers
@@ -45,7 +46,7 @@ class UserProfileManager(BaseUserManager):
 
         return self.create_user(email, password, **extra_fields)
 
-class UserProfile(AbstractUser, DirtyFieldsMixin):
+class UserProfile(AbstractUser, RenditionsModel, DirtyFieldsMixin):
     """
     Extended user model with additional fields for church application.
     """
@@ -0,0 +1,11 @@
+from common import imaging
+
+# Widths of the responsive profile picture variants (avatars are small).
+PROFILE_PICTURE_WIDTHS = (64, 128, 256)
+
+
+def generate_profile_picture_renditions(profile, field_name='profile_picture'):
+    """
+    Media pipeline stage: WebP/AVIF/JPEG variants of a new profile picture.
+    """
+    return imaging.generate_renditions(profile, field_name, imaging.variant_specs(PROFILE_PICTURE_WIDTHS))
@@ -2,14 +2,18 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.utils.translation import gettext_lazy as _
+from common.serializers import RenditionURLMixin, SafeImageField
 from .models import UserProfile, FacebookSocialAccount, GoogleSocialAccount, ChurchBranch
 from django.contrib.auth import authenticate
 User = get_user_model()
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(RenditionURLMixin, serializers.ModelSerializer):
     """
     Serializer for retrieving and updating user profiles.
     """
+    profile_picture = SafeImageField(required=False, allow_null=True)
+    profile_picture_srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = UserProfile
         fields = (
@@ -17,15 +21,19 @@ class UserProfileSerializer(serializers.ModelSerializer):
             'date_of_birth', 'profile_picture', 'address', 'phone_number',
             'membership_start_date', 'membership_status', 'role',
             'church_branch', 'emergency_contact_name', 'emergency_contact_phone_number',
-            'tithe_amount'
+            'tithe_amount', 'profile_picture_srcset'
         )
 
+    def get_profile_picture_srcset(self, obj):
+        return self.srcset(obj)
+
 class UserProfileCreateSerializer(serializers.ModelSerializer):
     """
     Serializer for creating a new user profile.
     """
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
     password2 = serializers.CharField(write_only=True, required=True)
+    profile_picture = SafeImageField(required=False, allow_null=True)
 
     class Meta:
         model = UserProfile
@@ -5,7 +5,8 @@ from .views import (
     PasswordResetRequestView,
     PasswordResetConfirmView,
     AccountDeleteView,
-    CustomLoginView
+    CustomLoginView,
+    ProfilePictureView
 )
 
 urlpatterns = [
@@ -15,5 +16,6 @@ urlpatterns = [
     path('password/reset/confirm/', PasswordResetConfirmView.as_view(), name='password_reset_confirm'),
     path('account/delete/', AccountDeleteView.as_view(), name='account_delete'),
     path('login/', CustomLoginView.as_view(), name='login'),
+    path('profile/<int:pk>/picture/', ProfilePictureView.as_view(), name='profile_picture'),
 ]
 
@@ -7,6 +7,9 @@ from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.contrib.sites.shortcuts import get_current_site
 from django.urls import reverse
+from django.http import Http404
+from common.serving import PassthroughRenderer, serve_image
+from .models import UserProfile
 from .serializers import UserProfileSerializer, UserProfileCreateSerializer, CustomAuthTokenSerializer, PasswordResetRequestSerializer,  PasswordResetConfirmSerializer, FacebookSocialAccountSerializer, GoogleSocialAccountSerializer , ChurchBranchSerializer, UserTokenSerializer
 from .utils import generate_otp, send_otp_email, send_registration_email, send_password_reset_email
 from rest_framework import status
@@ -175,3 +178,18 @@ class UserProfileRetrieveView(generics.RetrieveAPIView):
         """
         return self.request.user
 
+
+class ProfilePictureView(generics.GenericAPIView):
+    """
+    API view to serve a profile picture as the best variant for the client's
+    Accept header (AVIF, WebP or JPEG), optionally at least ``?w=`` pixels wide.
+    """
+    queryset = UserProfile.objects.all()
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [PassthroughRenderer]
+
+    def get(self, request, *args, **kwargs):
+        profile = self.get_object()
+        if not profile.profile_picture:
+            raise Http404
+        return serve_image(request, profile, 'profile_picture')